@@ -1,17 +1,31 @@
 import os
-import sys
-import joblib
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import json
 import numpy as np
-import pandas as pd
 import uvicorn
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 
-from config.paths_config import *
-from src.logger import get_logger
-from src.custom_exception import CustomException
+from src.logger import get_logger, configure_logging
+from utils.scoring import score_users, score_items, top_k
+from utils.anime_index import FilterError
+from utils.serialization import encode, encode_lines, NDJSON_TYPE
+from utils.profiling import MODES as PROFILE_MODES, ProfileSession, profiled
+from utils.memory_budget import MemoryBudgetExceeded, check_budget, memory_report
+from utils.helpers import cache_memory
+from utils.model_state import ModelState, load_model_state, validate_model_state, warmup_model_state, artifact_fingerprint, artifact_memory
+from utils.metrics import REGISTRY, CONTENT_TYPE, BATCH_SIZE, MODEL_LOAD_SECONDS, ARTIFACT_MEMORY, HYBRID_TIERS, stage_timer, begin_request, end_request
+from pipeline.prediction_pipeline import similar_users_stage, user_stage, content_stage, cooccurrence_stage, combine_stage, precomputed_recommendation
 
+# Serving defaults to queue-based logging so handlers never wait on file I/O
+configure_logging(async_mode=os.environ.get("LOG_ASYNC", "1") == "1")
 logger = get_logger(__name__)
 
 app = FastAPI(
@@ -24,153 +38,493 @@ app = FastAPI(
 class UserRecommendationRequest(BaseModel):
     user_id: int
     num_recommendations: int = 10
+    filter: Optional[str] = None
 
 class AnimeRecommendationRequest(BaseModel):
-    anime_id: int
+    anime_id: Optional[int] = None
+    title: Optional[str] = None
     num_recommendations: int = 10
+    filter: Optional[str] = None
+    content_weight: Optional[float] = None
+    cooccurrence_weight: Optional[float] = None
+
+class HybridRecommendationRequest(BaseModel):
+    user_id: int
+    num_recommendations: int = 10
+    user_weight: float = 0.5
+    content_weight: float = 0.5
+    cooccurrence_weight: float = 0.6
+    deadline_ms: Optional[float] = None
+
+class BulkRecommendationRequest(BaseModel):
+    user_ids: Optional[List[int]] = None
+    num_recommendations: int = 10
+    filter: Optional[str] = None
+    chunk_size: int = 256
 
 class RecommendationResponse(BaseModel):
     recommendations: List[Dict[str, Any]]
 
-# Load all necessary data and models
+class HybridRecommendationResponse(BaseModel):
+    recommendations: List[Dict[str, Any]]
+    tier: str
+    reason: Optional[str] = None
+    elapsed_ms: float
+
+# The current model generation. Handlers read it once per request, so a
+# reload swapping it never changes the model under an in-flight request.
+_model_state: Optional[ModelState] = None
+_reload_lock = threading.Lock()
+_last_reload: Dict[str, Any] = {}
+# Why no generation could be loaded at all, reported by /ready
+_startup_error: Optional[str] = None
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+# On-demand profiling: the running /admin/profile session, and whether a
+# request is being profiled through its X-Profile header
+_profile_session: Optional[ProfileSession] = None
+_profiling_request = False
+# Seconds between checks of the artifact files, 0 disables watching
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+# Default share of synopsis similarity in /recommend/similar, 0 uses embeddings only
+CONTENT_WEIGHT = float(os.environ.get("CONTENT_WEIGHT", "0.3"))
+# Default share of rating co-occurrence similarity in /recommend/similar, 0 disables it
+COOCCURRENCE_WEIGHT = float(os.environ.get("COOCCURRENCE_WEIGHT", "0.3"))
+
+def run_blocking(func, *args):
+    """Run ``func`` on the default thread pool without blocking the event loop."""
+    return asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+############# HYBRID SERVING
+# The hybrid stages run on their own bounded pool with a per-request
+# deadline. Stages that overrun keep their thread until they finish, so the
+# number of queued or running stages is capped too: past the cap, requests
+# degrade immediately instead of queueing behind work that is already late.
+#
+# Tiers, best first: full -> user_only (user stage done, content late)
+# -> cached (last full result or the batch store) -> popular.
+
+HYBRID_WORKERS = int(os.environ.get("HYBRID_WORKERS", "4"))
+HYBRID_MAX_PENDING = int(os.environ.get("HYBRID_MAX_PENDING", str(4 * HYBRID_WORKERS)))
+HYBRID_DEADLINE_MS = float(os.environ.get("HYBRID_DEADLINE_MS", "1500"))
+HYBRID_MAX_DEADLINE_MS = float(os.environ.get("HYBRID_MAX_DEADLINE_MS", "10000"))
+HYBRID_CACHE_SIZE = int(os.environ.get("HYBRID_CACHE_SIZE", "10000"))
+
+_hybrid_executor = ThreadPoolExecutor(max_workers=HYBRID_WORKERS, thread_name_prefix="hybrid")
+_hybrid_slots = threading.BoundedSemaphore(HYBRID_MAX_PENDING)
+# Last full result per (model version, user), served when a later request runs out of time
+_hybrid_cache = OrderedDict()
+_hybrid_cache_lock = threading.Lock()
+
+class HybridOverloaded(Exception):
+    """Raised when every hybrid stage slot is taken."""
+
+def submit_stage(func, *args, **kwargs):
+    """Queue a hybrid stage on the bounded pool, or raise HybridOverloaded if it is full."""
+    if not _hybrid_slots.acquire(blocking=False):
+        raise HybridOverloaded()
+    try:
+        future = _hybrid_executor.submit(func, *args, **kwargs)
+    except Exception:
+        _hybrid_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hybrid_slots.release())
+    return future
+
+async def await_stage(future, deadline):
+    """Result of a stage, or asyncio.TimeoutError once ``deadline`` (monotonic) passes."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        future.cancel()
+        raise asyncio.TimeoutError()
+    # Cancelling the wrapper on timeout also cancels the stage if it hasn't started
+    return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+
+def cache_hybrid_result(state, user_id, names):
+    key = (state.model_version, user_id)
+    with _hybrid_cache_lock:
+        _hybrid_cache[key] = names
+        _hybrid_cache.move_to_end(key)
+        while len(_hybrid_cache) > HYBRID_CACHE_SIZE:
+            _hybrid_cache.popitem(last=False)
+
+def cached_hybrid_result(state, user_id):
+    """Earlier result for ``user_id`` from the model version being served, in memory or in the batch store."""
+    with _hybrid_cache_lock:
+        names = _hybrid_cache.get((state.model_version, user_id))
+    if names is None:
+        names = precomputed_recommendation(user_id, state.model_version)
+    return names
+
+def popular_recommendations(state, n):
+    """Most popular anime, for requests with nothing better to serve."""
+    anime_stats = state.popularity.get()
+    top_anime_ids = anime_stats[anime_stats['num_ratings'] >= 100].head(n)['anime_id'].to_numpy()
+    encoded = state.encode_anime(top_anime_ids)
+    names = np.where(encoded >= 0, state.metadata.names[encoded], "Unknown").tolist()
+    return [{"anime_id": int(anime_id), "name": name} for anime_id, name in zip(top_anime_ids, names)]
+
+def encode_cursor(state, kind, offset, total):
+    """Opaque cursor for the page after ``offset``, None when there is nothing left."""
+    if offset >= total:
+        return None
+    token = json.dumps({"kind": kind, "offset": int(offset), "version": state.model_version})
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+def decode_cursor(state, cursor, kind):
+    """Offset a cursor points at: 400 if it is malformed, 409 if it belongs to another model version."""
+    if not cursor:
+        return 0
+    try:
+        token = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(token["offset"])
+        if token["kind"] != kind or offset < 0:
+            raise ValueError(cursor)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if token.get("version") != state.model_version:
+        raise HTTPException(status_code=409, detail="Cursor belongs to a previous model version, start again without a cursor")
+    return offset
+
+def fast_response(payload, accept=None):
+    """Encode ``payload`` directly (orjson, or MessagePack if accepted), skipping response-model validation."""
+    body, media_type = encode(payload, accept)
+    return Response(content=body, media_type=media_type)
+
+def filter_exclusions(state, expression, endpoint):
+    """Boolean mask of the anime a filter expression rules out, None without a filter."""
+    if not expression:
+        return None
+    with stage_timer(endpoint, "filter"):
+        try:
+            return ~state.anime_index.mask(expression)
+        except FilterError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {str(e)}")
+
+def resolve_title(state, title):
+    """ID of the best title match that the model or the content table knows, None if nothing matches."""
+    content = state.content_neighbours
+    return state.title_index.resolve(
+        title, min_similarity=0.5,
+        accept=lambda anime_id: anime_id in state.anime2anime_encoded or (content is not None and anime_id in content))
+
+def get_model_state():
+    if _model_state is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded yet")
+    return _model_state
+
+def reload_model():
+    """
+    Load a new model generation, validate and warm it up, then swap it in.
+
+    Runs off the event loop; the current generation keeps serving until the
+    new one is ready, and a failed load leaves it untouched.
+    """
+    global _model_state, _last_reload
+    if not _reload_lock.acquire(blocking=False):
+        raise RuntimeError("A reload is already in progress")
+    try:
+        generation = _model_state.generation + 1 if _model_state is not None else 1
+        started = time.time()
+        try:
+            fingerprint = artifact_fingerprint()
+            state = load_model_state(generation)
+            validate_model_state(state)
+            warmup_model_state(state)
+            # Refused when MEMORY_BUDGET_MB is set and the artifacts don't fit, counting
+            # what the helpers cache and sharded engine hold next to the generation
+            memory = {**artifact_memory(state), **cache_memory()}
+            check_budget(memory)
+        except Exception as e:
+            _last_reload = {"status": "failed", "generation": generation, "error": str(e), "finished_at": time.time()}
+            logger.error(f"Reload of model generation {generation} failed: {str(e)}")
+            raise
+
+        _model_state = state
+        MODEL_LOAD_SECONDS.set(state.load_seconds)
+        for artifact, size in memory.items():
+            ARTIFACT_MEMORY.set(size, artifact=artifact)
+        _last_reload = {
+            "status": "ok",
+            "generation": generation,
+            "model_version": state.model_version,
+            "fingerprint": fingerprint,
+            "seconds": round(time.time() - started, 3),
+            "finished_at": time.time(),
+        }
+        logger.info(f"Serving model generation {generation} ({state.model_version}), memory per artifact:\n{memory_report(memory)}")
+        return _last_reload
+    finally:
+        _reload_lock.release()
+
+async def watch_artifacts():
+    """Reload when the artifact files change; polling keeps this dependency-free."""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        if _last_reload.get("fingerprint") == artifact_fingerprint() or _reload_lock.locked():
+            continue
+        try:
+            await run_blocking(reload_model)
+        except Exception:
+            # Logged by reload_model; retry on the next change
+            _last_reload["fingerprint"] = artifact_fingerprint()
+
+def require_admin(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stages, started = begin_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters don't explode cardinality
+        route = request.scope.get("route")
+        end_request(route.path if route is not None else "other", status, started, stages)
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """
+    Count requests towards a running profile session, or profile a single
+    request that carries ``X-Profile: sampling|cprofile`` and the admin
+    token. Costs one lookup of each when profiling is off.
+    """
+    global _profiling_request
+    session = _profile_session
+    if session is not None and session.active:
+        response = await call_next(request)
+        if not request.url.path.startswith("/admin/profile"):
+            session.count_request()
+        return response
+
+    mode = request.headers.get("x-profile")
+    if mode is None:
+        return await call_next(request)
+    try:
+        require_admin(request.headers.get("x-admin-token"))
+    except HTTPException as e:
+        return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+    if mode not in PROFILE_MODES:
+        return JSONResponse({"detail": f"X-Profile must be one of: {', '.join(PROFILE_MODES)}"}, status_code=400)
+    # Profilers of concurrent requests would overlap on the event loop
+    if _profiling_request:
+        return JSONResponse({"detail": "Another request is being profiled"}, status_code=409)
+
+    _profiling_request = True
+    try:
+        with profiled(mode, label=request.url.path.strip("/").replace("/", "-") or "root") as report:
+            response = await call_next(request)
+    finally:
+        _profiling_request = False
+    response.headers["X-Profile-Report"] = report["profile"]
+    response.headers["X-Profile-Summary"] = report["summary"]
+    return response
+
+async def initial_load():
+    """
+    Load the first generation, retrying with backoff until it succeeds.
+    Stops retrying if it can't fit the memory budget, which no retry would
+    change: the server stays up, unready, and /ready reports why.
+    """
+    global _startup_error
+    delay = 1.0
+    while _model_state is None:
+        try:
+            await run_blocking(reload_model)
+            logger.info("Model and data loaded successfully")
+        except MemoryBudgetExceeded as e:
+            _startup_error = str(e)
+            logger.critical(f"Refusing to serve: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Error loading model and data, retrying in {delay:.0f}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    if MODEL_WATCH_INTERVAL > 0:
+        asyncio.create_task(watch_artifacts())
+        logger.info(f"Watching model artifacts every {MODEL_WATCH_INTERVAL}s")
+
+# Load all necessary data and models in the background, so the server
+# accepts connections (and answers liveness probes) while loading;
+# /ready reports when the model is warm
 @app.on_event("startup")
 async def load_model_and_data():
-    global user2user_encoded, user2user_decoded, anime2anime_encoded, anime2anime_decoded
-    global user_weights, anime_weights, anime_df, rating_df
-    
-    try:
-        # Load mappings
-        user2user_encoded = joblib.load(os.path.join(PROCESSED_DIR, "user2user_encoded.pkl"))
-        user2user_decoded = joblib.load(os.path.join(PROCESSED_DIR, "user2user_decoded.pkl"))
-        anime2anime_encoded = joblib.load(os.path.join(PROCESSED_DIR, "anim2anime_encoded.pkl"))
-        anime2anime_decoded = joblib.load(os.path.join(PROCESSED_DIR, "anim2anime_decoded.pkl"))
-        
-        # Load model weights
-        user_weights = joblib.load(USER_WEIGHTS_PATH)
-        anime_weights = joblib.load(ANIME_WEIGHTS_PATH)
-        
-        # Load anime metadata
-        anime_df = pd.read_csv(DF)
-        
-        # Load rating data for popularity-based recommendations
-        rating_df = pd.read_csv(RATING_DF)
-        
-        logger.info("Model and data loaded successfully")
-    except Exception as e:
-        logger.error(f"Error loading model and data: {str(e)}")
-        raise RuntimeError(f"Failed to load model and data: {str(e)}")
+    app.state.loader = asyncio.create_task(initial_load())
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Anime Recommendation API", 
             "docs_url": "/docs",
-            "endpoints": ["/recommend/user", "/recommend/similar", "/recommend/popular", "/valid-users", "/valid-anime", "/health"]}
+            "endpoints": ["/recommend/user", "/recommend/similar", "/recommend/popular", "/recommend/hybrid", "/recommend/bulk", "/valid-users", "/valid-anime", "/catalog/stream", "/search", "/filters", "/health", "/ready", "/metrics"]}
 
 @app.get("/valid-users")
-async def get_valid_users(limit: int = 10):
+async def get_valid_users(limit: int = Query(10, ge=1, le=10000), cursor: Optional[str] = None):
     """
-    Get a list of valid user IDs for testing the recommendation API.
+    Get a page of valid user IDs for testing the recommendation API.
     
     - **limit**: Maximum number of user IDs to return (default: 10)
+    - **cursor**: `next_cursor` of the previous page; omit for the first page
     """
+    state = get_model_state()
     try:
-        valid_users = list(user2user_encoded.keys())[:limit]
+        offset = decode_cursor(state, cursor, "users")
+        valid_users = state.user_ids(offset, offset + limit)
         return {
-            "valid_user_ids": valid_users,
-            "total_users": len(user2user_encoded),
+            "valid_user_ids": valid_users.tolist(),
+            "total_users": state.num_users,
+            "next_cursor": encode_cursor(state, "users", offset + len(valid_users), state.num_users),
             "message": "Use these IDs to test the /recommend/user endpoint"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting valid users: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting valid users: {str(e)}")
 
 @app.get("/valid-anime")
-async def get_valid_anime(limit: int = 10):
+async def get_valid_anime(limit: int = Query(10, ge=1, le=10000), cursor: Optional[str] = None):
     """
-    Get a list of valid anime IDs for testing the recommendation API.
+    Get a page of valid anime IDs for testing the recommendation API.
     
     - **limit**: Maximum number of anime IDs to return (default: 10)
+    - **cursor**: `next_cursor` of the previous page; omit for the first page
     """
+    state = get_model_state()
     try:
-        valid_anime = list(anime2anime_encoded.keys())[:limit]
-        anime_details = []
-        
-        for anime_id in valid_anime:
-            anime_info = anime_df[anime_df['anime_id'] == anime_id]
-            if not anime_info.empty:
-                anime_row = anime_info.iloc[0]
-                anime_details.append({
-                    "anime_id": int(anime_id),
-                    "name": anime_row.get("eng_version", "Unknown"),
-                    "score": float(anime_row.get("Score", 0)) if not pd.isna(anime_row.get("Score", 0)) else 0
-                })
-            else:
-                anime_details.append({
-                    "anime_id": int(anime_id),
-                    "name": "Unknown",
-                    "score": 0
-                })
-                
+        offset = decode_cursor(state, cursor, "anime")
+        indices = np.arange(offset, min(offset + limit, state.num_anime))
+        anime_details = [
+            {"anime_id": item["anime_id"], "name": item["name"], "score": item.get("score", 0)}
+            for item in state.metadata.records(indices)
+        ]
         return {
             "valid_anime": anime_details,
-            "total_anime": len(anime2anime_encoded),
+            "total_anime": state.num_anime,
+            "next_cursor": encode_cursor(state, "anime", offset + len(indices), state.num_anime),
             "message": "Use these IDs to test the /recommend/similar endpoint"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting valid anime: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting valid anime: {str(e)}")
 
+@app.get("/catalog/stream")
+async def stream_catalog(chunk_size: int = Query(500, ge=1, le=5000), cursor: Optional[str] = None):
+    """
+    Stream the metadata of every anime the model knows as NDJSON, one record per line.
+    
+    - **chunk_size**: Records generated per chunk (default: 500)
+    - **cursor**: Resume from a `next_cursor` of /valid-anime
+    
+    Records are generated chunk by chunk as the client reads, so memory
+    stays constant however much of the catalog is pulled.
+    """
+    state = get_model_state()
+    offset = decode_cursor(state, cursor, "anime")
+    
+    def render(start):
+        return encode_lines(state.metadata.records(np.arange(start, min(start + chunk_size, state.num_anime))))
+    
+    async def chunks():
+        for start in range(offset, state.num_anime, chunk_size):
+            yield await run_blocking(render, start)
+    
+    return StreamingResponse(chunks(), media_type=NDJSON_TYPE)
+
+@app.post("/recommend/bulk")
+async def recommend_bulk(request: BulkRecommendationRequest):
+    """
+    Stream top-k recommendations for many users as NDJSON, one user per line.
+    
+    - **user_ids**: Users to recommend for; omit to stream every user
+    - **num_recommendations**: Number of recommendations per user (default: 10)
+    - **filter**: Optional filter expression applied to every user (see /filters)
+    - **chunk_size**: Users scored per matrix product (default: 256)
+    
+    Each line is `{"user_id": ..., "recommendations": [...]}`, or
+    `{"user_id": ..., "error": "not found"}` for unknown users. Chunks are
+    scored as the client reads, so memory stays constant for any number of users.
+    """
+    state = get_model_state()
+    if not 1 <= request.chunk_size <= 2000:
+        raise HTTPException(status_code=422, detail="chunk_size must be between 1 and 2000")
+    exclude = filter_exclusions(state, request.filter, "/recommend/bulk")
+    n_users = state.num_users if request.user_ids is None else len(request.user_ids)
+    BATCH_SIZE.observe(request.num_recommendations, endpoint="/recommend/bulk")
+    
+    def render(start):
+        stop = min(start + request.chunk_size, n_users)
+        if request.user_ids is None:
+            user_ids = state.user_ids(start, stop)
+            encoded = np.arange(start, stop)
+        else:
+            user_ids = np.asarray(request.user_ids[start:stop], dtype=np.int64)
+            encoded = np.array([state.user2user_encoded.get(int(u), -1) for u in user_ids], dtype=np.int64)
+        known = encoded >= 0
+        lines = {}
+        if known.any():
+            scores = score_users(state.user_weights, state.anime_weights, encoded[known])
+            top = top_k(scores, request.num_recommendations, exclude=exclude)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            for user_id, row, row_scores in zip(user_ids[known].tolist(), top, top_scores):
+                keep = np.isfinite(row_scores)
+                row, row_scores = row[keep], row_scores[keep]
+                lines[user_id] = {"user_id": user_id, "recommendations": state.metadata.records(row, recommendation_score=row_scores)}
+        return encode_lines([lines.get(u) or {"user_id": u, "error": "not found"} for u in user_ids.tolist()])
+    
+    async def chunks():
+        for start in range(0, n_users, request.chunk_size):
+            yield await run_blocking(render, start)
+    
+    return StreamingResponse(chunks(), media_type=NDJSON_TYPE)
+
 @app.post("/recommend/user", response_model=RecommendationResponse)
-async def recommend_for_user(request: UserRecommendationRequest):
+async def recommend_for_user(request: UserRecommendationRequest, accept: Optional[str] = Header(None)):
     """
     Get personalized anime recommendations for a specific user.
     
     - **user_id**: ID of the user to get recommendations for
     - **num_recommendations**: Number of recommendations to return (default: 10)
+    - **filter**: Optional filter expression, e.g. `genre:Action AND type:TV,Movie AND year>=2010` (see /filters)
     """
+    state = get_model_state()
     try:
         # Check if user exists
-        if request.user_id not in user2user_encoded:
+        if request.user_id not in state.user2user_encoded:
             raise HTTPException(status_code=404, detail=f"User ID {request.user_id} not found. Use /valid-users to get valid user IDs.")
         
+        BATCH_SIZE.observe(request.num_recommendations, endpoint="/recommend/user")
+        
         # Get user embedding
-        user_encoded_id = user2user_encoded[request.user_id]
-        user_embedding = user_weights[user_encoded_id]
+        user_encoded_id = state.user2user_encoded[request.user_id]
         
         # Calculate similarity with all anime
-        scores = np.dot(anime_weights, user_embedding)
+        with stage_timer("/recommend/user", "scoring"):
+            scores = score_users(state.user_weights, state.anime_weights, user_encoded_id)
         
-        # Get top recommendations
-        top_indices = np.argsort(scores)[::-1][:request.num_recommendations]
+        # Anime ruled out by the filter are masked before top-k
+        exclude = filter_exclusions(state, request.filter, "/recommend/user")
         
-        # Get anime IDs from encoded IDs
-        anime_ids = [anime2anime_decoded[idx] for idx in top_indices]
+        # Get top recommendations
+        with stage_timer("/recommend/user", "topk"):
+            top_indices = top_k(scores, request.num_recommendations, exclude=exclude)
         
-        # Get anime details
-        recommendations = []
-        for anime_id in anime_ids:
-            anime_info = anime_df[anime_df['anime_id'] == anime_id]
-            if not anime_info.empty:
-                anime_row = anime_info.iloc[0]
-                recommendations.append({
-                    "anime_id": int(anime_id),
-                    "name": anime_row.get("eng_version", "Unknown"),
-                    "score": float(anime_row.get("Score", 0)) if not pd.isna(anime_row.get("Score", 0)) else 0,
-                    "genres": anime_row.get("Genres", "Unknown"),
-                    "episodes": int(anime_row.get("Episodes", 0)) if not pd.isna(anime_row.get("Episodes", 0)) else 0,
-                    "type": anime_row.get("Type", "Unknown"),
-                    "recommendation_score": float(scores[anime2anime_encoded[anime_id]])
-                })
-            else:
-                recommendations.append({
-                    "anime_id": int(anime_id),
-                    "name": "Unknown",
-                    "recommendation_score": float(scores[anime2anime_encoded[anime_id]])
-                })
+        # Get anime details, column-wise from the precomputed metadata
+        with stage_timer("/recommend/user", "metadata"):
+            recommendations = state.metadata.records(top_indices, recommendation_score=scores[top_indices])
         
-        return {"recommendations": recommendations}
+        with stage_timer("/recommend/user", "serialize"):
+            return fast_response({"recommendations": recommendations}, accept)
     
-    except HTTPException as e:
+    except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
@@ -178,57 +532,101 @@ async def recommend_for_user(request: UserRecommendationRequest):
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
 @app.post("/recommend/similar", response_model=RecommendationResponse)
-async def recommend_similar_anime(request: AnimeRecommendationRequest):
+async def recommend_similar_anime(request: AnimeRecommendationRequest, accept: Optional[str] = Header(None)):
     """
     Get anime recommendations similar to a specific anime.
     
     - **anime_id**: ID of the anime to find similar titles for
+    - **title**: English or original title instead of an ID; typos and partial titles are resolved via /search
     - **num_recommendations**: Number of recommendations to return (default: 10)
+    - **filter**: Optional filter expression, e.g. `genre:Action AND type:TV,Movie AND year>=2010` (see /filters)
+    - **content_weight**: Share of synopsis/genre similarity blended into the embedding similarity, 0-1 (default: CONTENT_WEIGHT)
+    - **cooccurrence_weight**: Share of rating co-occurrence similarity, 0-1 (default: COOCCURRENCE_WEIGHT); with `content_weight` at most 1; at 1 together only anime in the neighbour tables are returned
     """
+    state = get_model_state()
     try:
-        # Check if anime exists
-        if request.anime_id not in anime2anime_encoded:
-            raise HTTPException(status_code=404, detail=f"Anime ID {request.anime_id} not found. Use /valid-anime to get valid anime IDs.")
+        query_id = request.anime_id
+        if query_id is None:
+            if not request.title:
+                raise HTTPException(status_code=422, detail="Provide anime_id or title")
+            with stage_timer("/recommend/similar", "title_lookup"):
+                query_id = resolve_title(state, request.title)
+            if query_id is None:
+                raise HTTPException(status_code=404, detail=f"No anime matching '{request.title}'. Use /search to find titles.")
         
-        # Get anime embedding
-        anime_encoded_id = anime2anime_encoded[request.anime_id]
-        anime_embedding = anime_weights[anime_encoded_id]
+        content = state.content_neighbours
+        content_weight = CONTENT_WEIGHT if request.content_weight is None else request.content_weight
+        if not 0 <= content_weight <= 1:
+            raise HTTPException(status_code=422, detail="content_weight must be between 0 and 1")
+        if content is None:
+            content_weight = 0.0
         
-        # Calculate similarity with all anime
-        scores = np.dot(anime_weights, anime_embedding)
+        cooccurrence = state.cooccurrence_neighbours
+        cooccurrence_weight = COOCCURRENCE_WEIGHT if request.cooccurrence_weight is None else request.cooccurrence_weight
+        if not 0 <= cooccurrence_weight <= 1:
+            raise HTTPException(status_code=422, detail="cooccurrence_weight must be between 0 and 1")
+        if cooccurrence is None:
+            cooccurrence_weight = 0.0
+        if content_weight + cooccurrence_weight > 1:
+            raise HTTPException(status_code=422, detail="content_weight and cooccurrence_weight must add up to at most 1")
         
-        # Get top recommendations (excluding the input anime)
-        top_indices = np.argsort(scores)[::-1]
-        top_indices = [idx for idx in top_indices if idx != anime_encoded_id][:request.num_recommendations]
+        # Check if anime exists; anime the model never saw can still be answered from synopses
+        in_model = query_id in state.anime2anime_encoded
+        if not in_model and not (content is not None and query_id in content):
+            raise HTTPException(status_code=404, detail=f"Anime ID {query_id} not found. Use /valid-anime to get valid anime IDs.")
         
-        # Get anime IDs from encoded IDs
-        anime_ids = [anime2anime_decoded[idx] for idx in top_indices]
+        BATCH_SIZE.observe(request.num_recommendations, endpoint="/recommend/similar")
         
-        # Get anime details
-        recommendations = []
-        for anime_id in anime_ids:
-            anime_info = anime_df[anime_df['anime_id'] == anime_id]
-            if not anime_info.empty:
-                anime_row = anime_info.iloc[0]
-                recommendations.append({
-                    "anime_id": int(anime_id),
-                    "name": anime_row.get("eng_version", "Unknown"),
-                    "score": float(anime_row.get("Score", 0)) if not pd.isna(anime_row.get("Score", 0)) else 0,
-                    "genres": anime_row.get("Genres", "Unknown"),
-                    "episodes": int(anime_row.get("Episodes", 0)) if not pd.isna(anime_row.get("Episodes", 0)) else 0,
-                    "type": anime_row.get("Type", "Unknown"),
-                    "similarity": float(scores[anime2anime_encoded[anime_id]])
-                })
+        # Calculate similarity with all anime
+        with stage_timer("/recommend/similar", "scoring"):
+            if in_model:
+                anime_encoded_id = state.anime2anime_encoded[query_id]
+                scores = score_items(state.anime_weights, anime_encoded_id)
             else:
-                recommendations.append({
-                    "anime_id": int(anime_id),
-                    "name": "Unknown",
-                    "similarity": float(scores[anime2anime_encoded[anime_id]])
-                })
+                scores = np.full(state.num_anime, -np.inf, dtype=np.float32)
+        
+        # Blend in the precomputed text and co-occurrence neighbours: one table row each, no scoring pass
+        if content_weight > 0 or cooccurrence_weight > 0 or not in_model:
+            with stage_timer("/recommend/similar", "content"):
+                if in_model:
+                    embedding_weight = 1 - content_weight - cooccurrence_weight
+                    blends = [(content, content_weight), (cooccurrence, cooccurrence_weight)]
+                else:
+                    embedding_weight = 0.0
+                    blends = [(content, 1.0)]
+                if embedding_weight > 1e-9:
+                    scores = embedding_weight * scores
+                else:
+                    # Neighbour tables only: anime in neither table have no score, not a score of 0
+                    scores = np.full(state.num_anime, -np.inf, dtype=np.float32)
+                for table, weight in blends:
+                    if weight > 0:
+                        neighbour_ids, similarities = table.lookup(query_id)
+                        encoded = state.encode_anime(neighbour_ids)
+                        rows = encoded[encoded >= 0]
+                        current = scores[rows]
+                        scores[rows] = np.where(np.isfinite(current), current, 0) + weight * similarities[encoded >= 0]
+        
+        # Exclude the input anime and anything the filter rules out
+        exclude = filter_exclusions(state, request.filter, "/recommend/similar")
+        if in_model:
+            if exclude is None:
+                exclude = [anime_encoded_id]
+            else:
+                exclude[anime_encoded_id] = True
+        
+        # Get top recommendations
+        with stage_timer("/recommend/similar", "topk"):
+            top_indices = top_k(scores, request.num_recommendations, exclude=exclude)
         
-        return {"recommendations": recommendations}
+        # Get anime details, column-wise from the precomputed metadata
+        with stage_timer("/recommend/similar", "metadata"):
+            recommendations = state.metadata.records(top_indices, similarity=scores[top_indices])
+        
+        with stage_timer("/recommend/similar", "serialize"):
+            return fast_response({"recommendations": recommendations}, accept)
     
-    except HTTPException as e:
+    except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
@@ -236,64 +634,264 @@ async def recommend_similar_anime(request: AnimeRecommendationRequest):
         raise HTTPException(status_code=500, detail=f"Error finding similar anime: {str(e)}")
 
 @app.get("/recommend/popular", response_model=RecommendationResponse)
-async def get_popular_anime(num_recommendations: int = Query(10, description="Number of recommendations to return")):
+async def get_popular_anime(num_recommendations: int = Query(10, description="Number of recommendations to return"),
+                            accept: Optional[str] = Header(None)):
     """
     Get the most popular anime based on ratings.
     
     - **num_recommendations**: Number of recommendations to return (default: 10)
     """
+    state = get_model_state()
     try:
-        # Get popular anime based on average rating and number of ratings
-        anime_stats = rating_df.groupby('anime_id').agg(
-            avg_rating=('rating', 'mean'),
-            num_ratings=('rating', 'count')
-        ).reset_index()
-        
-        # Filter anime with at least 100 ratings
-        anime_stats = anime_stats[anime_stats['num_ratings'] >= 100]
+        BATCH_SIZE.observe(num_recommendations, endpoint="/recommend/popular")
         
-        # Sort by average rating
-        anime_stats = anime_stats.sort_values(by='avg_rating', ascending=False)
+        # Popularity table (average rating and number of ratings), already
+        # sorted by average rating; aggregated off the event loop if it was
+        # not precomputed
+        with stage_timer("/recommend/popular", "aggregate"):
+            if state.popularity.loaded:
+                anime_stats = state.popularity.get()
+            else:
+                anime_stats = await run_blocking(state.popularity.get)
+            
+            # Filter anime with at least 100 ratings
+            anime_stats = anime_stats[anime_stats['num_ratings'] >= 100]
         
         # Get top anime
-        top_anime_ids = anime_stats.head(num_recommendations)['anime_id'].tolist()
+        top_anime = anime_stats.head(num_recommendations)
         
-        # Get anime details
-        recommendations = []
-        for anime_id in top_anime_ids:
-            anime_info = anime_df[anime_df['anime_id'] == anime_id]
-            if not anime_info.empty:
-                anime_row = anime_info.iloc[0]
-                anime_stat = anime_stats[anime_stats['anime_id'] == anime_id].iloc[0]
-                recommendations.append({
-                    "anime_id": int(anime_id),
-                    "name": anime_row.get("eng_version", "Unknown"),
-                    "score": float(anime_row.get("Score", 0)) if not pd.isna(anime_row.get("Score", 0)) else 0,
-                    "genres": anime_row.get("Genres", "Unknown"),
-                    "episodes": int(anime_row.get("Episodes", 0)) if not pd.isna(anime_row.get("Episodes", 0)) else 0,
-                    "type": anime_row.get("Type", "Unknown"),
-                    "avg_rating": float(anime_stat['avg_rating']),
-                    "num_ratings": int(anime_stat['num_ratings'])
-                })
+        # Get anime details; anime without metadata are left out
+        with stage_timer("/recommend/popular", "metadata"):
+            encoded = state.encode_anime(top_anime['anime_id'].to_numpy())
+            known = encoded >= 0
+            recommendations = state.metadata.records(
+                encoded[known], skip_unknown=True,
+                avg_rating=top_anime['avg_rating'].to_numpy(dtype=float)[known],
+                num_ratings=top_anime['num_ratings'].to_numpy(dtype=np.int64)[known],
+            )
         
-        return {"recommendations": recommendations}
+        with stage_timer("/recommend/popular", "serialize"):
+            return fast_response({"recommendations": recommendations}, accept)
     
     except Exception as e:
         logger.error(f"Error getting popular anime: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting popular anime: {str(e)}")
 
+@app.post("/recommend/hybrid", response_model=HybridRecommendationResponse)
+async def recommend_hybrid(request: HybridRecommendationRequest, accept: Optional[str] = Header(None)):
+    """
+    Hybrid (user-based plus content-based) recommendations within a time budget.
+    
+    - **user_id**: ID of the user to get recommendations for
+    - **num_recommendations**: Number of recommendations to return (default: 10)
+    - **user_weight**: Weight of anime liked by similar users (default: 0.5)
+    - **content_weight**: Weight of anime similar to those (default: 0.5)
+    - **cooccurrence_weight**: Weight of anime rated by the same users as those, relative to `content_weight` (default: 0.6, 0 disables it)
+    - **deadline_ms**: Time budget in milliseconds (default: HYBRID_DEADLINE_MS)
+    
+    When the budget runs out the best partial result is returned; **tier** says
+    which one: `full`, `user_only`, `cached` or `popular`, with the **reason**
+    (`deadline`, `overloaded` or `error`) for anything below `full`.
+    """
+    state = get_model_state()
+    start = time.monotonic()
+    if request.user_id not in state.user2user_encoded:
+        raise HTTPException(status_code=404, detail=f"User ID {request.user_id} not found. Use /valid-users to get valid user IDs.")
+    
+    BATCH_SIZE.observe(request.num_recommendations, endpoint="/recommend/hybrid")
+    deadline_ms = HYBRID_DEADLINE_MS if request.deadline_ms is None else request.deadline_ms
+    deadline = start + min(max(deadline_ms, 0.0), HYBRID_MAX_DEADLINE_MS) / 1000.0
+    n = request.num_recommendations
+    
+    names, user_names, tier, reason = None, None, "full", None
+    try:
+        with stage_timer("/recommend/hybrid", "user"):
+            # Stages read this request's generation, so a reload mid-request can't mix two models
+            similar_users = await await_stage(submit_stage(similar_users_stage, request.user_id, state=state), deadline)
+            user_names = await await_stage(submit_stage(user_stage, request.user_id, similar_users, state=state), deadline)
+        with stage_timer("/recommend/hybrid", "content"):
+            content_names, text_names = await await_stage(submit_stage(content_stage, user_names, state=state), deadline)
+            cooccurrence_names = []
+            if request.cooccurrence_weight > 0 and state.cooccurrence_neighbours is not None:
+                cooccurrence_names = await await_stage(submit_stage(cooccurrence_stage, user_names, state=state), deadline)
+        names = combine_stage(user_names, content_names, text_names, request.user_weight, request.content_weight, n=n,
+                              cooccurrence_recommended_animes=cooccurrence_names, cooccurrence_weight=request.cooccurrence_weight)
+        cache_hybrid_result(state, request.user_id, names)
+    except asyncio.TimeoutError:
+        reason = "deadline"
+    except HybridOverloaded:
+        reason = "overloaded"
+    except Exception as e:
+        logger.error(f"Hybrid stage failed for user {request.user_id}: {str(e)}")
+        reason = "error"
+    
+    recommendations = None
+    if names is not None:
+        recommendations = [{"name": name} for name in names]
+    else:
+        with stage_timer("/recommend/hybrid", "fallback"):
+            try:
+                if user_names:
+                    tier = "user_only"
+                    recommendations = [{"name": name} for name in combine_stage(user_names, user_weight=request.user_weight, n=n)]
+                else:
+                    cached = cached_hybrid_result(state, request.user_id)
+                    if cached:
+                        tier = "cached"
+                        recommendations = [{"name": name} for name in cached[:n]]
+                if recommendations is None:
+                    tier = "popular"
+                    if state.popularity.loaded:
+                        recommendations = popular_recommendations(state, n)
+                    else:
+                        recommendations = await run_blocking(popular_recommendations, state, n)
+            except Exception as e:
+                logger.error(f"Hybrid fallback failed for user {request.user_id}: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+    
+    HYBRID_TIERS.inc(tier=tier, reason=reason or "none")
+    return fast_response({
+        "recommendations": recommendations,
+        "tier": tier,
+        "reason": reason,
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 2),
+    }, accept)
+
 @app.get("/health")
 async def health_check():
     """
     Health check endpoint to verify the API is running.
     """
+    state = _model_state
     return {
         "status": "healthy",
-        "model_loaded": "user_weights" in globals() and "anime_weights" in globals(),
-        "data_loaded": "anime_df" in globals() and "rating_df" in globals(),
-        "num_users": len(user2user_encoded) if "user2user_encoded" in globals() else 0,
-        "num_anime": len(anime2anime_encoded) if "anime2anime_encoded" in globals() else 0
+        "model_loaded": state is not None,
+        "data_loaded": state is not None,
+        "num_users": state.num_users if state is not None else 0,
+        "num_anime": state.num_anime if state is not None else 0,
+        "generation": state.generation if state is not None else 0,
+        "model_version": state.model_version if state is not None else None
+    }
+
+@app.get("/search")
+async def search_titles(q: str = Query(..., min_length=1, description="Title or beginning of a title"),
+                        limit: int = Query(10, ge=1, le=100, description="Maximum number of matches")):
+    """
+    Autocomplete search over English and original titles.
+    
+    - **q**: Query; exact titles rank first, then title and word prefixes, then fuzzy matches
+    - **limit**: Maximum number of matches to return (default: 10)
+    """
+    state = get_model_state()
+    with stage_timer("/search", "lookup"):
+        matches = state.title_index.search(q, limit=limit)
+    return {"query": q, "matches": matches}
+
+@app.get("/filters")
+async def get_filters():
+    """
+    Values that can be used in filter expressions, per field.
+    """
+    state = get_model_state()
+    return {
+        "fields": state.anime_index.facets(),
+        "examples": ['genre:Action AND type:TV', 'genre:"Slice of Life" OR genre:Comedy',
+                     'type:TV,Movie NOT genre:Horror', '(season:spring OR season:fall) AND year>=2010'],
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once a validated and warmed-up model generation is serving, 503 before.
+    """
+    state = _model_state
+    if state is None:
+        raise HTTPException(status_code=503, detail=_startup_error or "Model is loading")
+    return {"status": "ready", "generation": state.generation, "model_version": state.model_version}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Request, stage and model metrics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.post("/admin/reload")
+async def admin_reload(wait: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Load the current artifacts as a new model generation and swap it in.
+
+    - **wait**: Block until the new generation is serving (default: reload in the background)
+    """
+    require_admin(x_admin_token)
+    if _reload_lock.locked():
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+
+    if not wait:
+        asyncio.get_running_loop().run_in_executor(None, reload_model)
+        return {"status": "started", "current_generation": _model_state.generation if _model_state else 0}
+
+    try:
+        result = await run_blocking(reload_model)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed: {str(e)}")
+    return {k: v for k, v in result.items() if k != "fingerprint"}
+
+@app.get("/admin/reload")
+async def admin_reload_status(x_admin_token: Optional[str] = Header(None)):
+    """
+    Outcome of the most recent reload.
+    """
+    require_admin(x_admin_token)
+    return {"in_progress": _reload_lock.locked(), **{k: v for k, v in _last_reload.items() if k != "fingerprint"}}
+
+@app.post("/admin/profile")
+async def admin_profile_start(mode: str = "sampling", seconds: Optional[float] = Query(None, gt=0, le=3600),
+                              requests: Optional[int] = Query(None, ge=1), x_admin_token: Optional[str] = Header(None)):
+    """
+    Profile the serving process for a number of seconds or requests,
+    whichever comes first. Files go to artifacts/profiles.
+
+    - **mode**: `sampling` (all threads, folded stacks for flame graphs) or `cprofile` (event loop thread, .prof)
+    - **seconds**: Stop after this many seconds (default: 30 when `requests` is not given)
+    - **requests**: Stop after this many requests
+    """
+    global _profile_session
+    require_admin(x_admin_token)
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(PROFILE_MODES)}")
+    if (_profile_session is not None and _profile_session.active) or _profiling_request:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    if seconds is None and requests is None:
+        seconds = 30.0
+
+    # Started and stopped on the event loop, the thread cprofile records
+    session = ProfileSession(mode, seconds=seconds, max_requests=requests, label="api").start()
+    if seconds is not None:
+        asyncio.get_running_loop().call_later(seconds, session.stop)
+    _profile_session = session
+    logger.info(f"Profiling started: {mode}, seconds={seconds}, requests={requests}")
+    return session.status()
+
+@app.get("/admin/profile")
+async def admin_profile_status(x_admin_token: Optional[str] = Header(None)):
+    """
+    The running profile session, or the report (files and top functions) of the last one.
+    """
+    require_admin(x_admin_token)
+    if _profile_session is None:
+        return {"active": False}
+    return _profile_session.status()
+
+@app.post("/admin/profile/stop")
+async def admin_profile_stop(x_admin_token: Optional[str] = Header(None)):
+    """
+    Stop the running profile session early and write its report.
+    """
+    require_admin(x_admin_token)
+    if _profile_session is None or not _profile_session.active:
+        raise HTTPException(status_code=409, detail="No profile is running")
+    return {"active": False, **_profile_session.stop()}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
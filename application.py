@@ -1,17 +1,118 @@
-from flask import Flask, render_template, request
-import logging
-import traceback
-from pipeline.prediction_pipeline import hybrid_recommendation
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger()
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, g, Response
+from config.paths_config import *
+from src.logger import get_logger, configure_logging
+from pipeline.prediction_pipeline import hybrid_recommendation, precomputed_recommendation
+from utils.helpers import load_artifact, load_frame, load_recommendation_store, cache_memory
+from utils.model_state import LOAD_WORKERS
+from utils.metrics import REGISTRY, CONTENT_TYPE, begin_request, end_request
+from utils.profiling import MODES as PROFILE_MODES, ProfileSession
+from utils.memory_budget import MemoryBudgetExceeded, check_budget, memory_report
+
+# Set up logging: queue-based so requests never wait on log I/O, and still
+# echoed to the console like before
+configure_logging(async_mode=os.environ.get("LOG_ASYNC", "1") == "1", console=True)
+logger = get_logger(__name__)
 
 app = Flask(__name__)
 
+_ready = threading.Event()
+# Why warm-up failed, reported by /ready
+_startup_error = None
+# One request at a time may be profiled through its X-Profile header
+_profile_lock = threading.Lock()
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def warm_up():
+    """
+    Read everything the hybrid path needs concurrently, then run it once.
+    If that fails, or doesn't fit the memory budget, the service stays up
+    but unready, and /ready reports why.
+    """
+    global _startup_error
+    try:
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+            jobs = [executor.submit(load_artifact, path) for path in
+                    (USER_WEIGHTS_PATH, USER2USER_ENCODED, USER2USER_DECODED,
+                     ANIME_WEIGHTS_PATH, ANIME2ANIME_ENCODED, ANIME2ANIME_DECODED)]
+            jobs += [executor.submit(load_frame, path) for path in (DF, SYNOPSIS_DF, RATING_DF)]
+            if os.path.exists(RECOMMENDATION_STORE):
+                jobs.append(executor.submit(load_recommendation_store, RECOMMENDATION_STORE))
+            for job in jobs:
+                job.result()
+        user_id = next(iter(load_artifact(USER2USER_ENCODED)))
+        hybrid_recommendation(int(user_id))
+        # Includes the lookups and indexes the first request built
+        memory = cache_memory()
+        check_budget(memory)
+        _ready.set()
+        logger.info(f"Recommendation service is warm and ready, memory per artifact:\n{memory_report(memory)}")
+    except MemoryBudgetExceeded as e:
+        _startup_error = str(e)
+        logger.critical(f"Refusing to serve: {str(e)}")
+    except Exception as e:
+        _startup_error = f"Warm-up failed: {e}"
+        logger.exception("Warm-up failed, the service stays unready")
+
+# Warm up in the background so the server starts listening immediately
+threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.before_request
+def start_request_timer():
+    g.metrics_stages, g.metrics_started = begin_request()
+
+@app.before_request
+def start_request_profile():
+    mode = request.headers.get("X-Profile")
+    if mode is None:
+        return None
+    if not ADMIN_TOKEN or request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return {"detail": "Profiling needs a valid X-Admin-Token"}, 401
+    if mode not in PROFILE_MODES:
+        return {"detail": f"X-Profile must be one of: {', '.join(PROFILE_MODES)}"}, 400
+    if not _profile_lock.acquire(blocking=False):
+        return {"detail": "Another request is being profiled"}, 409
+    g.profile = ProfileSession(mode, label=request.path.strip("/").replace("/", "-") or "home").start()
+
+@app.after_request
+def finish_request_profile(response):
+    if "profile" in g:
+        try:
+            report = g.pop("profile").stop()
+        finally:
+            _profile_lock.release()
+        response.headers["X-Profile-Report"] = report["profile"]
+        response.headers["X-Profile-Summary"] = report["summary"]
+    return response
+
+@app.teardown_request
+def abandon_request_profile(exc):
+    # Requests that never reached after_request
+    if "profile" in g:
+        g.pop("profile").stop()
+        _profile_lock.release()
+
+@app.after_request
+def record_request_metrics(response):
+    if "metrics_started" in g:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "other"
+        end_request(endpoint, response.status_code, g.metrics_started, g.metrics_stages, remainder_stage="render")
+    return response
+
+@app.route('/ready')
+def ready():
+    if not _ready.is_set():
+        if _startup_error is not None:
+            return {"status": "failed", "detail": _startup_error}, 503
+        return {"status": "warming up"}, 503
+    return {"status": "ready"}
+
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
     recommendations = None
@@ -19,24 +120,25 @@ def home():
         try:
             user_id = int(request.form["userID"])
             logger.info(f"Processing recommendation request for user_id: {user_id}")
-            recommendations = hybrid_recommendation(user_id)
+            # Precomputed by the batch job; users it doesn't cover are computed live
+            recommendations = precomputed_recommendation(user_id)
+            source = "store"
+            if recommendations is None:
+                recommendations = hybrid_recommendation(user_id)
+                source = "live"
             
             if recommendations:
-                logger.info(f"Successfully generated recommendations for user_id {user_id}: {recommendations}")
+                logger.info(f"Served {len(recommendations)} {source} recommendations for user_id {user_id}")
+                logger.debug("Recommendations for user_id %s: %s", user_id, recommendations)
             else:
                 logger.warning(f"No recommendations generated for user_id {user_id}")
                 
         except ValueError as ve:
             # Handle case where user ID is not a valid integer
-            logger.error(f"Invalid user ID format: {request.form.get('userID', 'unknown')}")
-            logger.error(f"Error details: {str(ve)}")
-            print(f"Error occurred: Invalid user ID format - {str(ve)}")
-        except Exception as e:
+            logger.error(f"Invalid user ID format: {request.form.get('userID', 'unknown')} ({str(ve)})")
+        except Exception:
             # Handle other exceptions
-            logger.error(f"Error generating recommendations for user: {request.form.get('userID', 'unknown')}")
-            logger.error(f"Error details: {str(e)}")
-            logger.error(traceback.format_exc())
-            print(f"Error occurred: {str(e)}")
+            logger.exception(f"Error generating recommendations for user: {request.form.get('userID', 'unknown')}")
     return render_template('index.html', recommendations=recommendations)
 
 if __name__ == "__main__":
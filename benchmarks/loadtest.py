@@ -0,0 +1,424 @@
+"""
+Concurrent load test of the FastAPI (app.py) and Flask (application.py) apps.
+
+    python -m benchmarks.synthetic --root /tmp/bench
+    python -m benchmarks.loadtest --root /tmp/bench --target fastapi --concurrency 32 --duration 20
+    python -m benchmarks.loadtest --root /tmp/bench --target flask --mix hybrid=1 --concurrency 4
+    python -m benchmarks.loadtest --root /tmp/bench --target fastapi --mix hybrid=1 --concurrency 16
+    python -m benchmarks.loadtest --root /tmp/bench --url http://127.0.0.1:8000 --mix user=1 --rps 200
+
+By default the app is driven in-process through its ASGI or WSGI interface,
+so the numbers measure the application and not a network stack; --url sends
+HTTP requests to a running server instead. Without --rps every client sends
+its next request as soon as the previous one completes (closed loop); with
+--rps requests are issued at that rate (open loop) and queue up if the app
+can't keep up. For the ASGI target the event-loop lag is measured as well:
+the delay of a 10ms timer is exactly what a blocking handler adds to every
+request sharing the loop.
+"""
+import argparse
+import asyncio
+import http.client
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+LAG_INTERVAL = 0.01
+
+def _json(payload):
+    return "application/json", json.dumps(payload).encode()
+
+def _form(payload):
+    return "application/x-www-form-urlencoded", urlencode(payload).encode()
+
+# Request kind -> (method, path, ID kind, body builder) per target. Body
+# builders receive the sampled user or anime ID and return (content type, bytes).
+ROUTES = {
+    "fastapi": {
+        "user": ("POST", "/recommend/user", "user", lambda i: _json({"user_id": i, "num_recommendations": 10})),
+        "similar": ("POST", "/recommend/similar", "anime", lambda i: _json({"anime_id": i, "num_recommendations": 10})),
+        "popular": ("GET", "/recommend/popular?num_recommendations=10", None, None),
+        "hybrid": ("POST", "/recommend/hybrid", "user", lambda i: _json({"user_id": i, "num_recommendations": 10})),
+    },
+    "flask": {
+        "hybrid": ("POST", "/", "user", lambda i: _form({"userID": i})),
+    },
+}
+
+
+############# WORKLOAD
+
+class IdSampler:
+    """Draws IDs uniformly or from a Zipf law over a shuffled ID list (hot keys for caches)."""
+
+    def __init__(self, ids, distribution="uniform", zipf_s=1.1, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.ids = np.asarray(ids)[self.rng.permutation(len(ids))]
+        self.lock = threading.Lock()
+        if distribution == "zipf":
+            weights = 1.0 / np.arange(1, len(self.ids) + 1) ** zipf_s
+            self.cdf = np.cumsum(weights / weights.sum())
+        elif distribution == "uniform":
+            self.cdf = None
+        else:
+            raise ValueError(f"Unknown ID distribution: {distribution}")
+
+    def sample(self):
+        with self.lock:
+            u = self.rng.random()
+        index = int(np.searchsorted(self.cdf, u)) if self.cdf is not None else int(u * len(self.ids))
+        return int(self.ids[min(index, len(self.ids) - 1)])
+
+
+class Workload:
+    """Picks the next request from the weighted mix."""
+
+    def __init__(self, routes, mix, samplers, seed=0):
+        self.kinds = list(mix)
+        weights = np.array([mix[k] for k in self.kinds], dtype=float)
+        self.cdf = np.cumsum(weights / weights.sum())
+        self.routes = routes
+        self.samplers = samplers
+        self.rng = np.random.default_rng(seed + 1)
+        self.lock = threading.Lock()
+
+    def next_request(self):
+        with self.lock:
+            u = self.rng.random()
+        kind = self.kinds[min(int(np.searchsorted(self.cdf, u)), len(self.kinds) - 1)]
+        method, path, id_kind, body = self.routes[kind]
+        if body is None:
+            return kind, method, path, None, b""
+        content_type, payload = body(self.samplers[id_kind].sample())
+        return kind, method, path, content_type, payload
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def load_ids(root):
+    """Valid user and anime IDs of the artifacts under ``root``."""
+    import joblib
+
+    processed = os.path.join(root, "artifacts", "processed")
+    return {
+        "user": list(joblib.load(os.path.join(processed, "user2user_decoded.pkl")).values()),
+        "anime": list(joblib.load(os.path.join(processed, "anim2anime_decoded.pkl")).values()),
+    }
+
+
+############# RECORDING
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind, seconds, status):
+        with self.lock:
+            self.latencies.setdefault(kind, []).append(seconds)
+            if status >= 400:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def percentiles(values):
+    values = np.asarray(values) * 1000.0
+    if values.size == 0:
+        return {"n": 0}
+    return {
+        "n": int(values.size),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def build_report(recorder, elapsed, lag=None):
+    everything = [t for times in recorder.latencies.values() for t in times]
+    report = {
+        "seconds": elapsed,
+        "requests": len(everything),
+        "errors": sum(recorder.errors.values()),
+        "rps": len(everything) / elapsed if elapsed else 0.0,
+        "latency": percentiles(everything),
+        "by_kind": {
+            kind: {**percentiles(times), "errors": recorder.errors.get(kind, 0), "rps": len(times) / elapsed}
+            for kind, times in sorted(recorder.latencies.items())
+        },
+    }
+    if lag is not None:
+        report["event_loop_lag"] = percentiles(lag)
+    return report
+
+
+############# ASGI (FastAPI)
+
+async def asgi_call(app, method, path, content_type=None, body=b""):
+    path, _, query = path.partition("?")
+    headers = [(b"host", b"loadtest")]
+    if content_type:
+        headers += [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 0), "server": ("loadtest", 80),
+    }
+    sent = False
+    status = {}
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code", 500)
+
+
+async def asgi_lifespan(app):
+    """Run the app's startup handlers and return a coroutine function that shuts it down."""
+    inbox, outbox = asyncio.Queue(), asyncio.Queue()
+    await inbox.put({"type": "lifespan.startup"})
+    task = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}}, inbox.get, outbox.put))
+    message = await outbox.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"Startup failed: {message.get('message')}")
+
+    async def shutdown():
+        await inbox.put({"type": "lifespan.shutdown"})
+        await outbox.get()
+        await task
+    return shutdown
+
+
+async def measure_lag(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(time.perf_counter() - start - LAG_INTERVAL, 0.0))
+
+
+async def run_asgi(app, workload, args):
+    shutdown = await asgi_lifespan(app)
+    deadline = time.perf_counter() + args.ready_timeout
+    while await asgi_call(app, "GET", "/ready") != 200:
+        if time.perf_counter() > deadline:
+            raise RuntimeError("App did not become ready")
+        await asyncio.sleep(0.05)
+
+    recorder, lags, stop = Recorder(), [], asyncio.Event()
+
+    async def one_request():
+        kind, method, path, content_type, body = workload.next_request()
+        start = time.perf_counter()
+        status = await asgi_call(app, method, path, content_type, body)
+        recorder.record(kind, time.perf_counter() - start, status)
+
+    async def closed_loop_client(end):
+        while time.perf_counter() < end:
+            await one_request()
+
+    async def open_loop(end):
+        limit = asyncio.Semaphore(args.concurrency)
+        pending = set()
+
+        async def limited():
+            async with limit:
+                await one_request()
+
+        interval, next_at = 1.0 / args.rps, time.perf_counter()
+        while next_at < end:
+            pending.add(asyncio.ensure_future(limited()))
+            pending = {t for t in pending if not t.done()}
+            next_at += interval
+            await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+        await asyncio.gather(*pending)
+
+    lag_task = asyncio.ensure_future(measure_lag(lags, stop))
+    started = time.perf_counter()
+    end = started + args.duration
+    if args.rps:
+        await open_loop(end)
+    else:
+        await asyncio.gather(*(closed_loop_client(end) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    await shutdown()
+    return build_report(recorder, elapsed, lags)
+
+
+############# WSGI (Flask) and HTTP
+
+def wsgi_call(app, method, path, content_type=None, body=b""):
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": query, "SCRIPT_NAME": "",
+        "SERVER_NAME": "loadtest", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1", "CONTENT_LENGTH": str(len(body)), "CONTENT_TYPE": content_type or "",
+        "wsgi.version": (1, 0), "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr, "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = {}
+
+    def start_response(status_line, headers, exc_info=None):
+        status["code"] = int(status_line.split(" ", 1)[0])
+
+    result = app(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return status.get("code", 500)
+
+
+class HttpClient:
+    """One keep-alive connection per thread to a running server."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.local = threading.local()
+
+    def __call__(self, method, path, content_type=None, body=b""):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        headers = {"Content-Type": content_type} if content_type else {}
+        try:
+            conn.request(method, path, body=body or None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            return 599
+
+
+def run_threaded(call, workload, args):
+    """Drive a blocking ``call(method, path, content_type, body)`` from a pool of threads."""
+    deadline = time.perf_counter() + args.ready_timeout
+    while call("GET", "/ready") != 200:
+        if time.perf_counter() > deadline:
+            raise RuntimeError("App did not become ready")
+        time.sleep(0.05)
+
+    recorder = Recorder()
+
+    def one_request():
+        kind, method, path, content_type, body = workload.next_request()
+        start = time.perf_counter()
+        status = call(method, path, content_type, body)
+        recorder.record(kind, time.perf_counter() - start, status)
+
+    started = time.perf_counter()
+    end = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if args.rps:
+            interval, next_at, futures = 1.0 / args.rps, started, []
+            while next_at < end:
+                futures.append(executor.submit(one_request))
+                next_at += interval
+                time.sleep(max(next_at - time.perf_counter(), 0))
+            for future in futures:
+                future.result()
+        else:
+            def client():
+                while time.perf_counter() < end:
+                    one_request()
+            for future in [executor.submit(client) for _ in range(args.concurrency)]:
+                future.result()
+    return build_report(recorder, time.perf_counter() - started)
+
+
+############# MAIN
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['seconds']:.1f}s: {report['rps']:.1f} req/s, {report['errors']} errors")
+    print(f"{'kind':10} {'n':>7} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    rows = list(report["by_kind"].items()) + [("all", {**report["latency"], "rps": report["rps"], "errors": report["errors"]})]
+    for kind, r in rows:
+        if r["n"]:
+            print(f"{kind:10} {r['n']:>7} {r['rps']:>8.1f} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} {r['errors']:>7}")
+    lag = report.get("event_loop_lag")
+    if lag and lag["n"]:
+        print(f"event loop lag: p50 {lag['p50_ms']:.2f}ms  p99 {lag['p99_ms']:.2f}ms  max {lag['max_ms']:.2f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the recommendation apps on synthetic artifacts")
+    parser.add_argument("--root", required=True, help="Directory with the artifacts (see benchmarks.synthetic)")
+    parser.add_argument("--target", choices=sorted(ROUTES), default="fastapi")
+    parser.add_argument("--url", help="Send HTTP requests to this running server instead of calling the app in-process")
+    parser.add_argument("--mix", help="Weighted request kinds, e.g. user=4,similar=3,popular=1 (default: all of the target)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients, or the in-flight cap with --rps")
+    parser.add_argument("--rps", type=float, help="Issue requests at this rate instead of back to back")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--distribution", choices=["uniform", "zipf"], default="uniform", help="How IDs are drawn")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="Zipf exponent; larger means hotter keys")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    routes = ROUTES[args.target]
+    mix = parse_mix(args.mix) if args.mix else {kind: 1.0 for kind in routes}
+    unknown = set(mix) - set(routes)
+    if unknown:
+        parser.error(f"{args.target} serves {', '.join(routes)}; not {', '.join(sorted(unknown))}")
+
+    output = os.path.abspath(args.output) if args.output else None
+    root = os.path.abspath(args.root)
+    os.chdir(root)
+    ids = load_ids(root)
+    samplers = {kind: IdSampler(values, args.distribution, args.zipf_s, args.seed) for kind, values in ids.items()}
+    workload = Workload(routes, mix, samplers, args.seed)
+
+    if args.url:
+        report = run_threaded(HttpClient(args.url), workload, args)
+    elif args.target == "fastapi":
+        import app as api
+        report = asyncio.run(run_asgi(api.app, workload, args))
+    else:
+        import application
+        report = run_threaded(lambda *request: wsgi_call(application.app, *request), workload, args)
+
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    report["config"]["mix"] = mix
+    print_report(report)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
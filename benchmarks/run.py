@@ -0,0 +1,330 @@
+"""
+Time the serving and pipeline hot paths on synthetic artifacts.
+
+    python -m benchmarks.synthetic --root /tmp/bench
+    python -m benchmarks.run --root /tmp/bench --output before.json
+    ... change something ...
+    python -m benchmarks.run --root /tmp/bench --output after.json --compare before.json
+
+Every benchmark reports latency percentiles over its repeats and the peak
+Python allocation of one extra traced call (tracemalloc slows code down, so
+it is never active while timing). Results go to a JSON report; --compare
+prints the change against an earlier report and exits non-zero when a p50
+or p99 regressed by more than --threshold.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+SUITES = ("loading", "serving", "scoring", "hybrid", "processing")
+
+
+############# MEASUREMENT
+
+def summarize(times, peak_bytes=None):
+    times = np.asarray(times) * 1000.0
+    summary = {
+        "n": int(times.size),
+        "mean_ms": float(times.mean()),
+        "min_ms": float(times.min()),
+        "p50_ms": float(np.percentile(times, 50)),
+        "p90_ms": float(np.percentile(times, 90)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "max_ms": float(times.max()),
+    }
+    if peak_bytes is not None:
+        summary["peak_alloc_bytes"] = int(peak_bytes)
+    return summary
+
+
+def traced_peak(fn):
+    """Peak bytes allocated by Python while running ``fn`` once."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return summarize(times, traced_peak(fn))
+
+
+def cycle(values):
+    """Callable returning the next value on each call, so repeats don't hit the same ID."""
+    state = {"i": -1}
+
+    def next_value():
+        state["i"] = (state["i"] + 1) % len(values)
+        return values[state["i"]]
+    return next_value
+
+
+############# SUITES
+
+def bench_loading(args):
+    import joblib
+    import pandas as pd
+    from config.paths_config import (USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH, USER2USER_ENCODED, USER2USER_DECODED,
+                                     ANIME2ANIME_ENCODED, ANIME2ANIME_DECODED, DF, RATING_DF, POPULARITY_DF)
+    from utils.model_state import load_model_state
+
+    repeat = args.load_repeat
+    results = {}
+    for name, path in [("user_weights", USER_WEIGHTS_PATH), ("anime_weights", ANIME_WEIGHTS_PATH),
+                       ("user2user_encoded", USER2USER_ENCODED), ("user2user_decoded", USER2USER_DECODED),
+                       ("anime2anime_encoded", ANIME2ANIME_ENCODED), ("anime2anime_decoded", ANIME2ANIME_DECODED)]:
+        results[f"load.{name}"] = measure(lambda: joblib.load(path), repeat, warmup=0)
+    for name, path in [("anime_df", DF), ("popularity_df", POPULARITY_DF), ("rating_df", RATING_DF)]:
+        results[f"load.{name}"] = measure(lambda: pd.read_csv(path), repeat, warmup=0)
+    results["load.model_state"] = measure(load_model_state, repeat, warmup=0)
+    return results
+
+
+def bench_serving(args):
+    import app as api
+
+    api.reload_model()
+    state = api._model_state
+    rng = np.random.default_rng(args.seed)
+    users = [int(state.user2user_decoded[i]) for i in rng.integers(0, state.num_users, 256)]
+    anime = [int(state.anime2anime_decoded[i]) for i in rng.integers(0, state.num_anime, 256)]
+    next_user, next_anime = cycle(users), cycle(anime)
+
+    loop = asyncio.new_event_loop()
+    try:
+        call = loop.run_until_complete
+        return {
+            "serve.recommend_for_user": measure(lambda: call(api.recommend_for_user(
+                api.UserRecommendationRequest(user_id=next_user(), num_recommendations=10), accept=None)), args.repeat),
+            "serve.recommend_similar_anime": measure(lambda: call(api.recommend_similar_anime(
+                api.AnimeRecommendationRequest(anime_id=next_anime(), num_recommendations=10), accept=None)), args.repeat),
+            "serve.get_popular_anime": measure(lambda: call(api.get_popular_anime(num_recommendations=10, accept=None)), args.repeat),
+        }
+    finally:
+        loop.close()
+
+
+def bench_scoring(args):
+    import joblib
+    from config.paths_config import USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH
+    from utils.scoring import top_k
+    from utils.sharded_scoring import ShardedScorer
+
+    user_weights = joblib.load(USER_WEIGHTS_PATH)
+    anime_weights = joblib.load(ANIME_WEIGHTS_PATH)
+    next_user = cycle(np.random.default_rng(args.seed).integers(0, len(user_weights), 256).tolist())
+
+    def in_process():
+        user = next_user()
+        top_k(np.dot(user_weights, user_weights[user]), 11, exclude=[user])
+
+    results = {"scoring.similar_users": measure(in_process, args.repeat)}
+    with ShardedScorer({"user": user_weights, "anime": anime_weights}, args.shards) as engine:
+        results[f"scoring.similar_users_sharded_{args.shards}"] = measure(
+            lambda: engine.nearest("user", next_user(), 11), args.repeat)
+    return results
+
+
+def bench_hybrid(args):
+    import joblib
+    from config.paths_config import USER2USER_DECODED
+    from utils import helpers
+    from pipeline.prediction_pipeline import hybrid_recommendation
+
+    decoded = joblib.load(USER2USER_DECODED)
+    rng = np.random.default_rng(args.seed)
+    next_user = cycle([int(decoded[i]) for i in rng.integers(0, len(decoded), 64)])
+
+    # First call with empty artifact caches, then steady state
+    helpers._artifact_cache.clear()
+    start = time.perf_counter()
+    hybrid_recommendation(next_user())
+    cold = summarize([time.perf_counter() - start])
+    return {
+        "hybrid.cold": cold,
+        "hybrid.recommendation": measure(lambda: hybrid_recommendation(next_user()), args.hybrid_repeat),
+    }
+
+
+def bench_processing(args):
+    from config.paths_config import ANIMELIST_CSV, PROCESSED_DIR
+    from src.data_processing import DataProcessor
+
+    # DataProcessor writes to artifacts/processed relative to the working
+    # directory; run it in a sibling tree so the serving artifacts survive
+    workdir = os.path.join(args.root, "processing")
+    os.makedirs(os.path.join(workdir, "artifacts"), exist_ok=True)
+    raw_link = os.path.join(workdir, "artifacts", "raw")
+    if not os.path.exists(raw_link):
+        os.symlink(os.path.join(args.root, "artifacts", "raw"), raw_link)
+    os.chdir(workdir)
+
+    stages = [
+        ("load_data", lambda p: p.load_data(usecols=["user_id", "anime_id", "rating"])),
+        ("filter_users", lambda p: p.filter_users()),
+        ("scale_ratings", lambda p: p.scale_ratings()),
+        ("encode_data", lambda p: p.encode_data()),
+        ("split_data", lambda p: p.split_data()),
+        ("save_artifacts", lambda p: p.save_artifacts()),
+        ("process_anime_data", lambda p: p.process_anime_data()),
+    ]
+
+    def run_stages(times=None, peaks=None):
+        processor = DataProcessor(ANIMELIST_CSV, PROCESSED_DIR)
+        for name, stage in stages:
+            if peaks is not None:
+                peaks[name] = traced_peak(lambda: stage(processor))
+                continue
+            start = time.perf_counter()
+            stage(processor)
+            times[name].append(time.perf_counter() - start)
+
+    try:
+        times = {name: [] for name, _ in stages}
+        for _ in range(args.processing_repeat):
+            run_stages(times=times)
+        peaks = {}
+        run_stages(peaks=peaks)
+    finally:
+        os.chdir(args.root)
+    return {f"process.{name}": summarize(times[name], peaks[name]) for name, _ in stages}
+
+
+BENCHMARKS = {
+    "loading": bench_loading,
+    "serving": bench_serving,
+    "scoring": bench_scoring,
+    "hybrid": bench_hybrid,
+    "processing": bench_processing,
+}
+
+
+############# REPORT
+
+def resident_memory_bytes():
+    from utils.metrics import resident_memory_bytes as rss
+    return rss()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    os.chdir(args.root)
+    with open("synthetic.json") as f:
+        dataset = json.load(f)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": dataset,
+            "repeat": args.repeat,
+        },
+        "results": {},
+        "rss_bytes": {},
+    }
+    for suite in args.suites:
+        print(f"Running {suite} benchmarks...", file=sys.stderr)
+        report["results"].update(BENCHMARKS[suite](args))
+        report["rss_bytes"][suite] = resident_memory_bytes()
+    return report
+
+
+def print_report(report):
+    print(f"{'benchmark':34} {'n':>5} {'p50 ms':>10} {'p99 ms':>10} {'peak alloc':>12}")
+    for name, r in report["results"].items():
+        peak = r.get("peak_alloc_bytes")
+        peak = f"{peak / 2**20:.1f} MiB" if peak is not None else "-"
+        print(f"{name:34} {r['n']:>5} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {peak:>12}")
+
+
+def compare(baseline, report, threshold):
+    """Print the change of p50/p99 per benchmark; return the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':34} {'p50 base':>10} {'p50 new':>10} {'change':>8} {'p99 change':>11}")
+    for name, new in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        p50 = new["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        p99 = new["p99_ms"] / base["p99_ms"] - 1 if base["p99_ms"] else 0.0
+        flag = ""
+        if p50 > threshold or p99 > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:34} {base['p50_ms']:>10.3f} {new['p50_ms']:>10.3f} {p50:>+8.1%} {p99:>+11.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serving and pipeline hot paths on synthetic artifacts")
+    parser.add_argument("--root", required=True, help="Directory prepared by benchmarks.synthetic")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per serving benchmark")
+    parser.add_argument("--load-repeat", type=int, default=5)
+    parser.add_argument("--shards", type=int, default=2, help="Worker processes for the sharded scoring benchmark")
+    parser.add_argument("--hybrid-repeat", type=int, default=20)
+    parser.add_argument("--processing-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    args.root = os.path.abspath(args.root)
+    args.suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    report = run(args)
+    print_report(report)
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
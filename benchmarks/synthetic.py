@@ -0,0 +1,192 @@
+"""
+Generate synthetic artifacts for benchmarks, without DVC or network access.
+
+    python -m benchmarks.synthetic --root /tmp/bench --users 10000 --anime 2000
+
+Writes, under ``<root>/artifacts``, the files the pipeline produces, in the
+exact formats of the stage that writes them:
+
+    raw/         animelist.csv anime.csv anime_with_synopsis.csv   (DataIngestion)
+    processed/   encoder pickles, rating_df.csv, anime_df.csv,
+                 synopsis_df.csv, popularity_df.csv               (DataProcessor)
+    weights/     user_weights.pkl anime_weights.pkl               (ModelTraining)
+
+The raw ratings are generated separately and at a smaller scale (every raw
+user passes DataProcessor's 400-ratings filter), since the processing
+benchmark only needs enough rows to be representative.
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+GENRES = ["Action", "Comedy", "Drama", "Romance", "Sci-Fi", "Fantasy", "Slice of Life", "Mystery",
+          "Adventure", "Horror", "Sports", "Music", "Mecha", "Psychological", "Supernatural", "School"]
+TYPES = ["TV", "Movie", "OVA", "Special", "ONA", "Music"]
+SEASONS = ["Spring", "Summer", "Fall", "Winter"]
+
+MANIFEST_FILE = "synthetic.json"
+CHUNK_USERS = 100_000
+
+
+def anime_ids(n_anime):
+    # MAL IDs are sparse, keep them that way so lookups can't rely on ID == index
+    return (np.arange(n_anime, dtype=np.int64) + 1) * 3
+
+
+def item_probabilities(n_anime, skew=0.8):
+    """Zipf-like popularity, so a few anime collect most ratings as in the real data."""
+    weights = 1.0 / np.arange(1, n_anime + 1) ** skew
+    return weights / weights.sum()
+
+
+def iter_ratings(rng, user_ids, ids, probabilities, min_ratings, max_ratings):
+    """Yield (user_id, anime_id, rating) chunks for ``user_ids``, rating in 0..10."""
+    for start in range(0, len(user_ids), CHUNK_USERS):
+        users = user_ids[start:start + CHUNK_USERS]
+        counts = rng.integers(min_ratings, max_ratings + 1, size=len(users))
+        yield (
+            np.repeat(users, counts),
+            ids[rng.choice(len(ids), size=int(counts.sum()), p=probabilities)],
+            rng.integers(0, 11, size=int(counts.sum())),
+        )
+
+
+def anime_metadata(rng, ids):
+    n = len(ids)
+    genres = [", ".join(rng.choice(GENRES, rng.integers(1, 4), replace=False)) for _ in range(n)]
+    english = np.where(rng.random(n) < 0.6, [f"English Title {i}" for i in ids], "Unknown")
+    return pd.DataFrame({
+        "MAL_ID": ids,
+        "Name": [f"Anime Title {i}" for i in ids],
+        "Score": np.round(rng.uniform(4, 9.2, n), 2).astype(str),
+        "Genres": genres,
+        "English name": english,
+        "Type": rng.choice(TYPES, n),
+        "Episodes": rng.integers(1, 100, n).astype(str),
+        "Premiered": [f"{s} {y}" for s, y in zip(rng.choice(SEASONS, n), rng.integers(1970, 2021, n))],
+        "Members": rng.integers(100, 2_000_000, n),
+    })
+
+
+def write_raw(root, rng, anime, ids, probabilities, raw_users):
+    raw_dir = os.path.join(root, "artifacts", "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+
+    path = os.path.join(raw_dir, "animelist.csv")
+    header = True
+    for users, items, ratings in iter_ratings(rng, np.arange(raw_users, dtype=np.int64), ids, probabilities, 400, 500):
+        pd.DataFrame({
+            "user_id": users, "anime_id": items, "rating": ratings,
+            "watching_status": 2, "watched_episodes": rng.integers(1, 25, len(users)),
+        }).to_csv(path, index=False, header=header, mode="w" if header else "a")
+        header = False
+
+    anime.to_csv(os.path.join(raw_dir, "anime.csv"), index=False)
+    pd.DataFrame({
+        "MAL_ID": anime.MAL_ID, "Name": anime.Name, "Score": anime.Score, "Genres": anime.Genres,
+        "sypnopsis": [f"A story about {g.lower()} and the people of title {i}." for g, i in zip(anime.Genres, anime.MAL_ID)],
+    }).to_csv(os.path.join(raw_dir, "anime_with_synopsis.csv"), index=False)
+
+
+def write_processed(root, rng, anime, ids, probabilities, n_users, min_ratings, max_ratings):
+    processed_dir = os.path.join(root, "artifacts", "processed")
+    os.makedirs(processed_dir, exist_ok=True)
+
+    user_ids = np.arange(n_users, dtype=np.int64)
+    joblib.dump({int(u): i for i, u in enumerate(user_ids)}, os.path.join(processed_dir, "user2user_encoded.pkl"))
+    joblib.dump({i: int(u) for i, u in enumerate(user_ids)}, os.path.join(processed_dir, "user2user_decoded.pkl"))
+    joblib.dump({int(a): i for i, a in enumerate(ids)}, os.path.join(processed_dir, "anim2anime_encoded.pkl"))
+    joblib.dump({i: int(a) for i, a in enumerate(ids)}, os.path.join(processed_dir, "anim2anime_decoded.pkl"))
+
+    # rating_df.csv: scaled ratings plus encoded indices, as save_artifacts writes it
+    path = os.path.join(processed_dir, "rating_df.csv")
+    anime_index = pd.Series(np.arange(len(ids)), index=ids)
+    sums = np.zeros(len(ids))
+    counts = np.zeros(len(ids), dtype=np.int64)
+    header = True
+    for users, items, ratings in iter_ratings(rng, user_ids, ids, probabilities, min_ratings, max_ratings):
+        scaled = ratings / 10.0
+        encoded = anime_index.loc[items].values
+        np.add.at(sums, encoded, scaled)
+        np.add.at(counts, encoded, 1)
+        pd.DataFrame({"user_id": users, "anime_id": items, "rating": scaled, "user": users, "anime": encoded}) \
+            .to_csv(path, index=False, header=header, mode="w" if header else "a")
+        header = False
+
+    rated = counts > 0
+    pd.DataFrame({"anime_id": ids[rated], "avg_rating": sums[rated] / counts[rated], "num_ratings": counts[rated]}) \
+        .sort_values(by="avg_rating", ascending=False, kind="stable") \
+        .to_csv(os.path.join(processed_dir, "popularity_df.csv"), index=False)
+
+    # anime_df.csv and synopsis_df.csv as process_anime_data writes them
+    df = anime.replace("Unknown", np.nan)
+    df["anime_id"] = df["MAL_ID"]
+    df["eng_version"] = df["English name"].fillna(df["Name"])
+    df = df.sort_values(by=["Score"], ascending=False, kind="quicksort", na_position="last")
+    df[["anime_id", "eng_version", "Score", "Genres", "Episodes", "Type", "Premiered", "Members"]] \
+        .to_csv(os.path.join(processed_dir, "anime_df.csv"), index=False)
+    pd.read_csv(os.path.join(root, "artifacts", "raw", "anime_with_synopsis.csv"),
+                usecols=["MAL_ID", "Name", "Genres", "sypnopsis"]) \
+        .to_csv(os.path.join(processed_dir, "synopsis_df.csv"), index=False)
+
+
+def normalized(rng, n, embedding_size):
+    weights = rng.standard_normal((n, embedding_size), dtype=np.float32)
+    return weights / np.linalg.norm(weights, axis=1).reshape((-1, 1))
+
+
+def write_weights(root, rng, n_users, n_anime, embedding_size):
+    weights_dir = os.path.join(root, "artifacts", "weights")
+    os.makedirs(weights_dir, exist_ok=True)
+    # L2-normalized float32 rows, as extract_weights produces them
+    joblib.dump(normalized(rng, n_users, embedding_size), os.path.join(weights_dir, "user_weights.pkl"))
+    joblib.dump(normalized(rng, n_anime, embedding_size), os.path.join(weights_dir, "anime_weights.pkl"))
+
+
+def generate(root, n_users=10_000, n_anime=2_000, embedding_size=128, min_ratings=20, max_ratings=80,
+             raw_users=1_000, seed=0):
+    """Write a full synthetic artifact tree under ``root`` and return its manifest."""
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    ids = anime_ids(n_anime)
+    probabilities = item_probabilities(n_anime)
+    anime = anime_metadata(rng, ids)
+
+    write_raw(root, rng, anime, ids, probabilities, raw_users)
+    write_processed(root, rng, anime, ids, probabilities, n_users, min_ratings, max_ratings)
+    write_weights(root, rng, n_users, n_anime, embedding_size)
+
+    manifest = {
+        "n_users": n_users, "n_anime": n_anime, "embedding_size": embedding_size,
+        "ratings_per_user": [min_ratings, max_ratings], "raw_users": raw_users, "seed": seed,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(root, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark artifacts")
+    parser.add_argument("--root", required=True, help="Directory to write artifacts/ into")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--anime", type=int, default=2_000)
+    parser.add_argument("--embedding-size", type=int, default=128)
+    parser.add_argument("--min-ratings", type=int, default=20, help="Ratings per user in rating_df.csv")
+    parser.add_argument("--max-ratings", type=int, default=80)
+    parser.add_argument("--raw-users", type=int, default=1_000, help="Users in the raw animelist.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    manifest = generate(args.root, args.users, args.anime, args.embedding_size, args.min_ratings,
+                        args.max_ratings, args.raw_users, args.seed)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,14 @@ X_TRAIN_ARRAY = os.path.join(PROCESSED_DIR,"X_train_array.pkl")
 X_TEST_ARRAY = os.path.join(PROCESSED_DIR,"X_test_array.pkl")
 Y_TRAIN = os.path.join(PROCESSED_DIR,"y_train.pkl")
 Y_TEST = os.path.join(PROCESSED_DIR,"y_test.pkl")
+USER_HOLDOUT = os.path.join(PROCESSED_DIR,"user_holdout.pkl")
 
 RATING_DF = os.path.join(PROCESSED_DIR,"rating_df.csv")
 DF = os.path.join(PROCESSED_DIR,"anime_df.csv")
 SYNOPSIS_DF = os.path.join(PROCESSED_DIR,"synopsis_df.csv")
+POPULARITY_DF = os.path.join(PROCESSED_DIR,"popularity_df.csv")
+CONTENT_NEIGHBOURS = os.path.join(PROCESSED_DIR,"content_neighbours.npz")
+COOCCURRENCE_NEIGHBOURS = os.path.join(PROCESSED_DIR,"cooccurrence_neighbours.npz")
 
 USER2USER_ENCODED = "artifacts/processed/user2user_encoded.pkl"
 USER2USER_DECODED = "artifacts/processed/user2user_decoded.pkl"
@@ -37,4 +41,27 @@ WEIGHTS_DIR = "artifacts/weights"
 MODEL_PATH = os.path.join(MODEL_DIR,"model.h5")
 ANIME_WEIGHTS_PATH = os.path.join(WEIGHTS_DIR,"anime_weights.pkl")
 USER_WEIGHTS_PATH = os.path.join(WEIGHTS_DIR,"user_weights.pkl")
-CHECKPOINT_FILE_PATH = "artifacts/model_checkpoint/weights.weights.h5"
\ No newline at end of file
+CHECKPOINT_FILE_PATH = "artifacts/model_checkpoint/weights.weights.h5"
+TRACKING_DIR = "artifacts/tracking"
+
+
+###################### MODEL EVALUATION #######################
+
+EVALUATION_DIR = "artifacts/evaluation"
+EVALUATION_METRICS = os.path.join(EVALUATION_DIR,"metrics.json")
+
+
+###################### MODEL EXPORT #######################
+
+BUNDLE_DIR = "artifacts/bundle"
+
+
+###################### BATCH RECOMMENDATION #######################
+
+RECOMMENDATIONS_DIR = "artifacts/recommendations"
+RECOMMENDATION_STORE = os.path.join(RECOMMENDATIONS_DIR,"hybrid.sqlite")
+
+
+###################### PROFILING #######################
+
+PROFILE_DIR = "artifacts/profiles"
@@ -0,0 +1,207 @@
+"""
+Run a single pipeline stage from the command line.
+
+    python -m pipeline.cli ingest
+    python -m pipeline.cli process
+    python -m pipeline.cli content
+    python -m pipeline.cli cooccurrence
+    python -m pipeline.cli train
+    python -m pipeline.cli train-distributed --workers 4
+    python -m pipeline.cli evaluate
+    python -m pipeline.cli export
+    python -m pipeline.cli precompute
+    python -m pipeline.cli check-imports
+    python -m pipeline.cli --profile sampling train
+
+``--profile`` records a sampling (folded stacks) or cProfile profile of
+the stage's main process into artifacts/profiles.
+
+Stage modules are imported only when their stage runs, and heavy
+dependencies (TensorFlow, comet_ml, google-cloud-storage, scikit-learn)
+are imported inside the code that needs them, so data-only stages start
+quickly.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from config.paths_config import *
+
+# Modules that must never be pulled in just by importing a stage
+HEAVY_MODULES = ("tensorflow", "keras", "comet_ml", "google.cloud.storage", "sklearn")
+
+# Stage name -> module holding its implementation
+STAGE_MODULES = {
+    "ingest": "src.data_ingestion",
+    "process": "src.data_processing",
+    "content": "src.content_similarity",
+    "cooccurrence": "src.item_cooccurrence",
+    "train": "src.model_training",
+    "evaluate": "src.model_evaluation",
+    "export": "src.model_export",
+    "precompute": "src.batch_recommendation",
+    "train-distributed": "src.distributed_training",
+}
+
+IMPORT_BUDGET_SECONDS = 1.0
+
+
+def run_ingest(args):
+    from src.data_ingestion import DataIngestion
+    from utils.common_functions import read_yaml
+
+    DataIngestion(read_yaml(CONFIG_PATH)).run()
+
+
+def run_process(args):
+    from src.data_processing import DataProcessor
+
+    DataProcessor(ANIMELIST_CSV, PROCESSED_DIR).run()
+
+
+def run_content(args):
+    from src.content_similarity import ContentSimilarity
+
+    ContentSimilarity(CONFIG_PATH).run()
+
+
+def run_cooccurrence(args):
+    from src.item_cooccurrence import ItemCooccurrence
+
+    ItemCooccurrence(CONFIG_PATH).run()
+
+
+def run_train(args):
+    from utils.common_functions import read_yaml
+
+    training = read_yaml(CONFIG_PATH).get("training", {})
+    num_workers = args.workers or training.get("num_workers", 1)
+    if num_workers > 1:
+        from src.distributed_training import DistributedTraining
+
+        DistributedTraining(num_workers, syncs_per_epoch=training.get("syncs_per_epoch", 4)).run()
+    else:
+        from src.model_training import ModelTraining
+
+        ModelTraining(PROCESSED_DIR).train_model()
+
+
+def run_train_distributed(args):
+    from src.distributed_training import DistributedTraining
+    from utils.common_functions import read_yaml
+
+    training = read_yaml(CONFIG_PATH).get("training", {})
+    num_workers = args.workers or max(training.get("num_workers", 1), 2)
+    DistributedTraining(num_workers, syncs_per_epoch=training.get("syncs_per_epoch", 4)).run()
+
+
+def run_evaluate(args):
+    from src.model_evaluation import ModelEvaluation
+
+    ModelEvaluation(CONFIG_PATH).run()
+
+
+def run_export(args):
+    from src.model_export import ModelExport
+
+    if args.from_model:
+        from src.model_training import ModelTraining
+
+        ModelTraining(PROCESSED_DIR, track=False).export_weights()
+    ModelExport().run()
+
+
+def run_precompute(args):
+    from src.batch_recommendation import BatchRecommendation
+
+    BatchRecommendation(CONFIG_PATH).run()
+
+
+def measure_import(module):
+    """Import ``module`` in a fresh interpreter and report its cost and any heavy modules it loaded."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import pipeline.cli, {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'heavy': heavy}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_check_imports(args):
+    """Fail if importing any stage exceeds the budget or loads a heavy dependency."""
+    failures = []
+    for stage, module in STAGE_MODULES.items():
+        report = measure_import(module)
+        status = "ok"
+        if report["heavy"]:
+            status = f"imports {', '.join(report['heavy'])}"
+        elif report["seconds"] > args.budget:
+            status = f"over budget ({args.budget:.2f}s)"
+        if status != "ok":
+            failures.append(stage)
+        print(f"{stage:<18} {module:<26} {report['seconds']:.3f}s  {status}")
+
+    if failures:
+        print(f"Import check failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+
+STAGES = {
+    "ingest": (run_ingest, "Download the raw CSV files"),
+    "process": (run_process, "Filter, encode and split the ratings"),
+    "content": (run_content, "Precompute synopsis-based content neighbours"),
+    "cooccurrence": (run_cooccurrence, "Precompute item neighbours from the rating matrix"),
+    "train": (run_train, "Train the recommender model"),
+    "train-distributed": (run_train_distributed, "Train the recommender model on several worker processes"),
+    "evaluate": (run_evaluate, "Compute offline ranking metrics"),
+    "export": (run_export, "Write the versioned inference bundle"),
+    "precompute": (run_precompute, "Precompute hybrid recommendations for every user"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Anime recommender pipeline stages")
+    parser.add_argument("--profile", choices=("sampling", "cprofile"), default=None,
+                        help=f"Profile the stage's main process and write the report to {PROFILE_DIR}")
+    subparsers = parser.add_subparsers(dest="stage", required=True)
+
+    for name, (handler, help_text) in STAGES.items():
+        stage_parser = subparsers.add_parser(name, help=help_text)
+        stage_parser.set_defaults(handler=handler)
+        if name in ("train", "train-distributed"):
+            stage_parser.add_argument("--workers", type=int, default=None,
+                                      help="Number of data-parallel worker processes (default: config.yaml)")
+        if name == "export":
+            stage_parser.add_argument("--from-model", action="store_true",
+                                      help="Re-extract the embeddings from the saved Keras model first")
+
+    check_parser = subparsers.add_parser("check-imports", help="Check stage import time and heavy imports")
+    check_parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS,
+                              help="Maximum import time per stage in seconds")
+    check_parser.set_defaults(handler=run_check_imports)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    if args.profile:
+        from utils.profiling import profiled
+
+        with profiled(args.profile, label=args.stage) as report:
+            args.handler(args)
+        print(f"Profile written to {report['profile']} (summary: {report['summary']})")
+    else:
+        args.handler(args)
+    if args.stage in STAGES:
+        print(f"Stage {args.stage} finished in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,87 +1,234 @@
 from config.paths_config import *
 from utils.helpers import *
-import numpy as np
+from utils.metrics import stage_timer, CACHE_REQUESTS
+from utils.scoring import score_items, top_k
+from utils.model_state import legacy_model_version
+from src.logger import get_logger
 
-def hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5):
-    """Hybrid recommendation system that combines user-based and content-based filtering"""
-    
-    try:
-        ## User Recommendation
-        # Fix for find_similar_users
-        user_weights = joblib.load(USER_WEIGHTS_PATH)
-        user2user_encoded = joblib.load(USER2USER_ENCODED)
-        user2user_decoded = joblib.load(USER2USER_DECODED)
-        
-        try:
-            encoded_index = user2user_encoded.get(user_id)
-            if encoded_index is None:
-                print(f"User ID {user_id} not found in encoded mapping")
-                return []
-                
-            # FIX: Ensure weights[encoded_index] is 1D for dot product
-            user_vector = user_weights[encoded_index]
-            if len(user_vector.shape) > 1:  # If it has extra dimensions
-                user_vector = user_vector.reshape(-1)  # Flatten to 1D
-                
-            dists = np.dot(user_weights, user_vector)
-            
-            # Continue with the rest of the similar users logic
-            sorted_dists = np.argsort(dists)
-            n = 11  # n+1 as in the original function
-            closest = sorted_dists[-n:]
-            
-            SimilarityArr = []
-            for close in closest:
-                similarity = dists[close]
-                if isinstance(user_id, int):
-                    decoded_id = user2user_decoded.get(close)
-                    SimilarityArr.append({
-                        "similar_users": decoded_id,
-                        "similarity": similarity
-                    })
-            
-            similar_users = pd.DataFrame(SimilarityArr).sort_values(by="similarity", ascending=False)
-            similar_users = similar_users[similar_users.similar_users != user_id]
-            
-        except Exception as e:
-            print(f"Error in finding similar users: {str(e)}")
-            return []
-            
-        # Get user preferences and recommendations
+logger = get_logger(__name__)
+
+def precomputed_recommendation(user_id, model_version=None):
+    """
+    Hybrid recommendations for ``user_id`` from the batch store, or None when
+    the store is missing, was built for another model version, or doesn't
+    cover the user.
+
+    - **model_version**: version of the model being served; without it, the
+      version of the pickled weights, and a miss when they are missing
+    """
+    with stage_timer("hybrid", "store_lookup"):
+        if not os.path.exists(RECOMMENDATION_STORE):
+            return None
+        if model_version is None:
+            try:
+                model_version = legacy_model_version()
+            except OSError:
+                return None
+        store = load_recommendation_store(RECOMMENDATION_STORE)
+        if store.model_version is None or store.model_version != model_version:
+            CACHE_REQUESTS.inc(cache="precomputed", result="stale")
+            return None
+        recommendations = store.get(user_id)
+    CACHE_REQUESTS.inc(cache="precomputed", result="miss" if recommendations is None else "hit")
+    return recommendations
+
+############# HYBRID STAGES
+# hybrid_recommendation split into its stages, so a caller with a time
+# budget can run them one by one and stop with a partial result. Stages
+# raise on failure instead of returning empty results.
+#
+# The API passes its ModelState as ``state``, so the stages read the
+# generation it is serving (bundle or pickles, swapped on reload) and no
+# second copy of the embeddings, encoders or ratings is loaded. Without a
+# state (Flask, the batch job) they read the artifact files through the
+# cached helpers.
+
+def _anime_id(state, name):
+    """Anime ID for a display name, as getAnimeFrame resolves it."""
+    anime_id = state.title_index.resolve(name)
+    if anime_id is None:
+        raise ValueError(f"Anime {name} not found")
+    return anime_id
+
+def _anime_names(state, anime_ids):
+    """English titles of ``anime_ids`` in order, skipping anime without metadata."""
+    frame = state.anime_df.drop_duplicates("anime_id")
+    positions = pd.Index(frame["anime_id"]).get_indexer(np.asarray(anime_ids, dtype=np.int64))
+    return frame["eng_version"].to_numpy()[positions[positions >= 0]].tolist()
+
+def _table_neighbours(state, table, name, n=10):
+    neighbour_ids, _ = table.lookup(_anime_id(state, name), n)
+    return _anime_names(state, neighbour_ids)
+
+def similar_users_stage(user_id, n=10, state=None):
+    """The ``n`` users closest to ``user_id`` in embedding space (similar_users, similarity)."""
+    with stage_timer("hybrid", "load"):
+        if state is not None:
+            user_weights, user2user_encoded, user2user_decoded = state.user_weights, state.user2user_encoded, state.user2user_decoded
+        else:
+            user_weights = embedding_weights("user", USER_WEIGHTS_PATH)
+            user2user_encoded = load_artifact(USER2USER_ENCODED)
+            user2user_decoded = load_artifact(USER2USER_DECODED)
+
+    with stage_timer("hybrid", "similar_users"):
+        encoded_index = user2user_encoded.get(user_id)
+        if encoded_index is None:
+            raise KeyError(f"User ID {user_id} not found in encoded mapping")
+
+        # n+1 as in find_similar_users, the user itself is dropped below
+        if state is not None:
+            dists = score_items(user_weights, encoded_index)
+            closest = top_k(dists, n + 1)
+            similarities = dists[closest]
+        else:
+            # Sharded across worker processes when SCORING_SHARDS > 1
+            closest, similarities = nearest_rows("user", user_weights, encoded_index, n + 1)
+
+        SimilarityArr = []
+        for close, similarity in zip(closest, similarities):
+            if isinstance(user_id, int):
+                decoded_id = user2user_decoded[int(close)]
+                SimilarityArr.append({
+                    "similar_users": int(decoded_id),
+                    "similarity": similarity
+                })
+
+        similar_users = pd.DataFrame(SimilarityArr).sort_values(by="similarity", ascending=False)
+        return similar_users[similar_users.similar_users != user_id]
+
+def user_stage(user_id, similar_users, state=None):
+    """Names of the anime the similar users liked and ``user_id`` hasn't rated highly."""
+    if state is not None:
+        if state.ratings is None:
+            raise FileNotFoundError(f"No ratings at {RATING_DF} for the user stage")
+        rating_df, df = state.ratings.get(), state.anime_df
+        with stage_timer("hybrid", "user_preferences"):
+            user_pref = user_preferences(user_id, rating_df, df)
+        with stage_timer("hybrid", "user_recommendations"):
+            counts = user_recommendation_counts(similar_users, user_pref, rating_df, df)
+        return [name for name in counts.index if isinstance(name, str)]
+
+    with stage_timer("hybrid", "user_preferences"):
         user_pref = get_user_preferences(user_id, RATING_DF, DF)
+    with stage_timer("hybrid", "user_recommendations"):
         user_recommended_animes = get_user_recommendations(similar_users, user_pref, DF, SYNOPSIS_DF, RATING_DF)
-        
-        user_recommended_anime_list = user_recommended_animes["anime_name"].tolist()
-        
-        #### Content recommendation
+    return user_recommended_animes["anime_name"].tolist()
+
+def _similar_anime_names(state, name, n=10):
+    """find_similar_animes on the model state: the ``n`` nearest anime of ``name`` in embedding space."""
+    anime_id = state.title_index.resolve(name, accept=lambda a: a in state.anime2anime_encoded)
+    if anime_id is None:
+        raise ValueError(f"Encoded index not found for anime {name}")
+    encoded_index = state.anime2anime_encoded[anime_id]
+    closest = top_k(score_items(state.anime_weights, encoded_index), n, exclude=[encoded_index])
+    closest = closest[state.metadata.known[closest]]
+    return state.metadata.names[closest].tolist()
+
+def content_stage(user_recommended_anime_list, text_weight=0.6, state=None):
+    """Embedding neighbours and, if ``text_weight`` > 0, synopsis neighbours of the user-based picks."""
+    with stage_timer("hybrid", "content"):
         content_recommended_animes = []
-        
+
         for anime in user_recommended_anime_list:
             try:
-                similar_animes = find_similar_animes(anime, ANIME_WEIGHTS_PATH, ANIME2ANIME_ENCODED, ANIME2ANIME_DECODED, DF)
-                
-                if similar_animes is not None and not similar_animes.empty:
-                    content_recommended_animes.extend(similar_animes["name"].tolist())
+                if state is not None:
+                    similar_names = _similar_anime_names(state, anime)
+                else:
+                    similar_animes = find_similar_animes(anime, ANIME_WEIGHTS_PATH, ANIME2ANIME_ENCODED, ANIME2ANIME_DECODED, DF)
+                    similar_names = similar_animes["name"].tolist() if similar_animes is not None else []
+
+                if similar_names:
+                    content_recommended_animes.extend(similar_names)
                 else:
-                    print(f"No similar anime found {anime}")
+                    logger.info(f"No similar anime found {anime}")
             except Exception as e:
-                print(f"Error finding similar anime for {anime}: {str(e)}")
+                logger.warning(f"Error finding similar anime for {anime}: {str(e)}")
                 # Continue to the next anime instead of failing
                 continue
-        
+
+        text_recommended_animes = []
+        if text_weight > 0 and (state is None or state.content_neighbours is not None):
+            for anime in user_recommended_anime_list:
+                try:
+                    if state is not None:
+                        text_recommended_animes.extend(_table_neighbours(state, state.content_neighbours, anime))
+                    else:
+                        text_recommended_animes.extend(find_table_neighbours(anime, CONTENT_NEIGHBOURS, DF))
+                except Exception as e:
+                    logger.warning(f"Error finding content neighbours for {anime}: {str(e)}")
+                    continue
+
+    return content_recommended_animes, text_recommended_animes
+
+def cooccurrence_stage(user_recommended_anime_list, state=None):
+    """Anime most often rated by the same users as the user-based picks, from the precomputed co-occurrence table."""
+    with stage_timer("hybrid", "cooccurrence"):
+        cooccurrence_recommended_animes = []
+        if state is not None and state.cooccurrence_neighbours is None:
+            return cooccurrence_recommended_animes
+        for anime in user_recommended_anime_list:
+            try:
+                if state is not None:
+                    cooccurrence_recommended_animes.extend(_table_neighbours(state, state.cooccurrence_neighbours, anime))
+                else:
+                    cooccurrence_recommended_animes.extend(find_table_neighbours(anime, COOCCURRENCE_NEIGHBOURS, DF))
+            except Exception as e:
+                logger.warning(f"Error finding co-occurrence neighbours for {anime}: {str(e)}")
+                continue
+
+    return cooccurrence_recommended_animes
+
+def combine_stage(user_recommended_anime_list, content_recommended_animes=(), text_recommended_animes=(),
+                  user_weight=0.5, content_weight=0.5, text_weight=0.6, n=10,
+                  cooccurrence_recommended_animes=(), cooccurrence_weight=0.6):
+    """Weighted vote over the candidates of every stage, best ``n`` first."""
+    with stage_timer("hybrid", "combine"):
         combined_scores = {}
-        
+
         for anime in user_recommended_anime_list:
             combined_scores[anime] = combined_scores.get(anime, 0) + user_weight
-        
+
         for anime in content_recommended_animes:
             combined_scores[anime] = combined_scores.get(anime, 0) + content_weight
-        
+
+        for anime in text_recommended_animes:
+            combined_scores[anime] = combined_scores.get(anime, 0) + content_weight * text_weight
+
+        for anime in cooccurrence_recommended_animes:
+            combined_scores[anime] = combined_scores.get(anime, 0) + content_weight * cooccurrence_weight
+
         sorted_animes = sorted(combined_scores.items(), key=lambda x:x[1], reverse=True)
-        
-        return [anime for anime, score in sorted_animes[:10]]
+
+    return [anime for anime, score in sorted_animes[:n]]
+
+def hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5, text_weight=0.6, cooccurrence_weight=0.6,
+                          raise_errors=False, state=None):
+    """
+    Hybrid recommendation system that combines user-based and content-based filtering.
+
+    Content candidates come from the anime embeddings and, when the content
+    stage has run, from the precomputed synopsis neighbours, which count
+    ``text_weight`` times as much as an embedding neighbour. Neighbours from
+    the rating co-occurrence table, when the cooccurrence stage has run,
+    count ``cooccurrence_weight`` times as much.
+
+    Errors give an empty list, or are raised with ``raise_errors``. ``state``
+    is the API's ModelState, as for the stages.
+    """
+    
+    try:
+        similar_users = similar_users_stage(user_id, state=state)
+        user_recommended_anime_list = user_stage(user_id, similar_users, state=state)
+        content_recommended_animes, text_recommended_animes = content_stage(user_recommended_anime_list, text_weight, state=state)
+        cooccurrence_recommended_animes = cooccurrence_stage(user_recommended_anime_list, state=state) if cooccurrence_weight > 0 else []
+        return combine_stage(user_recommended_anime_list, content_recommended_animes, text_recommended_animes,
+                             user_weight, content_weight, text_weight,
+                             cooccurrence_recommended_animes=cooccurrence_recommended_animes,
+                             cooccurrence_weight=cooccurrence_weight)
     
     except Exception as e:
-        print(f"Error in hybrid_recommendation: {str(e)}")
+        if raise_errors:
+            raise
+        logger.error(f"Error in hybrid_recommendation: {str(e)}")
         # Return a default/fallback recommendation or empty list
         return []
@@ -1,12 +1,39 @@
 from utils.common_functions import read_yaml
 from config.paths_config import *
-from src.data_processing import DataProcessor
-from src.model_training import ModelTraining
+
+# Stage modules are imported as each stage starts, so a failure in an early
+# stage doesn't wait on TensorFlow and friends being imported
 
 if __name__=="__main__":
+    from src.data_processing import DataProcessor
     data_processor = DataProcessor(ANIMELIST_CSV,PROCESSED_DIR)
     data_processor.run()
 
-    model_trainer = ModelTraining(PROCESSED_DIR)
-    model_trainer.train_model()
+    from src.content_similarity import ContentSimilarity
+    content_similarity = ContentSimilarity(CONFIG_PATH)
+    content_similarity.run()
+
+    from src.item_cooccurrence import ItemCooccurrence
+    item_cooccurrence = ItemCooccurrence(CONFIG_PATH)
+    item_cooccurrence.run()
+
+    training = read_yaml(CONFIG_PATH).get("training", {})
+    if training.get("num_workers", 1) > 1:
+        from src.distributed_training import DistributedTraining
+        DistributedTraining(training["num_workers"], syncs_per_epoch=training.get("syncs_per_epoch", 4)).run()
+    else:
+        from src.model_training import ModelTraining
+        model_trainer = ModelTraining(PROCESSED_DIR)
+        model_trainer.train_model()
+
+    from src.model_evaluation import ModelEvaluation
+    model_evaluation = ModelEvaluation(CONFIG_PATH)
+    model_evaluation.run()
+
+    from src.model_export import ModelExport
+    model_export = ModelExport()
+    model_export.run()
 
+    from src.batch_recommendation import BatchRecommendation
+    batch_recommendation = BatchRecommendation(CONFIG_PATH)
+    batch_recommendation.run()
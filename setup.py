@@ -9,4 +9,6 @@ setup(
     author="Bilal",
     packages=find_packages(),
     install_requires = requirements,
+    # Optional MessagePack responses for clients sending Accept: application/msgpack
+    extras_require = {"msgpack": ["msgpack"]},
 )
\ No newline at end of file
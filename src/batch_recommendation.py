@@ -0,0 +1,100 @@
+import os
+import time
+import joblib
+from concurrent.futures import ProcessPoolExecutor
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.common_functions import read_yaml
+from utils.model_state import legacy_model_version
+from utils.recommendation_store import RecommendationStoreWriter
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+
+def _recommend_chunk(user_ids):
+    """
+    Hybrid recommendations for a chunk of users, and the number of users that
+    failed; artifacts are cached per worker process. Failed users are left
+    out of the store, so serving computes them live instead of serving [].
+    """
+    from pipeline.prediction_pipeline import hybrid_recommendation
+
+    rows, failed = [], 0
+    for user_id in user_ids:
+        try:
+            rows.append((user_id, hybrid_recommendation(user_id, raise_errors=True)))
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Skipping user {user_id}: {e}")
+    return rows, failed
+
+
+class BatchRecommendation:
+    """
+    Offline stage: run the hybrid recommender for every known user and
+    store the results, tagged with the model version, so serving is a
+    key lookup instead of a multi-second live computation.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH):
+        try:
+            self.config = read_yaml(config_path)["batch_recommendation"]
+            self.chunk_size = self.config["chunk_size"]
+            self.n_workers = self.config["n_workers"]
+            self.max_users = self.config.get("max_users")
+            logger.info("Batch Recommendation initialized")
+        except Exception as e:
+            raise CustomException("Error loading batch recommendation configuration", e)
+
+    def load_users(self):
+        try:
+            user_ids = [int(user_id) for user_id in joblib.load(USER2USER_ENCODED)]
+            if self.max_users:
+                user_ids = user_ids[:self.max_users]
+            logger.info(f"Precomputing recommendations for {len(user_ids)} users")
+            return user_ids
+        except Exception as e:
+            raise CustomException("Failed to load users", e)
+
+    def run(self):
+        writer = None
+        try:
+            start = time.perf_counter()
+            model_version = legacy_model_version()
+            user_ids = self.load_users()
+            chunks = [user_ids[i:i + self.chunk_size] for i in range(0, len(user_ids), self.chunk_size)]
+
+            os.makedirs(os.path.dirname(RECOMMENDATION_STORE), exist_ok=True)
+            writer = RecommendationStoreWriter(RECOMMENDATION_STORE, model_version)
+            failed = 0
+
+            if self.n_workers > 1 and len(chunks) > 1:
+                with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                    results = executor.map(_recommend_chunk, chunks)
+                    for done, (rows, chunk_failed) in enumerate(results, start=1):
+                        writer.put_many(rows)
+                        failed += chunk_failed
+                        logger.info(f"Stored chunk {done}/{len(chunks)}")
+            else:
+                for done, chunk in enumerate(chunks, start=1):
+                    rows, chunk_failed = _recommend_chunk(chunk)
+                    writer.put_many(rows)
+                    failed += chunk_failed
+                    logger.info(f"Stored chunk {done}/{len(chunks)}")
+
+            elapsed = time.perf_counter() - start
+            writer.close(created_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), seconds=round(elapsed, 1), failed_users=failed)
+            logger.info(f"Recommendations for {writer.count} users ({model_version}) saved to {RECOMMENDATION_STORE} in {elapsed:.1f}s")
+            if failed:
+                logger.warning(f"{failed} users failed and are left to live computation")
+        except Exception as e:
+            if writer is not None:
+                writer.abort()
+            logger.error(str(e))
+            raise CustomException("Error precomputing recommendations", e)
+
+
+if __name__=="__main__":
+    batch_recommendation = BatchRecommendation(CONFIG_PATH)
+    batch_recommendation.run()
@@ -0,0 +1,90 @@
+import os
+import numpy as np
+import pandas as pd
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.common_functions import read_yaml
+from utils.neighbour_table import NeighbourTable, sparse_top_k
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+def _split_genres(genres):
+    return [g.strip().lower() for g in genres.split(",") if g.strip()]
+
+
+class ContentSimilarity:
+    """
+    Offline stage: sparse TF-IDF over synopses and genres, then the top-K
+    most similar anime of every anime by cosine similarity.
+
+    The similarity matrix is never materialized: ``sparse_top_k`` reduces
+    row blocks of the sparse product to their top-K across a process pool.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH):
+        try:
+            self.config = read_yaml(config_path)["content_similarity"]
+            self.top_k = self.config["top_k"]
+            self.block_size = self.config["block_size"]
+            self.n_workers = self.config["n_workers"]
+            self.max_features = self.config["max_features"]
+            self.min_df = self.config["min_df"]
+            self.genre_weight = self.config["genre_weight"]
+            logger.info("Content Similarity initialized")
+        except Exception as e:
+            raise CustomException("Error loading content similarity configuration", e)
+
+    def load_data(self):
+        try:
+            synopsis_df = pd.read_csv(SYNOPSIS_DF).drop_duplicates("MAL_ID").reset_index(drop=True)
+            synopsis_df["sypnopsis"] = synopsis_df["sypnopsis"].fillna("").astype(str)
+            synopsis_df["Genres"] = synopsis_df["Genres"].fillna("").astype(str).replace("Unknown", "")
+            logger.info(f"Loaded {len(synopsis_df)} synopses for Content Similarity")
+            return synopsis_df
+        except Exception as e:
+            raise CustomException("Failed to load synopsis data", e)
+
+    def build_features(self, synopsis_df):
+        """
+        L2-normalized [sqrt(1-w) * synopsis TF-IDF, sqrt(w) * genre TF-IDF],
+        so a dot product is the genre-weighted blend of both cosines.
+        """
+        from scipy import sparse
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.preprocessing import normalize
+
+        text = TfidfVectorizer(stop_words="english", max_features=self.max_features, min_df=self.min_df,
+                               sublinear_tf=True, dtype=np.float32).fit_transform(synopsis_df["sypnopsis"])
+        genres = TfidfVectorizer(tokenizer=_split_genres, token_pattern=None, lowercase=False,
+                                 dtype=np.float32).fit_transform(synopsis_df["Genres"])
+        features = sparse.hstack([
+            normalize(text) * np.sqrt(1 - self.genre_weight),
+            normalize(genres) * np.sqrt(self.genre_weight),
+        ]).tocsr()
+        logger.info(f"Built features: {features.shape[0]} anime x {features.shape[1]} terms, {features.nnz} non-zeros")
+        return normalize(features).astype(np.float32)
+
+    def compute_neighbours(self, features):
+        # Rows are L2-normalized, so the dot product is the cosine
+        return sparse_top_k(features, self.top_k, self.block_size, self.n_workers)
+
+    def run(self):
+        try:
+            synopsis_df = self.load_data()
+            features = self.build_features(synopsis_df)
+            neighbours, scores = self.compute_neighbours(features)
+
+            table = NeighbourTable(synopsis_df["MAL_ID"].to_numpy(), neighbours, scores)
+            os.makedirs(os.path.dirname(CONTENT_NEIGHBOURS), exist_ok=True)
+            table.save(CONTENT_NEIGHBOURS)
+            logger.info(f"Top-{table.k} content neighbours of {len(table)} anime saved to {CONTENT_NEIGHBOURS}")
+            return table
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error computing content neighbours", e)
+
+
+if __name__=="__main__":
+    content_similarity = ContentSimilarity(CONFIG_PATH)
+    content_similarity.run()
@@ -1,6 +1,6 @@
 import os
-import pandas as pd
-from google.cloud import storage
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from src.logger import get_logger
 from src.custom_exception import CustomException
 
@@ -9,38 +9,187 @@ from config.paths_config import *
 
 logger = get_logger(__name__)
 
+CHUNK_SIZE = 8 * 1024 * 1024
+# Written next to each completed file: the source size, generation and row limit it was
+# downloaded with; next to a partial file, the source it was started from
+MANIFEST_SUFFIX = ".ingest.json"
+
+
+class LocalStorage:
+    """Storage backend over a local directory that stands in for the bucket."""
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def size(self, name):
+        return os.path.getsize(os.path.join(self.root_dir, name))
+
+    def generation(self, name):
+        """Changes whenever the file is rewritten."""
+        return os.stat(os.path.join(self.root_dir, name)).st_mtime_ns
+
+    def iter_chunks(self, name, start=0, chunk_size=CHUNK_SIZE, generation=None):
+        with open(os.path.join(self.root_dir, name), "rb") as f:
+            f.seek(start)
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                yield chunk
+
+
+class GCSStorage:
+    """Google Cloud Storage backend; the client library is imported on first use."""
+
+    def __init__(self, bucket_name):
+        from google.cloud import storage
+
+        self.bucket = storage.Client().bucket(bucket_name)
+
+    def _blob(self, name):
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            raise FileNotFoundError(f"{name} not found in bucket {self.bucket.name}")
+        return blob
+
+    def size(self, name):
+        return self._blob(name).size
+
+    def generation(self, name):
+        """Object generation, new for every upload of ``name``."""
+        return self._blob(name).generation
+
+    def iter_chunks(self, name, start=0, chunk_size=CHUNK_SIZE, generation=None):
+        # Pinned to ``generation`` so a concurrent upload can't change the bytes mid-download
+        with self.bucket.blob(name, generation=generation).open("rb", chunk_size=chunk_size) as f:
+            f.seek(start)
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                yield chunk
+
+
+def get_storage(config):
+    backend = config.get("backend", "gcs")
+    if backend == "gcs":
+        return GCSStorage(config["bucket_name"])
+    if backend == "local":
+        return LocalStorage(config["local_dir"])
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
 class DataIngestion:
-    def __init__(self, config):
+    def __init__(self, config, storage=None):
 
         self.config = config['data_ingestion']
         self.bucket_name = self.config['bucket_name']
         self.file_names= self.config['bucket_file_name']
+        self.row_limits = self.config.get('row_limits', {})
+        self.max_workers = self.config.get('max_workers', len(self.file_names))
+        self.storage = storage
 
-        
-        
         os.makedirs(RAW_DIR, exist_ok=True)
         logger.info(f"Created directory {RAW_DIR} for storing raw data")
 
+    @staticmethod
+    def count_lines(path):
+        lines = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                lines += chunk.count(b"\n")
+        return lines
+
+    @staticmethod
+    def read_manifest(file_path):
+        try:
+            with open(file_path + MANIFEST_SUFFIX) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def source(self, file_name):
+        """What identifies the current version of an object: its size and generation."""
+        return {"source_bytes": self.storage.size(file_name), "generation": self.storage.generation(file_name)}
+
+    def is_complete(self, file_path, source, row_limit):
+        """True when ``file_path`` is the finished download of the ``source`` object with the same row limit."""
+        if not os.path.exists(file_path):
+            return False
+        manifest = self.read_manifest(file_path)
+        if manifest is not None:
+            return manifest == {**source, "row_limit": row_limit}
+        # Files downloaded before manifests were written: only a full copy can be recognised
+        return row_limit is None and os.path.getsize(file_path) == source["source_bytes"]
+
+    def download_file(self, file_name):
+        """
+        Stream one object into RAW_DIR.
+
+        Bytes go to ``<file>.part`` and the file is renamed once complete, so
+        an interrupted download resumes from the size of the partial file.
+        The partial file's manifest records the size and generation of the
+        object it was started from, and a partial file of any other version
+        is discarded, so bytes of two versions are never joined. With a row
+        limit the stream stops after the header plus that many rows, so the
+        file is truncated while downloading instead of being written, parsed
+        and rewritten. A manifest records the source and row limit of every
+        finished file, so it is only downloaded again when either changes.
+        """
+        file_path = os.path.join(RAW_DIR, file_name)
+        part_path = file_path + ".part"
+        row_limit = self.row_limits.get(file_name)
+
+        source = self.source(file_name)
+        if self.is_complete(file_path, source, row_limit):
+            logger.info(f"{file_name} already downloaded, skipping")
+            return file_path
+
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and self.read_manifest(part_path) != source:
+            logger.info(f"{file_name} changed since the partial download, starting again")
+            offset = 0
+            os.remove(part_path)
+        # Lines still allowed: the header plus row_limit rows
+        remaining = None if row_limit is None else row_limit + 1
+        if offset and remaining is not None:
+            remaining -= self.count_lines(part_path)
+            if remaining < 0:
+                # Left over from a run with a higher limit: start again
+                offset, remaining = 0, row_limit + 1
+                os.remove(part_path)
+        if offset:
+            logger.info(f"Resuming {file_name} from byte {offset}")
+        else:
+            with open(part_path + MANIFEST_SUFFIX, "w") as f:
+                json.dump(source, f)
+
+        with open(part_path, "ab") as out:
+            if remaining is None or remaining > 0:
+                for chunk in self.storage.iter_chunks(file_name, start=offset, generation=source["generation"]):
+                    if remaining is not None:
+                        newlines = chunk.count(b"\n")
+                        if newlines >= remaining:
+                            cut = -1
+                            for _ in range(remaining):
+                                cut = chunk.index(b"\n", cut + 1)
+                            out.write(chunk[:cut + 1])
+                            break
+                        remaining -= newlines
+                    out.write(chunk)
+
+        if os.path.exists(file_path + MANIFEST_SUFFIX):
+            os.remove(file_path + MANIFEST_SUFFIX)
+        os.replace(part_path, file_path)
+        with open(file_path + MANIFEST_SUFFIX, "w") as f:
+            json.dump({**source, "row_limit": row_limit}, f)
+        os.remove(part_path + MANIFEST_SUFFIX)
+        logger.info(f"Downloaded {file_name} to {file_path}")
+        return file_path
+
     def download_csv_from_gcp(self):
         try:
-            client = storage.Client()
-            bucket = client.bucket(self.bucket_name)
-            
-            for file_name in self.file_names:
-                file_path=os.path.join(RAW_DIR, file_name)
-                if file_name== "animelist.csv":
-                    blob = bucket.blob(file_name)
-                    blob.download_to_filename(file_path)
-
-                    data =pd.read_csv(file_path, nrows=5000000)
-                    data.to_csv(file_path, index=False)
-
-                    logger.info(f"Downloaded {file_name} from GCP to {file_path}")    
-                
-                else:
-                    blob = bucket.blob(file_name)
-                    blob.download_to_filename(file_path)
-                    logger.info(f"Downloaded {file_name} from GCP to {file_path}")
+            if self.storage is None:
+                self.storage = get_storage(self.config)
+
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                futures = {executor.submit(self.download_file, name): name for name in self.file_names}
+                for future in as_completed(futures):
+                    future.result()
 
         except Exception as e:
             logger.error("Error while downloading CSV files from GCP")
@@ -64,6 +213,6 @@ if __name__ == "__main__":
         data_ingestion.run()
     except Exception as e:
         logger.error("Error in main function of data ingestion")
-        raise CustomException("Failed to run data ingestion", e)            
+        raise CustomException("Failed to run data ingestion", e)
+
 
-        
\ No newline at end of file
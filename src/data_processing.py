@@ -5,6 +5,7 @@ import joblib
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
+from utils.scoring import popularity_table
 import sys
 
 logger = get_logger(__name__)
@@ -20,6 +21,7 @@ class DataProcessor:
         self.X_test_array = None
         self.y_train = None
         self.y_test = None
+        self.user_holdout = None
 
         self.user2user_encoded = {}
         self.user2user_decoded = {}
@@ -73,13 +75,34 @@ class DataProcessor:
         except Exception as e:
             raise CustomException("Failed to encode data",sys)
     
-    def split_data(self, test_size=1000 , random_state=43):
+    def split_data(self, test_size=1000 , random_state=43, holdout_users=1000, holdout_frac=0.2):
         try:
             self.rating_df = self.rating_df.sample(frac=1,random_state=43).reset_index(drop=True)
-            X = self.rating_df[["user","anime"]].values
-            y = self.rating_df["rating"]
 
-            train_indices = self.rating_df.shape[0] - test_size
+            ### User-level holdout for ranking evaluation
+            # A fraction of the interactions of a sample of users is kept out of
+            # training entirely so recall/NDCG can be measured on unseen items.
+            users = self.rating_df["user"].unique()
+            rng = np.random.default_rng(random_state)
+            eval_users = rng.choice(users, size=min(holdout_users, len(users)), replace=False)
+
+            is_eval_user = self.rating_df["user"].isin(eval_users)
+            position = self.rating_df.groupby("user").cumcount()
+            n_user_ratings = self.rating_df.groupby("user")["user"].transform("size")
+            holdout_mask = (is_eval_user & (position < np.ceil(n_user_ratings * holdout_frac))).values
+
+            holdout = self.rating_df[holdout_mask]
+            self.user_holdout = {
+                "user" : holdout["user"].values,
+                "anime" : holdout["anime"].values,
+                "rating" : holdout["rating"].values,
+            }
+            remaining = self.rating_df[~holdout_mask]
+
+            X = remaining[["user","anime"]].values
+            y = remaining["rating"]
+
+            train_indices = remaining.shape[0] - test_size
 
             X_train , X_test , y_train , y_test = (
                     X[:train_indices],
@@ -92,7 +115,7 @@ class DataProcessor:
             self.y_train = y_train
             self.y_test = y_test
 
-            logger.info("Data splitted sucesfullyy")
+            logger.info(f"Data splitted sucesfullyy, {holdout.shape[0]} ratings of {len(eval_users)} users held out for evaluation")
 
         except Exception as e:
             raise CustomException("Failed to split data",sys)
@@ -114,8 +137,11 @@ class DataProcessor:
             joblib.dump(self.X_test_array , X_TEST_ARRAY)
             joblib.dump(self.y_train , Y_TRAIN)
             joblib.dump(self.y_test , Y_TEST)
+            joblib.dump(self.user_holdout , USER_HOLDOUT)
 
             self.rating_df.to_csv(RATING_DF , index=False)
+            # Small precomputed table so serving never has to load the full ratings
+            popularity_table(self.rating_df).to_csv(POPULARITY_DF , index=False)
 
             logger.info("ALl the training testing data as well as rating_df is saved now..")
         except Exception as e:
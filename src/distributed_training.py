@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import multiprocessing as mp
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.model_training import ModelTraining, lrfn, BATCH_SIZE, EPOCHS
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+EMBEDDING_LAYERS = ("user_embedding", "anime_embedding")
+
+
+def shard_rows(n_rows, worker_index, num_workers):
+    """Strided shard of the training rows; every worker gets the same number of rows."""
+    n_rows = (n_rows // num_workers) * num_workers
+    return np.arange(worker_index, n_rows, num_workers)
+
+
+def _worker_main(conn, worker_index, num_workers, syncs_per_epoch, threads):
+    """
+    Training worker: holds one shard of the training arrays and, for every
+    synchronisation round, trains on its next chunk starting from the
+    weights sent by the coordinator and sends the updated weights back.
+    """
+    try:
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+
+        trainer = ModelTraining(PROCESSED_DIR, track=False)
+        X_train_array, _, y_train, _ = trainer.load_data()
+        rows = shard_rows(len(y_train), worker_index, num_workers)
+        users = np.asarray(X_train_array[0])[rows]
+        anime = np.asarray(X_train_array[1])[rows]
+        y = np.asarray(y_train)[rows]
+        chunks = np.array_split(np.arange(len(rows)), syncs_per_epoch)
+
+        model = trainer.build_model()
+        conn.send(("ready",))
+
+        # Same number of optimizer steps per epoch as single-process training
+        batch_size = max(1, BATCH_SIZE // num_workers)
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            _, epoch, sync_round, weights = message
+
+            chunk = chunks[sync_round]
+            model.set_weights(weights)
+            model.optimizer.learning_rate.assign(lrfn(epoch))
+            history = model.fit(
+                x=[users[chunk], anime[chunk]],
+                y=y[chunk],
+                batch_size=batch_size,
+                epochs=1,
+                verbose=0,
+            )
+            conn.send(("weights", history.history["loss"][-1], len(chunk), model.get_weights()))
+    except Exception as e:
+        conn.send(("error", f"worker {worker_index}: {e}"))
+    finally:
+        conn.close()
+
+
+class DistributedTraining:
+    """
+    Data-parallel training on one machine with parameter averaging.
+
+    ``num_workers`` local processes each hold a shard of the training arrays.
+    Every epoch is split into ``syncs_per_epoch`` rounds; in each round every
+    worker trains on its next chunk from the same starting weights and the
+    coordinator merges the updates. Dense parameters are averaged; embedding
+    rows are averaged only over the workers that changed them in that round,
+    so a row updated by a single worker keeps its full update. A row counts
+    as changed whether a gradient or the optimizer's momentum moved it, so
+    rows moved only by momentum are averaged like any other.
+
+    The coordinator validates after every epoch, applies the same early
+    stopping and checkpointing rules as ``ModelTraining.train_model`` and
+    saves the artifacts through ``ModelTraining.save_model_weights``, so the
+    outputs are the same files as single-process training.
+    """
+
+    def __init__(self, num_workers, syncs_per_epoch=4, patience=3, threads_per_worker=None):
+        self.num_workers = num_workers
+        self.syncs_per_epoch = syncs_per_epoch
+        self.patience = patience
+        # Split the cores between workers so they do not oversubscribe the CPU
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+
+    def start_workers(self):
+        context = mp.get_context("spawn")
+        self.connections, self.processes = [], []
+        for index in range(self.num_workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child_conn, index, self.num_workers, self.syncs_per_epoch, self.threads_per_worker),
+                daemon=True,
+            )
+            process.start()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+    def receive(self, conn):
+        message = conn.recv()
+        if message[0] == "error":
+            raise RuntimeError(message[1])
+        return message
+
+    def stop_workers(self):
+        for conn in self.connections:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+    def embedding_indices(self, model):
+        """Map embedding layer name -> index of its matrix in ``model.get_weights()``."""
+        variable_ids = [id(v) for v in model.weights]
+        return {layer_name: variable_ids.index(id(model.get_layer(layer_name).embeddings))
+                for layer_name in EMBEDDING_LAYERS}
+
+    def merge(self, weights, worker_weights, embedding_indices):
+        merged = []
+        for i, current in enumerate(weights):
+            deltas = [w[i] - current for w in worker_weights]
+            delta = np.sum(deltas, axis=0)
+            if i in embedding_indices:
+                # Number of workers that moved each row
+                changed = np.sum([np.any(d != 0, axis=1) for d in deltas], axis=0)
+                merged.append(current + delta / np.maximum(changed, 1)[:, None])
+            else:
+                merged.append(current + delta / len(worker_weights))
+        return merged
+
+    def run(self):
+        trainer = ModelTraining(PROCESSED_DIR)
+        try:
+            _, X_test_array, _, y_test = trainer.load_data()
+            model = trainer.build_model()
+
+            os.makedirs(os.path.dirname(CHECKPOINT_FILE_PATH), exist_ok=True)
+            os.makedirs(MODEL_DIR, exist_ok=True)
+            os.makedirs(WEIGHTS_DIR, exist_ok=True)
+
+            logger.info(f"Starting {self.num_workers} data-parallel training workers")
+            self.start_workers()
+            try:
+                for conn in self.connections:
+                    self.receive(conn)
+                embedding_indices = set(self.embedding_indices(model).values())
+
+                weights = model.get_weights()
+                best_val_loss, best_epoch, waited = np.inf, 0, 0
+                checkpointed = False
+                for epoch in range(EPOCHS):
+                    losses, sizes = [], []
+                    for sync_round in range(self.syncs_per_epoch):
+                        for conn in self.connections:
+                            conn.send(("train", epoch, sync_round, weights))
+                        results = [self.receive(conn) for conn in self.connections]
+                        weights = self.merge(weights, [r[3] for r in results], embedding_indices)
+                        losses.extend(r[1] for r in results)
+                        sizes.extend(r[2] for r in results)
+
+                    model.set_weights(weights)
+                    train_loss = float(np.average(losses, weights=sizes))
+                    val_loss = float(model.evaluate(X_test_array, y_test, batch_size=BATCH_SIZE, verbose=0)[0])
+                    logger.info(f"Epoch {epoch+1}/{EPOCHS} train_loss={train_loss:.4f} val_loss={val_loss:.4f}")
+
+                    trainer.experiment.log_metric('train_loss', train_loss, step=epoch)
+                    trainer.experiment.log_metric('val_loss', val_loss, step=epoch)
+
+                    # The first epoch is always saved, so there is a checkpoint even if val_loss is NaN
+                    if val_loss < best_val_loss or not checkpointed:
+                        best_val_loss, best_epoch, waited = val_loss, epoch, 0
+                        model.save_weights(CHECKPOINT_FILE_PATH)
+                        checkpointed = True
+                    else:
+                        waited += 1
+                        if waited >= self.patience:
+                            break
+            finally:
+                self.stop_workers()
+
+            if checkpointed:
+                model.load_weights(CHECKPOINT_FILE_PATH)
+            else:
+                logger.warning("No epoch was trained, saving the initial weights")
+            logger.info(f"Distributed training completed, best epoch {best_epoch+1} val_loss={best_val_loss:.4f}")
+
+            trainer.save_model_weights(model)
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during distributed model training", e)
+        finally:
+            trainer.experiment.close()
@@ -0,0 +1,218 @@
+import os
+import abc
+import json
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+
+class ExperimentTracker(abc.ABC):
+    """Interface shared by all tracking backends."""
+
+    @abc.abstractmethod
+    def log_metric(self, name, value, step=None):
+        pass
+
+    @abc.abstractmethod
+    def log_asset(self, file_path):
+        pass
+
+    @abc.abstractmethod
+    def log_parameters(self, params):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullTracker(ExperimentTracker):
+    """Backend that drops everything, for runs that should not be tracked."""
+
+    def log_metric(self, name, value, step=None):
+        pass
+
+    def log_asset(self, file_path):
+        pass
+
+    def log_parameters(self, params):
+        pass
+
+
+class LocalTracker(ExperimentTracker):
+    """
+    File based backend that works without network access.
+
+    Every run gets its own directory with ``metrics.jsonl``, ``params.json``
+    and an ``assets/`` folder holding copies of the logged files.
+    """
+
+    def __init__(self, root_dir=TRACKING_DIR, run_name=None):
+        self.run_name = run_name or datetime.now().strftime(f"run_%Y%m%d_%H%M%S_{os.getpid()}")
+        self.run_dir = os.path.join(root_dir, self.run_name)
+        self.assets_dir = os.path.join(self.run_dir, "assets")
+        os.makedirs(self.assets_dir, exist_ok=True)
+
+        self._metrics_file = open(os.path.join(self.run_dir, "metrics.jsonl"), "a")
+        logger.info(f"Local experiment tracking in {self.run_dir}")
+
+    def log_metric(self, name, value, step=None):
+        record = {"name": name, "value": float(value), "step": step, "timestamp": time.time()}
+        self._metrics_file.write(json.dumps(record) + "\n")
+        self._metrics_file.flush()
+
+    def log_asset(self, file_path):
+        shutil.copy2(file_path, os.path.join(self.assets_dir, os.path.basename(file_path)))
+
+    def log_parameters(self, params):
+        params_path = os.path.join(self.run_dir, "params.json")
+        existing = {}
+        if os.path.exists(params_path):
+            with open(params_path) as f:
+                existing = json.load(f)
+        existing.update(params)
+        with open(params_path, "w") as f:
+            json.dump(existing, f, indent=2, default=str)
+
+    def close(self):
+        self._metrics_file.close()
+
+
+class CometTracker(ExperimentTracker):
+    """
+    Comet ML backend; ``comet_ml`` is only imported when this backend is selected.
+
+    The Experiment, which talks to the Comet servers, is created on first
+    use, so behind an AsyncTracker that happens on the tracker thread rather
+    than the training thread. If it can't be created, events are dropped.
+    """
+
+    def __init__(self, project_name, workspace, api_key=None):
+        import comet_ml
+
+        self._comet_ml = comet_ml
+        self._settings = dict(api_key=api_key or os.environ.get("COMET_API_KEY"),
+                              project_name=project_name, workspace=workspace)
+        self._experiment = None
+        self._failed = False
+
+    @property
+    def experiment(self):
+        if self._experiment is None and not self._failed:
+            try:
+                self._experiment = self._comet_ml.Experiment(**self._settings)
+            except Exception as e:
+                self._failed = True
+                logger.warning(f"Comet experiment could not be created ({e}), events are dropped")
+        return self._experiment
+
+    def log_metric(self, name, value, step=None):
+        if self.experiment is not None:
+            self.experiment.log_metric(name, value, step=step)
+
+    def log_asset(self, file_path):
+        if self.experiment is not None:
+            self.experiment.log_asset(file_path)
+
+    def log_parameters(self, params):
+        if self.experiment is not None:
+            self.experiment.log_parameters(params)
+
+    def close(self):
+        if self._experiment is not None:
+            self._experiment.end()
+
+
+class AsyncTracker(ExperimentTracker):
+    """
+    Runs any backend on a background thread behind a bounded queue.
+
+    Logging calls only enqueue, so a slow or unreachable tracking service
+    never stalls training. Backend errors are logged and swallowed, and when
+    the queue is full new events are dropped (and counted) instead of blocking.
+    """
+
+    _STOP = object()
+
+    def __init__(self, backend, queue_size=10000, close_timeout=60):
+        self.backend = backend
+        self.close_timeout = close_timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._worker, name="experiment-tracker", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            method, args = item
+            try:
+                getattr(self.backend, method)(*args)
+            except Exception as e:
+                logger.warning(f"Experiment tracker {method} failed: {e}")
+
+    def _submit(self, method, *args):
+        try:
+            self._queue.put_nowait((method, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def log_metric(self, name, value, step=None):
+        self._submit("log_metric", name, value, step)
+
+    def log_asset(self, file_path):
+        self._submit("log_asset", file_path)
+
+    def log_parameters(self, params):
+        self._submit("log_parameters", dict(params))
+
+    def close(self):
+        """Flush pending events (bounded by ``close_timeout``) and close the backend."""
+        self._queue.put(self._STOP)
+        self._thread.join(self.close_timeout)
+        if self._thread.is_alive():
+            logger.warning("Experiment tracker did not flush before timeout, pending events are lost")
+            return
+        if self.dropped:
+            logger.warning(f"Experiment tracker dropped {self.dropped} events because its queue was full")
+        try:
+            self.backend.close()
+        except Exception as e:
+            logger.warning(f"Experiment tracker close failed: {e}")
+
+
+def get_tracker(config):
+    """Build the tracker described by the ``tracking`` section of config.yaml."""
+    try:
+        tracking = config.get("tracking", {})
+        backend_name = tracking.get("backend", "local")
+
+        if backend_name == "local":
+            backend = LocalTracker(tracking.get("local_dir", TRACKING_DIR))
+        elif backend_name == "comet":
+            try:
+                backend = CometTracker(
+                    project_name=tracking["project_name"],
+                    workspace=tracking["workspace"]
+                )
+            except Exception as e:
+                logger.warning(f"Comet tracking unavailable ({e}), falling back to local tracking")
+                backend = LocalTracker(tracking.get("local_dir", TRACKING_DIR))
+        elif backend_name == "none":
+            return NullTracker()
+        else:
+            raise ValueError(f"Unknown tracking backend: {backend_name}")
+
+        if tracking.get("async", True):
+            return AsyncTracker(backend, queue_size=tracking.get("queue_size", 10000))
+        return backend
+    except Exception as e:
+        raise CustomException("Failed to create experiment tracker", e)
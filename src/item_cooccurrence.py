@@ -0,0 +1,85 @@
+import os
+import numpy as np
+import pandas as pd
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.common_functions import read_yaml
+from utils.neighbour_table import NeighbourTable, sparse_top_k
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+class ItemCooccurrence:
+    """
+    Offline stage: item-item neighbours from the rating matrix alone.
+
+    Anime are compared by the users who rated them: the cosine of two
+    columns of the sparse user x anime matrix, shrunk towards 0 when few
+    users rated both. Needs no model, so a refresh takes minutes instead
+    of a retrain. The top-K is computed by ``sparse_top_k``, as in
+    ContentSimilarity.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH):
+        try:
+            self.config = read_yaml(config_path)["item_cooccurrence"]
+            self.top_k = self.config["top_k"]
+            self.block_size = self.config["block_size"]
+            self.n_workers = self.config["n_workers"]
+            self.weighting = self.config["weighting"]
+            self.shrinkage = self.config["shrinkage"]
+            if self.weighting not in ("rating", "binary"):
+                raise ValueError(f"Unknown weighting '{self.weighting}', expected 'rating' or 'binary'")
+            logger.info("Item Co-occurrence initialized")
+        except Exception as e:
+            raise CustomException("Error loading item co-occurrence configuration", e)
+
+    def load_data(self):
+        try:
+            rating_df = pd.read_csv(RATING_DF, usecols=["anime_id", "rating", "user", "anime"])
+            logger.info(f"Loaded {len(rating_df)} ratings for Item Co-occurrence")
+            return rating_df
+        except Exception as e:
+            raise CustomException("Failed to load rating data", e)
+
+    def build_matrix(self, rating_df):
+        """Sparse anime x user matrix in the encoded order, with the anime ID of each row."""
+        from scipy import sparse
+
+        n_anime = int(rating_df["anime"].max()) + 1
+        n_users = int(rating_df["user"].max()) + 1
+        values = rating_df["rating"].to_numpy(np.float32) if self.weighting == "rating" else np.ones(len(rating_df), np.float32)
+        items = sparse.csr_matrix((values, (rating_df["anime"].to_numpy(), rating_df["user"].to_numpy())),
+                                  shape=(n_anime, n_users), dtype=np.float32)
+        items.sum_duplicates()
+        items.eliminate_zeros()
+
+        anime_ids = rating_df.drop_duplicates("anime").set_index("anime")["anime_id"].reindex(range(n_anime))
+        logger.info(f"Built rating matrix: {n_anime} anime x {n_users} users, {items.nnz} non-zeros")
+        return items, anime_ids.fillna(-1).to_numpy(np.int64)
+
+    def compute_neighbours(self, items):
+        norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel()).astype(np.float32)
+        # Anime nobody rated have a zero norm; a tiny floor keeps them at 0 instead of NaN
+        shrinkage = max(float(self.shrinkage), 1e-12)
+        return sparse_top_k(items, self.top_k, self.block_size, self.n_workers, norms=norms, shrinkage=shrinkage)
+
+    def run(self):
+        try:
+            rating_df = self.load_data()
+            items, anime_ids = self.build_matrix(rating_df)
+            neighbours, scores = self.compute_neighbours(items)
+
+            table = NeighbourTable(anime_ids, neighbours, scores)
+            os.makedirs(os.path.dirname(COOCCURRENCE_NEIGHBOURS), exist_ok=True)
+            table.save(COOCCURRENCE_NEIGHBOURS)
+            logger.info(f"Top-{table.k} co-occurrence neighbours of {len(table)} anime saved to {COOCCURRENCE_NEIGHBOURS}")
+            return table
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error computing co-occurrence neighbours", e)
+
+
+if __name__=="__main__":
+    item_cooccurrence = ItemCooccurrence(CONFIG_PATH)
+    item_cooccurrence.run()
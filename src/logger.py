@@ -1,5 +1,12 @@
 import logging
+import logging.handlers
 import os
+import sys
+import json
+import queue
+import atexit
+import random
+import threading
 from datetime import datetime
 
 LOGS_DIR = "logs"
@@ -7,13 +14,135 @@ os.makedirs(LOGS_DIR,exist_ok=True)
 
 LOG_FILE = os.path.join(LOGS_DIR, f"log_{datetime.now().strftime('%Y-%m-%d')}.log")
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Defaults, overridable per process through the environment
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")                  # text | json
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "0") == "1"
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra`` fields kept as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Let through only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a bounded queue drained by a background listener.
+
+    A full queue drops the record and counts it instead of blocking the
+    caller. Records are passed as-is (the listener runs in this process), so
+    message and traceback formatting happen on the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+_listener = None
+_queue_handler = None
+_installed_handlers = []
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(async_mode=LOG_ASYNC, fmt=LOG_FORMAT, level=LOG_LEVEL, queue_size=LOG_QUEUE_SIZE,
+                      debug_sample_rate=LOG_DEBUG_SAMPLE_RATE, console=False):
+    """
+    (Re)configure the root logger.
+
+    In async mode the root logger only enqueues records; a QueueListener
+    thread formats them and does the file (and console) I/O. Safe to call
+    again, e.g. by a serving process switching to async mode.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    _stop_listener()
+    for handler in _installed_handlers:
+        root.removeHandler(handler)
+        handler.close()
+    _installed_handlers.clear()
+    _queue_handler = None
+
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    outputs = [logging.FileHandler(LOG_FILE)]
+    if console:
+        outputs.append(logging.StreamHandler(sys.stderr))
+    for handler in outputs:
+        handler.setFormatter(formatter)
+
+    if async_mode:
+        _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, *outputs, respect_handler_level=True)
+        _listener.start()
+        handlers = [_queue_handler]
+    else:
+        handlers = outputs
+
+    for handler in handlers:
+        # Sample before enqueueing so discarded debug lines cost nothing downstream
+        handler.addFilter(DebugSampler(debug_sample_rate))
+        root.addHandler(handler)
+    _installed_handlers.extend(handlers)
+    root.setLevel(level)
+
+
+def dropped_records():
+    """Records dropped because the async queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+atexit.register(_stop_listener)
+configure_logging()
 
 def get_logger(name):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    return logger
\ No newline at end of file
+    logger.setLevel(LOG_LEVEL)
+    return logger
@@ -0,0 +1,189 @@
+import os
+import json
+import joblib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.common_functions import read_yaml
+from utils.scoring import score_users, top_k
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+# Embeddings held by each evaluation worker, loaded once by _init_worker
+_USER_WEIGHTS = None
+_ANIME_WEIGHTS = None
+
+# Blocks per worker, so a slow block doesn't leave the others idle, and the smallest useful block
+BLOCKS_PER_WORKER = 2
+MIN_BLOCK_SIZE = 64
+
+
+def _init_worker(user_weights_path, anime_weights_path):
+    global _USER_WEIGHTS, _ANIME_WEIGHTS
+    _USER_WEIGHTS = joblib.load(user_weights_path)
+    _ANIME_WEIGHTS = joblib.load(anime_weights_path)
+
+
+def _group_by_user(users, items, n_users):
+    """CSR-style grouping of (user, item) pairs: returns indptr and the items sorted by user."""
+    order = np.argsort(users, kind="stable")
+    counts = np.bincount(users, minlength=n_users)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return indptr, items[order]
+
+
+def _slice_groups(indptr, indices, users):
+    """Sub-CSR for a block of users so workers only receive their own rows."""
+    starts, ends = indptr[users], indptr[users + 1]
+    block_indptr = np.concatenate([[0], np.cumsum(ends - starts)])
+    block_indices = np.concatenate([indices[s:e] for s, e in zip(starts, ends)]) if len(users) else indices[:0]
+    return block_indptr, block_indices
+
+
+def _evaluate_block(task):
+    """Rank every anime for a block of users and return metric sums for each k."""
+    users, seen_indptr, seen_indices, rel_indptr, rel_indices, ks = task
+    n_block = len(users)
+    max_k = max(ks)
+
+    scores = score_users(_USER_WEIGHTS, _ANIME_WEIGHTS, users)
+
+    # Items seen in training can never be recommended
+    seen_rows = np.repeat(np.arange(n_block), np.diff(seen_indptr))
+    scores[seen_rows, seen_indices] = -np.inf
+
+    top = top_k(scores, max_k)
+
+    relevant = np.zeros(scores.shape, dtype=bool)
+    relevant[np.repeat(np.arange(n_block), np.diff(rel_indptr)), rel_indices] = True
+    hits = np.take_along_axis(relevant, top, axis=1)
+    n_relevant = np.diff(rel_indptr)
+
+    results = {}
+    for k in ks:
+        hits_k = hits[:, :k]
+        discounts = 1.0 / np.log2(np.arange(2, k + 2))
+        ideal = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+        precision_at_i = np.cumsum(hits_k, axis=1) / np.arange(1, k + 1)
+
+        results[k] = {
+            "recall": float((hits_k.sum(axis=1) / n_relevant).sum()),
+            "ndcg": float(((hits_k * discounts).sum(axis=1) / ideal).sum()),
+            "map": float(((precision_at_i * hits_k).sum(axis=1) / np.minimum(n_relevant, k)).sum()),
+            "items": np.unique(top[:, :k]),
+        }
+    return n_block, results
+
+
+class ModelEvaluation:
+    def __init__(self, config_path=CONFIG_PATH):
+        try:
+            self.config = read_yaml(config_path)["evaluation"]
+            self.ks = sorted(int(k) for k in self.config["k"])
+            self.relevance_threshold = self.config["relevance_threshold"]
+            self.block_size = self.config["block_size"]
+            self.n_workers = self.config["n_workers"]
+
+            os.makedirs(EVALUATION_DIR, exist_ok=True)
+            logger.info("Model Evaluation initialized")
+        except Exception as e:
+            raise CustomException("Error loading evaluation configuration", e)
+
+    def load_data(self):
+        try:
+            X_train_array = joblib.load(X_TRAIN_ARRAY)
+            holdout = joblib.load(USER_HOLDOUT)
+            n_users = len(joblib.load(USER2USER_ENCODED))
+            n_anime = len(joblib.load(ANIME2ANIME_ENCODED))
+
+            logger.info("Data loaded sucesfully for Model Evaluation")
+            return X_train_array, holdout, n_users, n_anime
+        except Exception as e:
+            raise CustomException("Failed to load evaluation data", e)
+
+    def plan_block_size(self, n_eval_users):
+        """
+        Users per block: enough blocks to keep every worker busy, capped at
+        the configured ``block_size`` so a block's score matrix stays small.
+        """
+        if self.n_workers <= 1:
+            return self.block_size
+        per_block = -(-n_eval_users // (self.n_workers * BLOCKS_PER_WORKER))
+        return max(min(self.block_size, per_block), MIN_BLOCK_SIZE)
+
+    def build_tasks(self, X_train_array, holdout, n_users):
+        """Split the holdout users into blocks carrying their seen and relevant items."""
+        train_users = np.asarray(X_train_array[0], dtype=np.int64)
+        train_anime = np.asarray(X_train_array[1], dtype=np.int64)
+        seen_indptr, seen_indices = _group_by_user(train_users, train_anime, n_users)
+
+        relevant = np.asarray(holdout["rating"]) >= self.relevance_threshold
+        rel_users = np.asarray(holdout["user"], dtype=np.int64)[relevant]
+        rel_anime = np.asarray(holdout["anime"], dtype=np.int64)[relevant]
+        rel_indptr, rel_indices = _group_by_user(rel_users, rel_anime, n_users)
+
+        eval_users = np.unique(rel_users)
+        block_size = self.plan_block_size(len(eval_users))
+        tasks = []
+        for start in range(0, len(eval_users), block_size):
+            users = eval_users[start:start + block_size]
+            tasks.append((
+                users,
+                *_slice_groups(seen_indptr, seen_indices, users),
+                *_slice_groups(rel_indptr, rel_indices, users),
+                self.ks,
+            ))
+        return eval_users, tasks
+
+    def evaluate(self):
+        try:
+            X_train_array, holdout, n_users, n_anime = self.load_data()
+            eval_users, tasks = self.build_tasks(X_train_array, holdout, n_users)
+            if not tasks:
+                raise ValueError("No holdout users with relevant items to evaluate")
+            logger.info(f"Evaluating {len(eval_users)} users in {len(tasks)} blocks")
+
+            if self.n_workers > 1 and len(tasks) > 1:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.n_workers, len(tasks)),
+                    initializer=_init_worker,
+                    initargs=(USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH),
+                ) as executor:
+                    block_results = list(executor.map(_evaluate_block, tasks))
+            else:
+                _init_worker(USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH)
+                block_results = [_evaluate_block(task) for task in tasks]
+
+            n_evaluated = sum(n for n, _ in block_results)
+            metrics = {"n_users": int(n_evaluated), "n_anime": int(n_anime)}
+            for k in self.ks:
+                for name in ("recall", "ndcg", "map"):
+                    metrics[f"{name}@{k}"] = sum(r[k][name] for _, r in block_results) / n_evaluated
+                recommended = np.unique(np.concatenate([r[k]["items"] for _, r in block_results]))
+                metrics[f"coverage@{k}"] = len(recommended) / n_anime
+
+            logger.info(f"Evaluated {n_evaluated} holdout users: {metrics}")
+            return metrics
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during Model Evaluation Process", e)
+
+    def save_metrics(self, metrics):
+        try:
+            with open(EVALUATION_METRICS, "w") as f:
+                json.dump(metrics, f, indent=2)
+            logger.info(f"Evaluation metrics saved to {EVALUATION_METRICS}")
+        except Exception as e:
+            raise CustomException("Error saving evaluation metrics", e)
+
+    def run(self):
+        metrics = self.evaluate()
+        self.save_metrics(metrics)
+        return metrics
+
+
+if __name__=="__main__":
+    model_evaluation = ModelEvaluation(CONFIG_PATH)
+    model_evaluation.run()
@@ -0,0 +1,157 @@
+import os
+import json
+import shutil
+import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.bundle import BUNDLE_FORMAT_VERSION, LATEST_FILE, MANIFEST_FILE, METADATA_FILE, BundleError, InferenceBundle, file_checksum, model_version
+from config.paths_config import *
+
+logger = get_logger(__name__)
+
+METADATA_COLUMNS = ["anime_id","eng_version","Score","Genres","Episodes","Type","Premiered","Members"]
+
+
+class ModelExport:
+    """
+    Writes one versioned, self-describing inference bundle:
+
+        artifacts/bundle/<model_version>/
+            user_embeddings.npy  anime_embeddings.npy   float32 (n, embedding_size)
+            user_ids.npy         anime_ids.npy          raw ID of each encoded index
+            user_ids_order.npy   anime_ids_order.npy    argsort of the IDs for lookups
+            anime_metadata.csv                          row i describes encoded anime i
+            manifest.json                               shapes, dtypes, sizes, sha256
+        artifacts/bundle/LATEST                         name of the newest bundle
+
+    The bundle is written to a temporary directory and renamed into place,
+    and LATEST is replaced atomically, so readers never see a partial bundle.
+    The version is a hash of the embeddings and IDs, so exporting an
+    unchanged model keeps the existing bundle and its version.
+    """
+
+    def __init__(self, output_dir=BUNDLE_DIR):
+        self.output_dir = output_dir
+        os.makedirs(self.output_dir, exist_ok=True)
+        logger.info("Model Export initialized")
+
+    def load_artifacts(self):
+        try:
+            user_weights = np.ascontiguousarray(joblib.load(USER_WEIGHTS_PATH), dtype=np.float32)
+            anime_weights = np.ascontiguousarray(joblib.load(ANIME_WEIGHTS_PATH), dtype=np.float32)
+            user2user_decoded = joblib.load(USER2USER_DECODED)
+            anime2anime_decoded = joblib.load(ANIME2ANIME_DECODED)
+            anime_df = pd.read_csv(DF)
+
+            logger.info("Artifacts loaded sucesfully for Model Export")
+            return user_weights, anime_weights, user2user_decoded, anime2anime_decoded, anime_df
+        except Exception as e:
+            raise CustomException("Failed to load artifacts for export", e)
+
+    @staticmethod
+    def decoded_ids(decoded, n):
+        """Raw IDs as an int64 array indexed by encoded index."""
+        return np.array([decoded[i] for i in range(n)], dtype=np.int64)
+
+    def export(self):
+        try:
+            user_weights, anime_weights, user2user_decoded, anime2anime_decoded, anime_df = self.load_artifacts()
+
+            if len(user2user_decoded) != user_weights.shape[0] or len(anime2anime_decoded) != anime_weights.shape[0]:
+                raise ValueError("Encoders and embedding matrices have different sizes")
+
+            user_ids = self.decoded_ids(user2user_decoded, user_weights.shape[0])
+            anime_ids = self.decoded_ids(anime2anime_decoded, anime_weights.shape[0])
+
+            # Metadata aligned with the encoded anime index
+            metadata = (
+                anime_df.drop_duplicates("anime_id")
+                .set_index("anime_id")
+                .reindex(anime_ids)
+                .rename_axis("anime_id")
+                .reset_index()
+            )[METADATA_COLUMNS]
+
+            version = model_version(user_weights, anime_weights, user_ids, anime_ids)
+            final_dir = os.path.join(self.output_dir, version)
+            if self.is_exported(final_dir):
+                logger.info(f"Inference bundle {version} already exported, keeping it")
+                self.point_latest(version)
+                return final_dir
+            tmp_dir = os.path.join(self.output_dir, f".{version}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            arrays = {
+                "user_embeddings": user_weights,
+                "anime_embeddings": anime_weights,
+                "user_ids": user_ids,
+                "user_ids_order": np.argsort(user_ids, kind="stable"),
+                "anime_ids": anime_ids,
+                "anime_ids_order": np.argsort(anime_ids, kind="stable"),
+            }
+
+            files = {}
+            for name, array in arrays.items():
+                file_name = f"{name}.npy"
+                np.save(os.path.join(tmp_dir, file_name), array, allow_pickle=False)
+                files[name] = {"path": file_name, "shape": list(array.shape), "dtype": array.dtype.str}
+
+            metadata.to_csv(os.path.join(tmp_dir, METADATA_FILE), index=False)
+            files["metadata"] = {"path": METADATA_FILE, "shape": list(metadata.shape), "dtype": "csv"}
+
+            for entry in files.values():
+                file_path = os.path.join(tmp_dir, entry["path"])
+                entry["bytes"] = os.path.getsize(file_path)
+                entry["sha256"] = file_checksum(file_path)
+
+            manifest = {
+                "format_version": BUNDLE_FORMAT_VERSION,
+                "model_version": version,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "embedding_size": int(user_weights.shape[1]),
+                "n_users": int(user_weights.shape[0]),
+                "n_anime": int(anime_weights.shape[0]),
+                "files": files,
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+
+            # A broken bundle left under the same version is replaced
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.rename(tmp_dir, final_dir)
+            self.point_latest(version)
+
+            logger.info(f"Inference bundle {version} exported to {final_dir}")
+            return final_dir
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during inference bundle export", e)
+
+    @staticmethod
+    def is_exported(path):
+        """True when ``path`` holds a complete bundle that passes the fast verification."""
+        if not os.path.isdir(path):
+            return False
+        try:
+            InferenceBundle.verify(path, InferenceBundle.read_manifest(path))
+            return True
+        except BundleError:
+            return False
+
+    def point_latest(self, version):
+        latest_tmp = os.path.join(self.output_dir, f".{LATEST_FILE}.tmp")
+        with open(latest_tmp, "w") as f:
+            f.write(version)
+        os.replace(latest_tmp, os.path.join(self.output_dir, LATEST_FILE))
+
+    def run(self):
+        return self.export()
+
+
+if __name__=="__main__":
+    model_export = ModelExport()
+    model_export.run()
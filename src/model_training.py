@@ -1,25 +1,40 @@
 import joblib
-import comet_ml
 import numpy as np
 import os
-from tensorflow.keras.callbacks import ModelCheckpoint,LearningRateScheduler,TensorBoard,EarlyStopping
 from src.logger import get_logger
 from src.custom_exception import CustomException
-from src.base_model import BaseModel
+from src.experiment_tracker import get_tracker, NullTracker
+from utils.common_functions import read_yaml
 from config.paths_config import *
 
 logger = get_logger(__name__)
 
+# Learning rate schedule and batch size shared by single-process and data-parallel training
+START_LR = 0.00001
+MIN_LR = 0.0001
+MAX_LR = 0.00005
+BATCH_SIZE = 10000
+EPOCHS = 20
+
+RAMUP_EPOCHS = 5
+SUSTAIN_EPOCHS = 0
+EXP_DECAY = 0.8
+
+def lrfn(epoch):
+    if epoch<RAMUP_EPOCHS:
+        return (MAX_LR-START_LR)/RAMUP_EPOCHS*epoch + START_LR
+    elif epoch<RAMUP_EPOCHS+SUSTAIN_EPOCHS:
+        return MAX_LR
+    else:
+        return (MAX_LR-MIN_LR) * EXP_DECAY ** (epoch-RAMUP_EPOCHS-SUSTAIN_EPOCHS)+MIN_LR
+
 class ModelTraining:
-    def __init__(self,data_path):
+    def __init__(self,data_path,track=True):
         self.data_path= data_path
 
-        self.experiment = comet_ml.Experiment(
-            api_key="2NC6AVgf59JEZ1epYJEC9JgUs",
-            project_name="ml-ops-project2nd",
-            workspace="bilalgpt"
-        )
-        logger.info("Model Training & COMET ML initialized..")
+        # Data-parallel worker processes train without their own tracker
+        self.experiment = get_tracker(read_yaml(CONFIG_PATH)) if track else NullTracker()
+        logger.info("Model Training & experiment tracking initialized..")
     
     def load_data(self):
         try:
@@ -32,34 +47,28 @@ class ModelTraining:
             return X_train_array,X_test_array,y_train,y_test
         except Exception as e:
             raise CustomException("Failed to load data",e)
-        
-    def train_model(self):
+
+    def build_model(self):
         try:
-            X_train_array,X_test_array,y_train,y_test = self.load_data()
+            # TensorFlow is imported here so importing this module stays cheap
+            from src.base_model import BaseModel
 
             n_users = len(joblib.load(USER2USER_ENCODED))
             n_anime = len(joblib.load(ANIME2ANIME_ENCODED))
 
             base_model = BaseModel(config_path=CONFIG_PATH)
 
-            model = base_model.RecommenderNet(n_users=n_users,n_anime=n_anime)
-
-            start_lr = 0.00001
-            min_lr = 0.0001
-            max_lr = 0.00005
-            batch_size = 10000
+            return base_model.RecommenderNet(n_users=n_users,n_anime=n_anime)
+        except Exception as e:
+            raise CustomException("Failed to build model",e)
+        
+    def train_model(self):
+        try:
+            from tensorflow.keras.callbacks import ModelCheckpoint,LearningRateScheduler,EarlyStopping
 
-            ramup_epochs = 5
-            sustain_epochs = 0
-            exp_decay = 0.8
+            X_train_array,X_test_array,y_train,y_test = self.load_data()
 
-            def lrfn(epoch):
-                if epoch<ramup_epochs:
-                    return (max_lr-start_lr)/ramup_epochs*epoch + start_lr
-                elif epoch<ramup_epochs+sustain_epochs:
-                    return max_lr
-                else:
-                    return (max_lr-min_lr) * exp_decay ** (epoch-ramup_epochs-sustain_epochs)+min_lr
+            model = self.build_model()
             
             lr_callback = LearningRateScheduler(lambda epoch:lrfn(epoch) , verbose=0)
 
@@ -77,8 +86,8 @@ class ModelTraining:
                 history = model.fit(
                         x=X_train_array,
                         y=y_train,
-                        batch_size=batch_size,
-                        epochs=20,
+                        batch_size=BATCH_SIZE,
+                        epochs=EPOCHS,
                         verbose=1,
                         validation_data = (X_test_array,y_test),
                         callbacks=my_callbacks
@@ -94,13 +103,15 @@ class ModelTraining:
                     self.experiment.log_metric('val_loss',val_loss,step=epoch)
             
             except Exception as e:
-                raise CustomException("Model training failedd.....")
+                raise CustomException("Model training failedd.....",e)
             
             self.save_model_weights(model)
 
         except Exception as e:
             logger.error(str(e))
             raise CustomException("Errorduring Model Trainig Process",e)
+        finally:
+            self.experiment.close()
         
     def extract_weights(self,layer_name,model):
         try:
@@ -133,6 +144,24 @@ class ModelTraining:
             logger.error(str(e))
             raise CustomException("Error during saving model and weights Process",e)
         
+    def export_weights(self):
+        """Re-extract the normalized embeddings from the saved model without retraining."""
+        try:
+            from tensorflow.keras.models import load_model
+
+            model = load_model(MODEL_PATH)
+            os.makedirs(WEIGHTS_DIR,exist_ok=True)
+
+            joblib.dump(self.extract_weights('user_embedding',model),USER_WEIGHTS_PATH)
+            joblib.dump(self.extract_weights('anime_embedding',model),ANIME_WEIGHTS_PATH)
+
+            logger.info(f"Weights exported from {MODEL_PATH}")
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during weight export",e)
+        finally:
+            self.experiment.close()
+
 
 if __name__=="__main__":
     model_trainer = ModelTraining(PROCESSED_DIR)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.anime_index import AnimeIndex, FilterError
+
+
+@pytest.fixture
+def index():
+    metadata = pd.DataFrame({
+        "anime_id": [10, 20, 30, 40, 50],
+        "Genres": ["Action, Comedy", "Slice of Life", "Action, Horror", "Comedy", "Unknown"],
+        "Type": ["TV", "Movie", "TV", "OVA", "TV"],
+        "Premiered": ["Spring 2008", "Fall 2012", "Summer 2015", "Unknown", "Winter 2001"],
+    })
+    # Encoded order differs from the metadata order
+    return AnimeIndex.build(metadata, [30, 10, 20, 40, 50])
+
+
+def matches(index, expression):
+    return np.flatnonzero(index.mask(expression)).tolist()
+
+
+def test_single_terms(index):
+    assert matches(index, "genre:Action") == [0, 1]
+    assert matches(index, "type:TV") == [0, 1, 4]
+    assert matches(index, "season:fall") == [2]
+
+
+def test_values_are_case_and_space_insensitive(index):
+    assert matches(index, 'GENRE:"slice  of   LIFE"') == [2]
+    assert matches(index, "type=tv") == matches(index, "type:TV")
+
+
+def test_comma_means_any_of(index):
+    assert matches(index, "type:Movie,OVA") == [2, 3]
+
+
+def test_and_or_not_and_juxtaposition(index):
+    assert matches(index, "genre:Action AND type:TV") == [0, 1]
+    assert matches(index, "genre:Action type:TV") == [0, 1]
+    assert matches(index, "genre:Comedy OR genre:Horror") == [0, 1, 3]
+    assert matches(index, "type:TV NOT genre:Horror") == [1, 4]
+
+
+def test_and_binds_tighter_than_or(index):
+    assert matches(index, "genre:Horror OR genre:Comedy AND type:OVA") == [0, 3]
+    assert matches(index, "(genre:Horror OR genre:Comedy) AND type:OVA") == [3]
+
+
+def test_year_comparisons_skip_unknown_years(index):
+    assert matches(index, "year>=2010") == [0, 2]
+    assert matches(index, "year<2010") == [1, 4]
+    assert matches(index, "year:2012") == [2]
+    assert matches(index, "NOT year>0") == [3]
+
+
+def test_unknown_values_are_not_indexed(index):
+    assert "unknown" not in index.postings["genre"]
+    assert index.facets()["year"] == [2001, 2015]
+
+
+def test_masks_are_cached_and_read_only(index):
+    mask = index.mask("genre:Action")
+    assert index.mask("genre:Action") is mask
+    with pytest.raises(ValueError):
+        mask[0] = False
+
+
+@pytest.mark.parametrize("expression", [
+    "",
+    "genre:",
+    "genre:Action AND",
+    "(genre:Action",
+    "genre:Action)",
+    "studio:Madhouse",
+    "genre:Mecha",
+    "type>TV",
+    "year>=soon",
+    'genre:"Action',
+])
+def test_invalid_filters_raise(index, expression):
+    with pytest.raises(FilterError):
+        index.mask(expression)
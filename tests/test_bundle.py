@@ -0,0 +1,164 @@
+import os
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import model_export
+from src.model_export import ModelExport
+from utils.bundle import InferenceBundle, IdEncoder, BundleError, MANIFEST_FILE, resolve_bundle_path
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    """Legacy pickles for 4 users and 3 anime, one of them without metadata."""
+    rng = np.random.default_rng(0)
+    user_ids, anime_ids = [7, 3, 11, 5], [30, 10, 20]
+    files = {
+        "USER_WEIGHTS_PATH": rng.normal(size=(4, 8)),
+        "ANIME_WEIGHTS_PATH": rng.normal(size=(3, 8)),
+        "USER2USER_DECODED": dict(enumerate(user_ids)),
+        "ANIME2ANIME_DECODED": dict(enumerate(anime_ids)),
+    }
+    for name, value in files.items():
+        path = str(tmp_path / f"{name.lower()}.pkl")
+        joblib.dump(value, path)
+        monkeypatch.setattr(model_export, name, path)
+
+    anime_df = pd.DataFrame({
+        "anime_id": [10, 30], "eng_version": ["Ten", "Thirty"], "Score": [7.5, 8.1],
+        "Genres": ["Action", "Comedy"], "Episodes": ["12", "24"], "Type": ["TV", "Movie"],
+        "Premiered": ["Spring 2008", "Fall 2012"], "Members": [100, 200],
+    })
+    df_path = str(tmp_path / "anime_df.csv")
+    anime_df.to_csv(df_path, index=False)
+    monkeypatch.setattr(model_export, "DF", df_path)
+    return files, str(tmp_path / "bundle")
+
+
+def test_round_trip(artifacts):
+    files, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    assert resolve_bundle_path(output_dir) == path
+
+    bundle = InferenceBundle.load(path, verify="full")
+    np.testing.assert_array_equal(bundle.user_embeddings, files["USER_WEIGHTS_PATH"].astype(np.float32))
+    np.testing.assert_array_equal(bundle.anime_embeddings, files["ANIME_WEIGHTS_PATH"].astype(np.float32))
+    assert isinstance(bundle.user_embeddings, np.memmap)
+    assert bundle.user_ids.tolist() == [7, 3, 11, 5]
+    assert bundle.user_encoder[11] == 2
+    assert bundle.anime_encoder.get(99) is None
+    # Metadata row i describes encoded anime i
+    assert bundle.metadata["anime_id"].tolist() == [30, 10, 20]
+    assert bundle.metadata["eng_version"].tolist()[:2] == ["Thirty", "Ten"]
+    assert pd.isna(bundle.metadata["eng_version"].iloc[2])
+    assert bundle.model_version == os.path.basename(path)
+
+
+def test_loading_without_mmap(artifacts):
+    _, output_dir = artifacts
+    bundle = InferenceBundle.load(ModelExport(output_dir).export(), mmap=False)
+    assert not isinstance(bundle.anime_embeddings, np.memmap)
+
+
+def test_missing_file_fails_verification(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    os.remove(os.path.join(path, "anime_ids.npy"))
+    with pytest.raises(BundleError, match="Missing"):
+        InferenceBundle.load(path)
+
+
+def test_truncated_file_fails_verification(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    with open(os.path.join(path, "user_embeddings.npy"), "r+b") as f:
+        f.truncate(os.path.getsize(f.name) - 4)
+    with pytest.raises(BundleError, match="Size mismatch"):
+        InferenceBundle.load(path)
+
+
+def test_changed_contents_only_fail_full_verification(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    array_path = os.path.join(path, "anime_embeddings.npy")
+    np.save(array_path, np.zeros((3, 8), dtype=np.float32))
+
+    InferenceBundle.load(path, verify="fast")
+    with pytest.raises(BundleError, match="Checksum mismatch"):
+        InferenceBundle.load(path, verify="full")
+
+
+def test_header_mismatch_fails_fast_verification(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    manifest["files"]["user_embeddings"]["shape"] = [8, 4]
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(BundleError, match="Shape or dtype"):
+        InferenceBundle.load(path)
+
+
+def test_unsupported_format_is_rejected(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    manifest["format_version"] += 1
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(BundleError, match="Unsupported"):
+        InferenceBundle.load(path)
+
+
+def test_no_bundle(tmp_path):
+    assert resolve_bundle_path(str(tmp_path)) is None
+    with pytest.raises(BundleError):
+        InferenceBundle.load(str(tmp_path / "missing"))
+
+
+def test_id_encoder_matches_a_dict():
+    ids = np.array([42, 7, 19, 3], dtype=np.int64)
+    encoder = IdEncoder(ids)
+    mapping = {int(raw): i for i, raw in enumerate(ids)}
+
+    assert len(encoder) == 4
+    assert all(encoder[raw] == index for raw, index in mapping.items())
+    assert 8 not in encoder and "x" not in encoder
+    with pytest.raises(KeyError):
+        encoder[8]
+    assert encoder.encode([19, 8, 42]).tolist() == [2, -1, 0]
+    assert IdEncoder(np.array([], dtype=np.int64)).encode([1]).tolist() == [-1]
+
+
+def test_exporting_the_same_model_again_keeps_its_version(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    created_at = InferenceBundle.read_manifest(path)["created_at"]
+
+    assert ModelExport(output_dir).export() == path
+    assert InferenceBundle.read_manifest(path)["created_at"] == created_at
+    assert resolve_bundle_path(output_dir) == path
+
+
+def test_new_weights_get_a_new_version(artifacts):
+    files, output_dir = artifacts
+    first = ModelExport(output_dir).export()
+    joblib.dump(files["ANIME_WEIGHTS_PATH"] + 1, model_export.ANIME_WEIGHTS_PATH)
+
+    second = ModelExport(output_dir).export()
+    assert second != first
+    assert resolve_bundle_path(output_dir) == second
+
+
+def test_broken_bundle_of_the_same_version_is_replaced(artifacts):
+    _, output_dir = artifacts
+    path = ModelExport(output_dir).export()
+    os.remove(os.path.join(path, "user_ids.npy"))
+
+    assert ModelExport(output_dir).export() == path
+    InferenceBundle.load(path, verify="full")
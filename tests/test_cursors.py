@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import encode_cursor, decode_cursor
+
+STATE = SimpleNamespace(model_version="v1")
+
+
+def test_round_trip():
+    cursor = encode_cursor(STATE, "users", 200, 1000)
+    assert "=" not in cursor
+    assert decode_cursor(STATE, cursor, "users") == 200
+
+
+def test_no_cursor_after_the_last_page():
+    assert encode_cursor(STATE, "users", 1000, 1000) is None
+    assert encode_cursor(STATE, "users", 1200, 1000) is None
+
+
+def test_missing_cursor_starts_at_the_beginning():
+    assert decode_cursor(STATE, None, "users") == 0
+    assert decode_cursor(STATE, "", "users") == 0
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", encode_cursor(STATE, "anime", 10, 20)])
+def test_malformed_or_foreign_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(STATE, cursor, "users")
+    assert error.value.status_code == 400
+
+
+def test_cursor_from_another_model_version_conflicts():
+    cursor = encode_cursor(SimpleNamespace(model_version="v0"), "users", 10, 20)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(STATE, cursor, "users")
+    assert error.value.status_code == 409
@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+from src import data_ingestion
+from src.data_ingestion import DataIngestion, LocalStorage, MANIFEST_SUFFIX
+
+ROWS = b"".join(b"%d,%d\n" % (i, i * i) for i in range(1000))
+CONTENT = b"a,b\n" + ROWS
+
+
+class Interrupted(Exception):
+    pass
+
+
+class CountingStorage(LocalStorage):
+    """LocalStorage that records where every read started, with small chunks, optionally failing mid-stream."""
+
+    def __init__(self, root_dir, fail_after=None):
+        super().__init__(root_dir)
+        self.starts = []
+        self.fail_after = fail_after
+
+    def iter_chunks(self, name, start=0, chunk_size=64, generation=None):
+        self.starts.append(start)
+        for count, chunk in enumerate(super().iter_chunks(name, start, chunk_size)):
+            if count == self.fail_after:
+                raise Interrupted()
+            yield chunk
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    bucket, raw = tmp_path / "bucket", tmp_path / "raw"
+    bucket.mkdir()
+    (bucket / "data.csv").write_bytes(CONTENT)
+    monkeypatch.setattr(data_ingestion, "RAW_DIR", str(raw))
+
+    def ingestion(row_limit=None, fail_after=None):
+        config = {"data_ingestion": {"bucket_name": "unused", "bucket_file_name": ["data.csv"],
+                                     "row_limits": {"data.csv": row_limit} if row_limit else {}}}
+        return DataIngestion(config, storage=CountingStorage(str(bucket), fail_after))
+
+    return ingestion, bucket, raw
+
+
+def test_full_download(setup):
+    ingestion, _, raw = setup
+    path = ingestion().download_file("data.csv")
+    assert open(path, "rb").read() == CONTENT
+    assert not os.path.exists(path + ".part")
+    manifest = DataIngestion.read_manifest(path)
+    assert manifest["source_bytes"] == len(CONTENT) and manifest["row_limit"] is None
+    assert not os.path.exists(path + ".part" + MANIFEST_SUFFIX)
+
+
+def test_row_limit_keeps_header_and_rows(setup):
+    ingestion, _, _ = setup
+    path = ingestion(row_limit=10).download_file("data.csv")
+    lines = open(path, "rb").read().splitlines()
+    assert lines[0] == b"a,b" and len(lines) == 11
+    assert lines[-1] == b"9,81"
+
+
+def test_complete_file_is_skipped(setup):
+    ingestion, _, _ = setup
+    ingestion().download_file("data.csv")
+    again = ingestion()
+    again.download_file("data.csv")
+    assert again.storage.starts == []
+
+
+def interrupt(ingestion, **kwargs):
+    with pytest.raises(Interrupted):
+        ingestion(fail_after=3, **kwargs).download_file("data.csv")
+
+
+def test_interrupted_download_resumes_from_the_part_file(setup):
+    ingestion, _, raw = setup
+    interrupt(ingestion)
+    assert os.path.getsize(raw / "data.csv.part") == 3 * 64
+
+    run = ingestion()
+    path = run.download_file("data.csv")
+    assert run.storage.starts == [3 * 64]
+    assert open(path, "rb").read() == CONTENT
+
+
+def test_resume_with_row_limit_counts_the_rows_already_written(setup):
+    ingestion, _, _ = setup
+    interrupt(ingestion, row_limit=200)
+
+    path = ingestion(row_limit=200).download_file("data.csv")
+    assert open(path, "rb").read().splitlines()[1:] == ROWS.splitlines()[:200]
+
+
+def test_part_file_over_a_lower_limit_starts_again(setup):
+    ingestion, _, _ = setup
+    interrupt(ingestion)
+
+    run = ingestion(row_limit=10)
+    path = run.download_file("data.csv")
+    assert run.storage.starts == [0]
+    assert len(open(path, "rb").read().splitlines()) == 11
+
+
+def test_source_changed_between_attempts_starts_again(setup):
+    ingestion, bucket, _ = setup
+    interrupt(ingestion)
+    # Same size, new contents and generation
+    changed = CONTENT.replace(b"a,b", b"x,y")
+    (bucket / "data.csv").write_bytes(changed)
+    os.utime(bucket / "data.csv", ns=(1, 1))
+
+    run = ingestion()
+    path = run.download_file("data.csv")
+    assert run.storage.starts == [0]
+    assert open(path, "rb").read() == changed
+
+
+def test_part_file_without_a_manifest_starts_again(setup):
+    ingestion, _, raw = setup
+    raw.mkdir()
+    (raw / "data.csv.part").write_bytes(b"stale bytes")
+
+    run = ingestion()
+    path = run.download_file("data.csv")
+    assert run.storage.starts == [0]
+    assert open(path, "rb").read() == CONTENT
+
+
+def test_changed_row_limit_downloads_again(setup):
+    ingestion, _, _ = setup
+    ingestion(row_limit=10).download_file("data.csv")
+    path = ingestion(row_limit=100).download_file("data.csv")
+    assert len(open(path, "rb").read().splitlines()) == 101
+    assert DataIngestion.read_manifest(path)["row_limit"] == 100
+
+
+def test_changed_source_downloads_again(setup):
+    ingestion, bucket, _ = setup
+    ingestion().download_file("data.csv")
+    (bucket / "data.csv").write_bytes(CONTENT + b"1000,1000000\n")
+    path = ingestion().download_file("data.csv")
+    assert open(path, "rb").read().endswith(b"1000,1000000\n")
+
+
+def test_file_without_manifest_counts_only_as_a_full_copy(setup):
+    ingestion, _, raw = setup
+    path = ingestion().download_file("data.csv")
+    os.remove(path + MANIFEST_SUFFIX)
+
+    run = ingestion()
+    source = run.source("data.csv")
+    assert run.is_complete(path, source, None)
+    assert not run.is_complete(path, source, 10)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.distributed_training import DistributedTraining, shard_rows
+
+
+def test_shards_are_disjoint_and_equal():
+    shards = [shard_rows(10, index, 3) for index in range(3)]
+    assert [len(shard) for shard in shards] == [3, 3, 3]
+    assert sorted(np.concatenate(shards).tolist()) == list(range(9))
+
+
+def test_dense_weights_are_averaged():
+    current = [np.zeros(3)]
+    merged = DistributedTraining(2).merge(current, [[np.array([1.0, 2, 3])], [np.array([3.0, 2, 1])]], set())
+    np.testing.assert_allclose(merged[0], [2, 2, 2])
+
+
+def test_embedding_rows_are_averaged_over_the_workers_that_moved_them():
+    current = [np.zeros((4, 2))]
+    workers = [
+        # Row 0 trained by both, row 1 by the first only, row 2 moved by momentum in both, row 3 untouched
+        [np.array([[2.0, 2], [4, 4], [0.5, 0.5], [0, 0]])],
+        [np.array([[4.0, 4], [0, 0], [0.5, 0.5], [0, 0]])],
+    ]
+    merged = DistributedTraining(2).merge(current, workers, {0})
+    np.testing.assert_allclose(merged[0], [[3, 3], [4, 4], [0.5, 0.5], [0, 0]])
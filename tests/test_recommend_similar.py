@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pytest import approx
+from fastapi.testclient import TestClient
+
+import app
+from utils.anime_index import AnimeIndex
+from utils.bundle import IdEncoder
+from utils.model_state import ModelState, LazyArtifact
+from utils.neighbour_table import NeighbourTable
+from utils.serialization import AnimeMetadata
+from utils.title_index import TitleIndex
+
+N_ANIME = 40
+
+
+def neighbour_table(anime_ids, rows, scores, k=5):
+    """The same padded neighbour row for every anime."""
+    neighbours, similarities = np.zeros((len(anime_ids), k), dtype=np.int32), np.zeros((len(anime_ids), k))
+    neighbours[:, :len(rows)], similarities[:, :len(scores)] = rows, scores
+    return NeighbourTable(anime_ids, neighbours, similarities)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The API serving 40 anime; anime 0 has three co-occurrence and two synopsis neighbours."""
+    rng = np.random.default_rng(0)
+    anime_ids = np.arange(100, 100 + N_ANIME, dtype=np.int64)
+    anime_df = pd.DataFrame({
+        "anime_id": anime_ids, "eng_version": [f"Anime {i}" for i in range(N_ANIME)],
+        "Score": 7.0, "Genres": "Action", "Episodes": 12, "Type": "TV", "Premiered": "Spring 2010", "Members": 1,
+    })
+    cooccurrence = neighbour_table(anime_ids, [5, 6, 7], [0.9, 0.5, 0.25])
+    content = neighbour_table(anime_ids, [7, 8], [0.75, 0.5])
+    state = ModelState(
+        generation=1, model_version="test", source="memory",
+        user2user_encoded=IdEncoder(np.arange(3, dtype=np.int64)), user2user_decoded=np.arange(3, dtype=np.int64),
+        anime2anime_encoded=IdEncoder(anime_ids), anime2anime_decoded=anime_ids,
+        user_weights=rng.normal(size=(3, 4)).astype(np.float32),
+        anime_weights=rng.normal(size=(N_ANIME, 4)).astype(np.float32),
+        anime_df=anime_df, popularity=LazyArtifact(None, value=pd.DataFrame(), loaded=True),
+        anime_index=AnimeIndex.build(anime_df, anime_ids), title_index=TitleIndex.build(anime_df, None),
+        metadata=AnimeMetadata.build(anime_df, anime_ids),
+        content_neighbours=content, cooccurrence_neighbours=cooccurrence,
+    )
+    monkeypatch.setattr(app, "_model_state", state)
+    return TestClient(app.app)
+
+
+def similar(client, **body):
+    response = client.post("/recommend/similar", json={"anime_id": 100, "num_recommendations": 30, **body})
+    assert response.status_code == 200, response.text
+    return [(r["anime_id"], r["similarity"]) for r in response.json()["recommendations"]]
+
+
+def test_cooccurrence_only_returns_only_its_neighbours(client):
+    results = similar(client, content_weight=0.0, cooccurrence_weight=1.0)
+    assert results == [(105, approx(0.9, rel=1e-3)), (106, approx(0.5, rel=1e-3)), (107, approx(0.25, rel=1e-3))]
+
+
+def test_neighbour_tables_only_add_up_where_they_overlap(client):
+    results = dict(similar(client, content_weight=0.5, cooccurrence_weight=0.5))
+    assert set(results) == {105, 106, 107, 108}
+    assert results[107] == approx(0.5 * 0.25 + 0.5 * 0.75, rel=1e-3)
+    assert results[108] == approx(0.5 * 0.5, rel=1e-3)
+
+
+def test_embedding_share_scores_every_anime(client):
+    results = similar(client, content_weight=0.0, cooccurrence_weight=0.0)
+    assert len(results) == 30
+    assert 100 not in dict(results)
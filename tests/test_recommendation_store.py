@@ -0,0 +1,122 @@
+import os
+import threading
+
+import pytest
+
+from utils.recommendation_store import RecommendationStore, RecommendationStoreWriter
+
+
+def write_store(path, rows, model_version="v1", **meta):
+    writer = RecommendationStoreWriter(path, model_version)
+    writer.put_many(rows)
+    writer.close(**meta)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, [(1, ["A", "B"]), (2, [])], failed_users=1)
+
+    store = RecommendationStore(path)
+    assert store.model_version == "v1"
+    assert store.meta["failed_users"] == "1"
+    assert len(store) == 2
+    assert store.get(1) == ["A", "B"]
+    assert store.get(2) == []
+    assert store.get(3) is None
+
+
+def test_store_only_appears_on_close(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    writer = RecommendationStoreWriter(path, "v1")
+    writer.put_many([(1, ["A"])])
+    assert not os.path.exists(path)
+    writer.close()
+    assert os.path.exists(path)
+    assert not os.path.exists(writer.tmp_path)
+
+
+def test_rewrite_replaces_the_previous_store(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, [(1, ["A"])], model_version="v1")
+    write_store(path, [(2, ["B"])], model_version="v2")
+
+    store = RecommendationStore(path)
+    assert store.model_version == "v2"
+    assert store.get(1) is None
+    assert store.get(2) == ["B"]
+
+
+def test_abort_keeps_the_previous_store(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, [(1, ["A"])])
+    writer = RecommendationStoreWriter(path, "v2")
+    writer.put_many([(1, ["B"])])
+    writer.abort()
+
+    assert not os.path.exists(writer.tmp_path)
+    assert RecommendationStore(path).get(1) == ["A"]
+
+
+def test_reader_is_read_only(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, [(1, ["A"])])
+    store = RecommendationStore(path)
+    with pytest.raises(Exception):
+        store._connection().execute("DELETE FROM recommendations")
+
+
+def test_readers_on_several_threads(tmp_path):
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, [(user_id, [str(user_id)]) for user_id in range(100)])
+    store = RecommendationStore(path)
+    results = {}
+
+    def read(user_id):
+        results[user_id] = store.get(user_id)
+
+    threads = [threading.Thread(target=read, args=(user_id,)) for user_id in range(0, 100, 10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {user_id: [str(user_id)] for user_id in range(0, 100, 10)}
+
+
+def test_legacy_model_version_follows_weight_contents(tmp_path, monkeypatch):
+    from utils import model_state
+
+    user_weights, anime_weights = tmp_path / "user_weights.pkl", tmp_path / "anime_weights.pkl"
+    user_weights.write_bytes(b"users")
+    anime_weights.write_bytes(b"anime")
+    monkeypatch.setattr(model_state, "USER_WEIGHTS_PATH", str(user_weights))
+    monkeypatch.setattr(model_state, "ANIME_WEIGHTS_PATH", str(anime_weights))
+
+    version = model_state.legacy_model_version()
+    os.utime(user_weights, (0, 0))
+    assert model_state.legacy_model_version() == version
+
+    user_weights.write_bytes(b"retrained")
+    assert model_state.legacy_model_version() != version
+
+
+@pytest.fixture
+def served_store(tmp_path, monkeypatch):
+    from pipeline import prediction_pipeline
+
+    path = str(tmp_path / "store.sqlite")
+    write_store(path, [(1, ["A"])], model_version="v1")
+    monkeypatch.setattr(prediction_pipeline, "RECOMMENDATION_STORE", path)
+    return prediction_pipeline.precomputed_recommendation
+
+
+def test_store_is_only_served_for_its_model_version(served_store):
+    assert served_store(1, "v1") == ["A"]
+    assert served_store(2, "v1") is None
+    assert served_store(1, "v2") is None
+
+
+def test_missing_pickles_are_a_miss(served_store, tmp_path, monkeypatch):
+    from utils import model_state
+
+    monkeypatch.setattr(model_state, "USER_WEIGHTS_PATH", str(tmp_path / "missing.pkl"))
+    assert served_store(1) is None
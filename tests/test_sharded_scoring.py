@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utils import sharded_scoring
+from utils.sharded_scoring import ShardedScorer
+
+
+@pytest.fixture
+def matrix():
+    return np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+
+
+def test_matches_a_single_scan(matrix):
+    with ShardedScorer({"anime": matrix}, 3) as scorer:
+        result = scorer.nearest("anime", 4, 5)
+    expected = np.argsort(-(matrix @ matrix[4]))
+    assert result.indices.tolist() == [i for i in expected if i != 4][:5]
+
+
+def test_views_outlive_the_scorer(matrix):
+    scorer = ShardedScorer({"anime": matrix}, 2)
+    view = scorer.matrices["anime"]
+    scorer.close()
+    np.testing.assert_array_equal(view, matrix)
+
+
+def test_failed_start_stops_the_shards_already_started(matrix, monkeypatch):
+    started = []
+
+    class FailingShard(sharded_scoring.LocalShard):
+        def __init__(self, *args):
+            if started:
+                raise RuntimeError("no more workers")
+            super().__init__(*args)
+            started.append(self)
+
+    monkeypatch.setattr(sharded_scoring, "LocalShard", FailingShard)
+    with pytest.raises(RuntimeError):
+        ShardedScorer({"anime": matrix}, 3)
+    assert len(started) == 1
+    started[0].process.join(timeout=5)
+    assert not started[0].process.is_alive()
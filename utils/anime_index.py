@@ -0,0 +1,208 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+############# ANIME INDEX
+# Inverted index over genres, type and premiered season. Every posting is a
+# boolean bitmap aligned with the encoded anime index, so a filter
+# expression compiles to one mask that is applied to the scores before
+# top-k, at the cost of a few vectorized ANDs/ORs over n_anime booleans.
+#
+# Filter expressions:
+#
+#     genre:Action AND type:TV
+#     genre:"Slice of Life" OR genre:Comedy
+#     type:TV,Movie NOT genre:Horror          (comma = any of, juxtaposition = AND)
+#     (season:spring OR season:fall) AND year>=2010
+#
+# Fields are genre, type, season and year; values are case-insensitive.
+# year also supports =, <, <=, > and >=.
+
+FACETS = ("genre", "type", "season")
+FIELDS = FACETS + ("year",)
+SEASONS = ("spring", "summer", "fall", "winter")
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|(>=|<=|[:=<>])|"([^"]*)"|([^\s()"<>=:]+))')
+
+
+class FilterError(ValueError):
+    """Raised for a filter expression that can't be parsed or names unknown values."""
+
+
+def _normalize(value):
+    return " ".join(str(value).split()).lower()
+
+
+class AnimeIndex:
+    def __init__(self, n_anime, postings, labels, years):
+        self.n_anime = n_anime
+        self.postings = postings    # field -> normalized value -> bool mask
+        self.labels = labels        # field -> normalized value -> display label
+        self.years = years          # premiered year per encoded anime, 0 when unknown
+        self.mask = lru_cache(maxsize=256)(self._mask)
+
+    @classmethod
+    def build(cls, metadata, anime_ids):
+        """
+        Build the index from anime metadata (``anime_id`` plus Genres, Type
+        and Premiered columns) for the anime of ``anime_ids``, in encoded order.
+        """
+        meta = (
+            metadata.drop_duplicates("anime_id")
+            .set_index("anime_id")
+            .reindex(np.asarray(anime_ids))
+            .reset_index(drop=True)
+        )
+        n_anime = len(meta)
+        premiered = meta["Premiered"].fillna("").astype(str).str.split(n=1, expand=True).reindex(columns=[0, 1])
+        columns = {
+            "genre": meta["Genres"].fillna("").astype(str).str.split(",").explode(),
+            "type": meta["Type"],
+            "season": premiered[0],
+        }
+
+        postings, labels = {}, {}
+        for field, values in columns.items():
+            values = values.dropna().astype(str).str.strip()
+            values = values[(values != "") & (values.str.lower() != "unknown")]
+            codes, uniques = pd.factorize(values.map(_normalize))
+            positions = values.index.to_numpy()
+            postings[field], labels[field] = {}, {}
+            for code, value in enumerate(uniques):
+                bitmap = np.zeros(n_anime, dtype=bool)
+                bitmap[positions[codes == code]] = True
+                bitmap.setflags(write=False)
+                postings[field][value] = bitmap
+                labels[field][value] = values.iloc[int(np.argmax(codes == code))]
+
+        years = pd.to_numeric(premiered[1], errors="coerce").fillna(0).astype(np.int16).to_numpy()
+        return cls(n_anime, postings, labels, years)
+
+    def facets(self):
+        """Values available per field, for clients building filters."""
+        values = {field: sorted(self.labels[field].values()) for field in FACETS}
+        known = self.years[self.years > 0]
+        values["year"] = [int(known.min()), int(known.max())] if known.size else []
+        return values
+
+    def memory_bytes(self):
+        return sum(m.nbytes for field in self.postings.values() for m in field.values()) + self.years.nbytes
+
+    def _mask(self, expression):
+        """Read-only boolean mask of the anime matching ``expression`` (cached per expression)."""
+        mask = _Parser(self, expression).parse()
+        mask.setflags(write=False)
+        return mask
+
+    def term(self, field, op, value):
+        if field not in FIELDS:
+            raise FilterError(f"Unknown filter field '{field}', expected one of {', '.join(FIELDS)}")
+        if field == "year":
+            try:
+                year = int(value)
+            except ValueError:
+                raise FilterError(f"year must be a number, got '{value}'")
+            compare = {":": np.equal, "=": np.equal, "<": np.less, "<=": np.less_equal,
+                       ">": np.greater, ">=": np.greater_equal}[op]
+            return compare(self.years, year) & (self.years > 0)
+        if op not in (":", "="):
+            raise FilterError(f"Operator '{op}' is only supported for year")
+
+        mask = np.zeros(self.n_anime, dtype=bool)
+        for part in value.split(","):
+            key = _normalize(part)
+            if not key:
+                continue
+            if key not in self.postings[field]:
+                raise FilterError(f"Unknown {field} '{part.strip()}'")
+            mask |= self.postings[field][key]
+        return mask
+
+
+class _Parser:
+    """
+    Recursive-descent parser that evaluates while parsing:
+
+        expr   := and ("OR" and)*
+        and    := unary (["AND"] unary)*
+        unary  := "NOT" unary | "(" expr ")" | field op value
+    """
+
+    def __init__(self, index, expression):
+        self.index = index
+        self.tokens = self.tokenize(expression)
+        self.pos = 0
+
+    @staticmethod
+    def tokenize(expression):
+        tokens, pos = [], 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = _TOKEN.match(expression, pos)
+            if match is None or match.end() == pos:
+                raise FilterError(f"Unexpected character at position {pos} in filter")
+            lparen, rparen, op, quoted, word = match.groups()
+            if lparen or rparen:
+                tokens.append(("paren", lparen or rparen))
+            elif op:
+                tokens.append(("op", op))
+            elif quoted is not None:
+                tokens.append(("value", quoted))
+            elif word.upper() in ("AND", "OR", "NOT"):
+                tokens.append(("keyword", word.upper()))
+            else:
+                tokens.append(("value", word))
+            pos = match.end()
+        if not tokens:
+            raise FilterError("Empty filter expression")
+        return tokens
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind, text=None):
+        token = self.peek()
+        if token[0] != kind or (text is not None and token[1] != text):
+            found = token[1] if token[1] is not None else "end of filter"
+            raise FilterError(f"Expected {text or kind} but found '{found}'")
+        self.pos += 1
+        return token[1]
+
+    def parse(self):
+        mask = self.expr()
+        if self.pos != len(self.tokens):
+            raise FilterError(f"Unexpected '{self.peek()[1]}' in filter")
+        return mask
+
+    def expr(self):
+        mask = self.conjunction()
+        while self.peek() == ("keyword", "OR"):
+            self.pos += 1
+            mask = mask | self.conjunction()
+        return mask
+
+    def conjunction(self):
+        mask = self.unary()
+        while True:
+            token = self.peek()
+            if token == ("keyword", "AND"):
+                self.pos += 1
+            elif not (token[0] == "value" or token == ("paren", "(") or token == ("keyword", "NOT")):
+                return mask
+            mask = mask & self.unary()
+
+    def unary(self):
+        token = self.peek()
+        if token == ("keyword", "NOT"):
+            self.pos += 1
+            return ~self.unary()
+        if token == ("paren", "("):
+            self.pos += 1
+            mask = self.expr()
+            self.take("paren", ")")
+            return mask
+        field = _normalize(self.take("value"))
+        op = self.take("op")
+        return self.index.term(field, op, self.take("value"))
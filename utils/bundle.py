@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from config.paths_config import *
+
+############# INFERENCE BUNDLE
+# Loader for the bundles written by src/model_export.py. Only numpy and
+# pandas are needed: no pickle and no TensorFlow.
+
+BUNDLE_FORMAT_VERSION = 1
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+METADATA_FILE = "anime_metadata.csv"
+
+
+class BundleError(Exception):
+    """Raised when a bundle is missing, incomplete or fails verification."""
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_version(user_embeddings, anime_embeddings, user_ids, anime_ids):
+    """
+    Version of a model: SHA-256 of its embeddings and the raw IDs of their
+    rows, so exporting the same model again gives the same version.
+    """
+    digest = hashlib.sha256()
+    for array in (user_embeddings, anime_embeddings, user_ids, anime_ids):
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:12]
+
+
+def resolve_bundle_path(root=BUNDLE_DIR):
+    """Directory of the bundle named in ``<root>/LATEST``, or None when there is none."""
+    latest = os.path.join(root, LATEST_FILE)
+    if not os.path.exists(latest):
+        return None
+    with open(latest) as f:
+        return os.path.join(root, f.read().strip())
+
+
+class IdEncoder:
+    """
+    Raw ID -> encoded index mapping backed by two compact arrays.
+
+    ``ids[i]`` is the raw ID of encoded index ``i``; lookups use a binary
+    search over a sorted view, so the encoder behaves like the pickled
+    ``dict`` encoders (``in``, ``[]``, ``get``, ``len``, ``keys``) at a
+    fraction of the memory.
+    """
+
+    def __init__(self, ids, order=None):
+        self.ids = ids
+        self.order = np.argsort(ids, kind="stable") if order is None else order
+        self.sorted_ids = ids[self.order]
+
+    def get(self, raw_id, default=None):
+        try:
+            raw_id = int(raw_id)
+        except (TypeError, ValueError):
+            return default
+        pos = np.searchsorted(self.sorted_ids, raw_id)
+        if pos < len(self.sorted_ids) and self.sorted_ids[pos] == raw_id:
+            return int(self.order[pos])
+        return default
+
+    def __getitem__(self, raw_id):
+        index = self.get(raw_id)
+        if index is None:
+            raise KeyError(raw_id)
+        return index
+
+    def __contains__(self, raw_id):
+        return self.get(raw_id) is not None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def keys(self):
+        return self.ids
+
+    def encode(self, raw_ids):
+        """Vectorized lookup; unknown IDs map to -1."""
+        raw_ids = np.asarray(raw_ids)
+        if len(self.sorted_ids) == 0 or raw_ids.size == 0:
+            return np.full(raw_ids.shape, -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self.sorted_ids, raw_ids), 0, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[pos] == raw_ids
+        return np.where(found, self.order[pos], -1).astype(np.int64)
+
+
+class InferenceBundle:
+    def __init__(self, path, manifest, arrays, metadata):
+        self.path = path
+        self.manifest = manifest
+        self.model_version = manifest["model_version"]
+
+        self.user_embeddings = arrays["user_embeddings"]
+        self.anime_embeddings = arrays["anime_embeddings"]
+        self.user_encoder = IdEncoder(arrays["user_ids"], arrays["user_ids_order"])
+        self.anime_encoder = IdEncoder(arrays["anime_ids"], arrays["anime_ids_order"])
+        # Row i describes encoded anime i
+        self.metadata = metadata
+
+    @property
+    def user_ids(self):
+        return self.user_encoder.ids
+
+    @property
+    def anime_ids(self):
+        return self.anime_encoder.ids
+
+    @staticmethod
+    def read_manifest(path):
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise BundleError(f"No manifest in {path}")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+            raise BundleError(f"Unsupported bundle format {manifest.get('format_version')}")
+        return manifest
+
+    @staticmethod
+    def verify(path, manifest, full=False):
+        """
+        Check every file listed in the manifest.
+
+        The default check compares sizes plus the shape and dtype recorded in
+        each ``.npy`` header, which only touches file metadata and takes
+        milliseconds. ``full=True`` also recomputes the SHA-256 checksums.
+        """
+        for name, entry in manifest["files"].items():
+            file_path = os.path.join(path, entry["path"])
+            if not os.path.exists(file_path):
+                raise BundleError(f"Missing bundle file {entry['path']}")
+            if os.path.getsize(file_path) != entry["bytes"]:
+                raise BundleError(f"Size mismatch for {entry['path']}")
+            if entry["path"].endswith(".npy"):
+                with open(file_path, "rb") as f:
+                    version = np.lib.format.read_magic(f)
+                    if version == (1, 0):
+                        shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+                    else:
+                        shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+                if list(shape) != entry["shape"] or dtype.str != entry["dtype"]:
+                    raise BundleError(f"Shape or dtype mismatch for {entry['path']}")
+            if full and file_checksum(file_path) != entry["sha256"]:
+                raise BundleError(f"Checksum mismatch for {entry['path']}")
+
+    @classmethod
+    def load(cls, path=None, mmap=True, verify="fast"):
+        """
+        Load a bundle (the latest one when ``path`` is None).
+
+        - **mmap**: memory-map the arrays instead of reading them into memory
+        - **verify**: ``"fast"``, ``"full"`` or ``None``
+        """
+        path = path or resolve_bundle_path()
+        if path is None or not os.path.isdir(path):
+            raise BundleError(f"No inference bundle found at {path or BUNDLE_DIR}")
+
+        manifest = cls.read_manifest(path)
+        if verify:
+            cls.verify(path, manifest, full=(verify == "full"))
+
+        arrays = {}
+        for name, entry in manifest["files"].items():
+            if entry["path"].endswith(".npy"):
+                arrays[name] = np.load(os.path.join(path, entry["path"]),
+                                       mmap_mode="r" if mmap else None,
+                                       allow_pickle=False)
+
+        metadata = pd.read_csv(os.path.join(path, manifest["files"]["metadata"]["path"]))
+        return cls(path, manifest, arrays, metadata)
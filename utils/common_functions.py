@@ -1,9 +1,7 @@
 import os
-import pandas
 from src.logger import get_logger
 from src.custom_exception import CustomException
 import yaml
-import pandas as pd
 
 logger = get_logger(__name__)
 
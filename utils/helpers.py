@@ -1,35 +1,183 @@
+import os
+import atexit
+import threading
 import pandas as pd
 import numpy as np
 import joblib
 from config.paths_config import *
+from utils.metrics import CACHE_REQUESTS
+from utils.title_index import TitleIndex
+from utils.neighbour_table import NeighbourTable
+from utils.recommendation_store import RecommendationStore
+from utils.sharded_scoring import ShardedScorer
+from utils.memory_budget import COMPACT, compact_frame, object_bytes
+
+############# 0. CACHED LOADERS
+# Artifacts are read once per file version instead of on every call; the
+# modification time is part of the key so a retrained model is picked up.
+
+_artifact_cache = {}
+_artifact_cache_lock = threading.Lock()
+
+def _cached(kind, path, loader):
+    key = (kind, path)
+    mtime = os.path.getmtime(path)
+    entry = _artifact_cache.get(key)
+    if entry is not None and entry[0] == mtime:
+        CACHE_REQUESTS.inc(cache=kind, result="hit")
+        return entry[1]
+    CACHE_REQUESTS.inc(cache=kind, result="miss")
+    value = loader(path)
+    with _artifact_cache_lock:
+        _artifact_cache[key] = (mtime, value)
+    return value
+
+def load_artifact(path):
+    return _cached("artifact", path, joblib.load)
+
+# Columns the serving path reads, for frames where that is a subset; the
+# encoded user/anime columns of the ratings are only used for training
+SERVING_COLUMNS = {RATING_DF: ["user_id", "anime_id", "rating"]}
+
+def _read_frame(path):
+    if not COMPACT:
+        return pd.read_csv(path)
+    return compact_frame(pd.read_csv(path, usecols=SERVING_COLUMNS.get(path)))
+
+def load_frame(path):
+    return _cached("frame", path, _read_frame)
+
+def load_neighbour_table(path):
+    return _cached("neighbour_table", path, NeighbourTable.load)
+
+def load_recommendation_store(path):
+    return _cached("recommendation_store", path, RecommendationStore)
+
+def cache_memory():
+    """Bytes held by each cached artifact, keyed ``kind:file``, plus the sharded engine's segments."""
+    with _artifact_cache_lock:
+        entries = list(_artifact_cache.items())
+    sizes = {f"{kind}:{os.path.basename(path)}": object_bytes(value) for (kind, path), (_, value) in entries}
+    if _scoring_engine is not None:
+        sizes["scoring_engine"] = _scoring_engine.memory_bytes()
+    return sizes
+
+def frame_lookup(path, column):
+    """Value of ``column`` -> row positions in the frame at ``path``, instead of a full scan per lookup."""
+    return _cached(f"lookup:{column}", path, lambda p: load_frame(p).groupby(column, sort=False).indices)
+
+def get_title_index(path_df, path_synopsis_df=SYNOPSIS_DF):
+    """Title index over the English titles of ``path_df`` and the original names of ``path_synopsis_df``."""
+    def build(path):
+        names = load_frame(path_synopsis_df) if os.path.exists(path_synopsis_df) else None
+        return TitleIndex.build(load_frame(path), names)
+    return _cached("title_index", path_df, build)
+
+############# SHARDED NEAREST-NEIGHBOUR SEARCH
+# With SCORING_SHARDS > 1 the user and anime embeddings are split across
+# that many worker processes (shared memory, scatter-gather top-k) instead
+# of being scanned by one core per query. Off by default: on few cores the
+# inter-process round trip costs more than it saves. The pickles are read
+# outside the artifact cache and dropped once copied to shared memory, and
+# embedding_weights hands out the shared views, so only one copy exists.
+# Views still held when the weight files change and the engine is rebuilt
+# stay readable until they are dropped.
+
+SCORING_SHARDS = int(os.environ.get("SCORING_SHARDS", "0"))
+# multiprocessing start method of the shard workers, platform default when unset
+SCORING_START_METHOD = os.environ.get("SCORING_START_METHOD") or None
+# Searches in flight per shard
+SCORING_PIPES_PER_SHARD = int(os.environ.get("SCORING_PIPES_PER_SHARD", "4"))
+
+_scoring_engine = None
+_scoring_engine_key = None
+_scoring_engine_lock = threading.Lock()
+
+def _close_scoring_engine():
+    if _scoring_engine is not None:
+        _scoring_engine.close()
+
+atexit.register(_close_scoring_engine)
+
+def get_scoring_engine(path_user_weights=USER_WEIGHTS_PATH, path_anime_weights=ANIME_WEIGHTS_PATH):
+    """The sharded engine for the current weight files, None when sharding is off; rebuilt when they change."""
+    global _scoring_engine, _scoring_engine_key
+    if SCORING_SHARDS <= 1:
+        return None
+    key = (path_user_weights, os.path.getmtime(path_user_weights), path_anime_weights, os.path.getmtime(path_anime_weights))
+    if _scoring_engine_key != key:
+        with _scoring_engine_lock:
+            if _scoring_engine_key != key:
+                engine = ShardedScorer({"user": joblib.load(path_user_weights), "anime": joblib.load(path_anime_weights)},
+                                       SCORING_SHARDS, start_method=SCORING_START_METHOD,
+                                       pipes_per_shard=SCORING_PIPES_PER_SHARD)
+                previous, _scoring_engine, _scoring_engine_key = _scoring_engine, engine, key
+                if previous is not None:
+                    previous.close()
+    return _scoring_engine
+
+def embedding_weights(matrix, path):
+    """
+    The "user" or "anime" embeddings at ``path``: the sharded engine's
+    shared-memory view when sharding is on, the cached pickle otherwise.
+    """
+    engine = get_scoring_engine()
+    if engine is not None and path == {"user": USER_WEIGHTS_PATH, "anime": ANIME_WEIGHTS_PATH}[matrix]:
+        return engine.matrices[matrix]
+    return load_artifact(path)
+
+def nearest_rows(matrix, weights, index, n):
+    """
+    The ``n`` rows of ``weights`` (the "user" or "anime" embeddings) with the
+    highest similarity to row ``index``, itself included: (indices, similarities), best first.
+    """
+    engine = get_scoring_engine()
+    if engine is not None:
+        result = engine.nearest(matrix, index, n, exclude_self=False)
+        return result.indices, result.scores
+    dists = np.dot(weights, weights[index])
+    closest = np.argsort(dists)[-n:][::-1]
+    return closest, dists[closest]
+
+def _rows(df, positions):
+    return df.iloc[positions if positions is not None else []]
 
 ############# 1. GET_ANIME_FRAME
 
 def getAnimeFrame(anime,path_df):
-    df = pd.read_csv(path_df)
-    if isinstance(anime,int):
-        return df[df.anime_id == anime]
+    df = load_frame(path_df)
+    if isinstance(anime,(int,np.integer)):
+        return _rows(df, frame_lookup(path_df,"anime_id").get(anime))
     if isinstance(anime,str):
-        return df[df.eng_version == anime]
+        positions = frame_lookup(path_df,"eng_version").get(anime)
+        if positions is None:
+            # Original name, different spelling or typo: resolve through the title index
+            anime_id = get_title_index(path_df).resolve(anime)
+            positions = frame_lookup(path_df,"anime_id").get(anime_id)
+        return _rows(df, positions)
     
 
 ########## 2. GET_SYNOPSIS
 
 def getSynopsis(anime,path_synopsis_df):
-    synopsis_df = pd.read_csv(path_synopsis_df)
-    if isinstance(anime,int):
-        return synopsis_df[synopsis_df.MAL_ID == anime].sypnopsis.values[0]
+    synopsis_df = load_frame(path_synopsis_df)
+    if isinstance(anime,(int,np.integer)):
+        return _rows(synopsis_df, frame_lookup(path_synopsis_df,"MAL_ID").get(anime)).sypnopsis.values[0]
     if isinstance(anime,str):
-        return synopsis_df[synopsis_df.Name == anime].sypnopsis.values[0]
+        positions = frame_lookup(path_synopsis_df,"Name").get(anime)
+        if positions is None:
+            anime_id = get_title_index(DF, path_synopsis_df).resolve(anime)
+            positions = frame_lookup(path_synopsis_df,"MAL_ID").get(anime_id)
+        return _rows(synopsis_df, positions).sypnopsis.values[0]
 
 
 ########## 3. CONTENT RECOMMENDATION
 
 def find_similar_animes(name, path_anime_weights, path_anime2anime_encoded, path_anime2anime_decoded, path_anime_df, n=10, return_dist=False, neg=False):
     # Load weights and encoded-decoded mappings
-    anime_weights = joblib.load(path_anime_weights)
-    anime2anime_encoded = joblib.load(path_anime2anime_encoded)
-    anime2anime_decoded = joblib.load(path_anime2anime_decoded)
+    anime_weights = embedding_weights("anime", path_anime_weights)
+    anime2anime_encoded = load_artifact(path_anime2anime_encoded)
+    anime2anime_decoded = load_artifact(path_anime2anime_decoded)
 
     # Get the anime ID for the given name
     index = getAnimeFrame(name, path_anime_df).anime_id.values[0]
@@ -38,22 +186,26 @@ def find_similar_animes(name, path_anime_weights, path_anime2anime_encoded, path
     if encoded_index is None:
         raise ValueError(f"Encoded index not found for anime ID: {index}")
 
-    # Compute similarity distances
-    weights = anime_weights
-    dists = np.dot(weights, weights[encoded_index])  # Ensure weights[encoded_index] is a 1D array
-    sorted_dists = np.argsort(dists)
-
     n = n + 1
 
-    # Select closest or farthest based on 'neg' flag
-    if neg:
-        closest = sorted_dists[:n]
-    else:
-        closest = sorted_dists[-n:]
+    if neg or return_dist:
+        # Compute similarity distances
+        weights = anime_weights
+        dists = np.dot(weights, weights[encoded_index])  # Ensure weights[encoded_index] is a 1D array
+        sorted_dists = np.argsort(dists)
+
+        # Select closest or farthest based on 'neg' flag
+        if neg:
+            closest = sorted_dists[:n]
+        else:
+            closest = sorted_dists[-n:]
 
-    # Return distances and closest indices if requested
-    if return_dist:
-        return dists, closest
+        # Return distances and closest indices if requested
+        if return_dist:
+            return dists, closest
+    else:
+        closest, similarities = nearest_rows("anime", anime_weights, encoded_index, n)
+        dists = dict(zip(closest.tolist(), similarities.tolist()))
 
     # Build the similarity array
     SimilarityArr = []
@@ -78,34 +230,54 @@ def find_similar_animes(name, path_anime_weights, path_anime2anime_encoded, path
     return Frame[Frame.anime_id != index].drop(['anime_id'], axis=1)
 
 
+def find_table_neighbours(name, path_neighbour_table, path_anime_df, n=10):
+    """Names of the ``n`` nearest anime of ``name`` in a precomputed neighbour table (synopsis or co-occurrence)."""
+    if not os.path.exists(path_neighbour_table):
+        return []
+    anime_frame = getAnimeFrame(name, path_anime_df)
+    if anime_frame.empty:
+        return []
+    neighbour_ids, _ = load_neighbour_table(path_neighbour_table).lookup(int(anime_frame.anime_id.values[0]), n)
+
+    names = []
+    for anime_id in neighbour_ids:
+        neighbour_frame = getAnimeFrame(int(anime_id), path_anime_df)
+        if not neighbour_frame.empty:
+            names.append(neighbour_frame.eng_version.values[0])
+    return names
+
+
 ######## 4. FIND_SIMILAR_USERS
 
 
 def find_similar_users(item_input , path_user_weights , path_user2user_encoded , path_user2user_decoded, n=10 , return_dist=False,neg=False):
     try:
 
-        user_weights = joblib.load(path_user_weights)
-        user2user_encoded = joblib.load(path_user2user_encoded)
-        user2user_decoded = joblib.load(path_user2user_decoded)
+        user_weights = embedding_weights("user", path_user_weights)
+        user2user_encoded = load_artifact(path_user2user_encoded)
+        user2user_decoded = load_artifact(path_user2user_decoded)
 
         index=item_input
         encoded_index = user2user_encoded.get(index)
 
         weights = user_weights
 
-        dists = np.dot(weights,weights[encoded_index])
-        sorted_dists = np.argsort(dists)
-
         n=n+1
 
-        if neg:
-            closest = sorted_dists[:n]
-        else:
-            closest = sorted_dists[-n:]
-            
+        if neg or return_dist:
+            dists = np.dot(weights,weights[encoded_index])
+            sorted_dists = np.argsort(dists)
 
-        if return_dist:
-            return dists,closest
+            if neg:
+                closest = sorted_dists[:n]
+            else:
+                closest = sorted_dists[-n:]
+
+            if return_dist:
+                return dists,closest
+        else:
+            closest, similarities = nearest_rows("user", weights, encoded_index, n)
+            dists = dict(zip(closest.tolist(), similarities.tolist()))
         
         SimilarityArr = []
 
@@ -127,12 +299,8 @@ def find_similar_users(item_input , path_user_weights , path_user2user_encoded ,
 
 ################## 5. GET USER PREF
 
-def get_user_preferences(user_id , path_rating_df , path_anime_df ):
-
-
-    rating_df = pd.read_csv(path_rating_df)
-    df = pd.read_csv(path_anime_df)
-
+def user_preferences(user_id, rating_df, df):
+    """get_user_preferences over frames already in memory (the API's model state)."""
     animes_watched_by_user = rating_df[rating_df.user_id == user_id]
 
     user_rating_percentile = np.percentile(animes_watched_by_user.rating , 75)
@@ -149,45 +317,49 @@ def get_user_preferences(user_id , path_rating_df , path_anime_df ):
 
     return anime_df_rows
 
+def get_user_preferences(user_id , path_rating_df , path_anime_df ):
+    return user_preferences(user_id, load_frame(path_rating_df), load_frame(path_anime_df))
 
 
-######## 6. USER RECOMMENDATION
-
-
-def get_user_recommendations(similar_users , user_pref ,path_anime_df , path_synopsis_df, path_rating_df, n=10):
 
+######## 6. USER RECOMMENDATION
 
-    recommended_animes = []
+def user_recommendation_counts(similar_users, user_pref, rating_df, df, n=10):
+    """How many similar users liked each anime ``user_pref`` doesn't hold, most liked ``n`` first."""
     anime_list = []
 
     for user_id in similar_users.similar_users.values:
-        pref_list = get_user_preferences(int(user_id) , path_rating_df, path_anime_df)
+        pref_list = user_preferences(int(user_id), rating_df, df)
 
         pref_list = pref_list[~pref_list.eng_version.isin(user_pref.eng_version.values)]
 
         if not pref_list.empty:
             anime_list.append(pref_list.eng_version.values)
 
-    if anime_list:
-            anime_list = pd.DataFrame(anime_list)
-
-            sorted_list = pd.DataFrame(pd.Series(anime_list.values.ravel()).value_counts()).head(n)
+    if not anime_list:
+        return pd.Series(dtype=np.int64)
+    anime_list = pd.DataFrame(anime_list)
+    return pd.Series(anime_list.values.ravel()).value_counts().head(n)
 
-            for i,anime_name in enumerate(sorted_list.index):
-                n_user_pref = sorted_list[sorted_list.index == anime_name].values[0][0]
+def get_user_recommendations(similar_users , user_pref ,path_anime_df , path_synopsis_df, path_rating_df, n=10):
 
-                if isinstance(anime_name,str):
-                    frame = getAnimeFrame(anime_name,path_anime_df)
-                    anime_id = frame.anime_id.values[0]
-                    genre = frame.Genres.values[0]
-                    synopsis = getSynopsis(int(anime_id),path_synopsis_df)
 
-                    recommended_animes.append({
-                        "n" : n_user_pref,
-                        "anime_name" : anime_name,
-                        "Genres" : genre,
-                        "Synopsis": synopsis
-                    })
+    recommended_animes = []
+    sorted_list = user_recommendation_counts(similar_users, user_pref, load_frame(path_rating_df), load_frame(path_anime_df), n)
+
+    for anime_name, n_user_pref in sorted_list.items():
+        if isinstance(anime_name,str):
+            frame = getAnimeFrame(anime_name,path_anime_df)
+            anime_id = frame.anime_id.values[0]
+            genre = frame.Genres.values[0]
+            synopsis = getSynopsis(int(anime_id),path_synopsis_df)
+
+            recommended_animes.append({
+                "n" : n_user_pref,
+                "anime_name" : anime_name,
+                "Genres" : genre,
+                "Synopsis": synopsis
+            })
     return pd.DataFrame(recommended_animes).head(n)
             
 
@@ -0,0 +1,94 @@
+import os
+import sys
+import resource
+import numpy as np
+import pandas as pd
+
+############# MEMORY BUDGET
+# Pods in deployment.yaml get 512Mi. With MEMORY_BUDGET_MB set, serving
+# holds its artifacts in compact form: narrow numeric dtypes, repeated
+# strings as categoricals or interned objects, array-backed ID encoders,
+# and only the columns the serving path reads. The memory of every
+# artifact is reported when a generation loads, and one that doesn't fit
+# the budget is refused instead of being OOM-killed later under traffic.
+
+# 0 disables the budget and compaction
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB", "0"))
+COMPACT = MEMORY_BUDGET_MB > 0
+
+# String columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def compact_frame(df, category_ratio=CATEGORY_RATIO):
+    """
+    Copy of ``df`` with integers downcast, floats downcast only where that
+    is lossless, repeated strings as categoricals and all other strings
+    interned, so equal values share one object.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_integer_dtype(values):
+            values = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values):
+            narrow = values.astype(np.float32)
+            if np.array_equal(narrow.to_numpy(np.float64), values.to_numpy(), equal_nan=True):
+                values = narrow
+        elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            if values.nunique(dropna=True) <= category_ratio * len(values):
+                values = values.astype("category")
+            else:
+                values = values.astype(object).map(_intern)
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def object_bytes(obj):
+    """Approximate memory of one artifact (arrays, frames, encoders, indexes or dicts)."""
+    if hasattr(obj, "memory_bytes"):
+        return obj.memory_bytes()
+    if hasattr(obj, "loaded") and hasattr(obj, "get"):
+        # Not read yet counts as nothing, so with a budget serving reads the ratings up front
+        return object_bytes(obj.get()) if obj.loaded else 0
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    if hasattr(obj, "__dict__"):
+        return sum(object_bytes(v) for v in vars(obj).values() if isinstance(v, (np.ndarray, pd.DataFrame, dict)))
+    return sys.getsizeof(obj)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def memory_report(sizes, budget_mb=MEMORY_BUDGET_MB):
+    """Table of ``sizes`` (artifact -> bytes), largest first, with the total, peak RSS and budget."""
+    width = max([len(name) for name in sizes] + [8])
+    lines = [f"  {name:<{width}} {size / 2**20:9.1f} MB" for name, size in sorted(sizes.items(), key=lambda x: -x[1])]
+    lines.append(f"  {'total':<{width}} {sum(sizes.values()) / 2**20:9.1f} MB")
+    lines.append(f"  {'peak rss':<{width}} {peak_rss_bytes() / 2**20:9.1f} MB")
+    if budget_mb > 0:
+        lines.append(f"  {'budget':<{width}} {budget_mb:9.1f} MB")
+    return "\n".join(lines)
+
+
+def check_budget(sizes, budget_mb=MEMORY_BUDGET_MB):
+    """Raise MemoryBudgetExceeded, with the breakdown, if the artifacts take more than ``budget_mb``."""
+    total_mb = sum(sizes.values()) / 2**20
+    if budget_mb > 0 and total_mb > budget_mb:
+        raise MemoryBudgetExceeded(
+            f"Artifacts need {total_mb:.1f} MB, over the MEMORY_BUDGET_MB of {budget_mb:.0f} MB:\n{memory_report(sizes, budget_mb)}")
@@ -0,0 +1,224 @@
+import os
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+from src.logger import dropped_records
+
+############# METRICS
+# Minimal Prometheus-compatible registry (text exposition format 0.0.4)
+# so the serving processes can expose /metrics without extra dependencies.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are either set directly or produced by a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._callback = None
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, callback):
+        """``callback()`` returns a dict of label-value tuples -> value (``()`` without labels)."""
+        self._callback = callback
+
+    def render(self):
+        lines = self.header()
+        values = dict(self._values)
+        if self._callback is not None:
+            try:
+                values.update(self._callback())
+            except Exception:
+                pass
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, ([*s[0]], s[1], s[2])) for key, s in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "recsys_request_duration_seconds", "End-to-end request latency", labels=("endpoint",))
+STAGE_LATENCY = REGISTRY.histogram(
+    "recsys_stage_duration_seconds", "Latency of one stage of a request", labels=("endpoint", "stage"))
+REQUESTS = REGISTRY.counter(
+    "recsys_requests_total", "Requests served", labels=("endpoint", "status"))
+BATCH_SIZE = REGISTRY.histogram(
+    "recsys_batch_size", "Number of items requested per call", labels=("endpoint",), buckets=SIZE_BUCKETS)
+CACHE_REQUESTS = REGISTRY.counter(
+    "recsys_cache_requests_total", "Cache lookups", labels=("cache", "result"))
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "recsys_model_load_seconds", "Time taken to load the serving model generation")
+ARTIFACT_MEMORY = REGISTRY.gauge(
+    "recsys_artifact_memory_bytes", "Memory held by each loaded artifact", labels=("artifact",))
+PROCESS_MEMORY = REGISTRY.gauge(
+    "process_resident_memory_bytes", "Resident set size of the process")
+HYBRID_TIERS = REGISTRY.counter(
+    "recsys_hybrid_tier_total", "Hybrid requests by the tier that served them", labels=("tier", "reason"))
+LOG_RECORDS_DROPPED = REGISTRY.gauge(
+    "recsys_log_records_dropped", "Log records dropped because the async logging queue was full")
+
+
+def resident_memory_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+PROCESS_MEMORY.set_function(lambda: {(): resident_memory_bytes()})
+LOG_RECORDS_DROPPED.set_function(lambda: {(): dropped_records()})
+
+
+# Stage timings of the current request, so the request timer can attribute
+# the time not covered by any stage (framework, validation, serialization)
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def stage_timer(endpoint, stage):
+    """Record the duration of one stage of ``endpoint``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, endpoint=endpoint, stage=stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + elapsed
+
+
+def begin_request():
+    """Start collecting stage timings for the request running in this context."""
+    stages = {}
+    _request_stages.set(stages)
+    return stages, time.perf_counter()
+
+
+def end_request(endpoint, status, started, stages, remainder_stage="serialization"):
+    """Record the request latency and the time spent outside the named stages."""
+    elapsed = time.perf_counter() - started
+    REQUEST_LATENCY.observe(elapsed, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=status)
+    if stages:
+        STAGE_LATENCY.observe(max(elapsed - sum(stages.values()), 0.0), endpoint=endpoint, stage=remainder_stage)
+    return elapsed
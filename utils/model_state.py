@@ -0,0 +1,284 @@
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from config.paths_config import *
+from utils.bundle import InferenceBundle, IdEncoder, resolve_bundle_path, file_checksum, LATEST_FILE
+from utils.scoring import score_users, score_items, top_k, popularity_table
+from utils.anime_index import AnimeIndex
+from utils.title_index import TitleIndex
+from utils.neighbour_table import NeighbourTable
+from utils.serialization import AnimeMetadata
+from utils.memory_budget import COMPACT, compact_frame, object_bytes
+
+# Threads used to read artifacts concurrently; file reads, unpickling of
+# numpy arrays and CSV parsing release the GIL for most of their time
+LOAD_WORKERS = int(os.environ.get("MODEL_LOAD_WORKERS", "8"))
+
+
+class LazyArtifact:
+    """A value loaded on first use, at most once, by whichever thread asks first."""
+
+    def __init__(self, loader, value=None, loaded=False):
+        self._loader = loader
+        self._value = value
+        self._loaded = loaded
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._loader()
+                    self._loaded = True
+        return self._value
+
+
+def _popularity_from_ratings():
+    # Fallback for artifacts processed before the popularity table existed
+    return popularity_table(pd.read_csv(RATING_DF, usecols=["anime_id", "rating"]))
+
+
+def _read_ratings():
+    # Only the columns the hybrid user stage reads
+    ratings = pd.read_csv(RATING_DF, usecols=["user_id", "anime_id", "rating"])
+    return compact_frame(ratings) if COMPACT else ratings
+
+
+############# MODEL STATE
+# Everything the API needs to serve one model generation, bundled in one
+# immutable object so a reload can swap it atomically.
+
+@dataclass(frozen=True)
+class ModelState:
+    generation: int
+    model_version: str
+    source: str
+    user2user_encoded: Any
+    user2user_decoded: Any
+    anime2anime_encoded: Any
+    anime2anime_decoded: Any
+    user_weights: np.ndarray
+    anime_weights: np.ndarray
+    anime_df: pd.DataFrame
+    popularity: LazyArtifact
+    anime_index: AnimeIndex
+    title_index: TitleIndex
+    metadata: AnimeMetadata
+    content_neighbours: Optional[NeighbourTable] = None
+    cooccurrence_neighbours: Optional[NeighbourTable] = None
+    # Full ratings for the hybrid user stage, read on its first request
+    ratings: Optional[LazyArtifact] = None
+    loaded_at: float = field(default_factory=time.time)
+    load_seconds: float = 0.0
+
+    @property
+    def num_users(self):
+        return len(self.user2user_encoded)
+
+    @property
+    def num_anime(self):
+        return len(self.anime2anime_encoded)
+
+    def user_ids(self, start, stop):
+        """Raw IDs of encoded users [start, stop), without materializing the rest."""
+        return _decoded_slice(self.user2user_decoded, start, min(stop, self.num_users))
+
+    def encode_anime(self, anime_ids):
+        """Encoded indices of raw anime IDs, -1 for anime the model doesn't know."""
+        encoder = self.anime2anime_encoded
+        if hasattr(encoder, "encode"):
+            return encoder.encode(anime_ids)
+        return np.array([encoder.get(int(a), -1) for a in anime_ids], dtype=np.int64)
+
+
+def _decoded_slice(decoded, start, stop):
+    if isinstance(decoded, np.ndarray):
+        return decoded[start:stop].astype(np.int64)
+    return np.fromiter((decoded[i] for i in range(start, stop)), dtype=np.int64, count=max(stop - start, 0))
+
+
+# (path, mtime, size) of the weight files -> their version, so they are only hashed again when touched
+_legacy_versions = {}
+
+
+def legacy_model_version():
+    """
+    Version for pickle artifacts: SHA-256 of the weight files, so a copy,
+    re-pull or touch that leaves the contents alone keeps the version.
+    """
+    paths = (USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH)
+    key = tuple((path, os.path.getmtime(path), os.path.getsize(path)) for path in paths)
+    version = _legacy_versions.get(key)
+    if version is None:
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(file_checksum(path).encode())
+        version = f"legacy-{digest.hexdigest()[:12]}"
+        _legacy_versions.clear()
+        _legacy_versions[key] = version
+    return version
+
+
+def load_model_state(generation=1, max_workers=LOAD_WORKERS):
+    """
+    Load the latest bundle, or the legacy pickles when no bundle was exported.
+
+    Independent artifacts are read concurrently. Without a memory budget the
+    full ratings are not read up front: the hybrid user stage reads them on
+    first use, and popularity comes from the small precomputed table or is
+    aggregated from the ratings when that table is missing. With a budget
+    the ratings are read with everything else, so the budget check counts
+    them before the generation takes traffic.
+    """
+    start = time.perf_counter()
+    bundle_path = resolve_bundle_path()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if bundle_path is not None:
+            # Versioned inference bundle: memory-mapped arrays, no pickle
+            jobs = {"bundle": executor.submit(InferenceBundle.load, bundle_path)}
+        else:
+            jobs = {
+                "user2user_encoded": executor.submit(joblib.load, USER2USER_ENCODED),
+                "user2user_decoded": executor.submit(joblib.load, USER2USER_DECODED),
+                "anime2anime_encoded": executor.submit(joblib.load, ANIME2ANIME_ENCODED),
+                "anime2anime_decoded": executor.submit(joblib.load, ANIME2ANIME_DECODED),
+                "user_weights": executor.submit(joblib.load, USER_WEIGHTS_PATH),
+                "anime_weights": executor.submit(joblib.load, ANIME_WEIGHTS_PATH),
+                "anime_df": executor.submit(pd.read_csv, DF),
+            }
+        if os.path.exists(POPULARITY_DF):
+            jobs["popularity"] = executor.submit(pd.read_csv, POPULARITY_DF)
+        if os.path.exists(SYNOPSIS_DF):
+            # Original names, so titles can be searched in either language
+            jobs["names"] = executor.submit(pd.read_csv, SYNOPSIS_DF, usecols=["MAL_ID", "Name"])
+        if os.path.exists(CONTENT_NEIGHBOURS):
+            jobs["content_neighbours"] = executor.submit(NeighbourTable.load, CONTENT_NEIGHBOURS)
+        if os.path.exists(COOCCURRENCE_NEIGHBOURS):
+            jobs["cooccurrence_neighbours"] = executor.submit(NeighbourTable.load, COOCCURRENCE_NEIGHBOURS)
+        if COMPACT and os.path.exists(RATING_DF):
+            jobs["ratings"] = executor.submit(_read_ratings)
+        loaded = {name: job.result() for name, job in jobs.items()}
+
+    if bundle_path is not None:
+        bundle = loaded.pop("bundle")
+        parts = dict(
+            model_version=bundle.model_version,
+            source=bundle_path,
+            user2user_encoded=bundle.user_encoder,
+            user2user_decoded=bundle.user_ids,
+            anime2anime_encoded=bundle.anime_encoder,
+            anime2anime_decoded=bundle.anime_ids,
+            user_weights=bundle.user_embeddings,
+            anime_weights=bundle.anime_embeddings,
+            # Rows for anime without metadata are only there to keep the alignment
+            anime_df=bundle.metadata.dropna(subset=["eng_version"]),
+        )
+        anime_index = AnimeIndex.build(bundle.metadata, bundle.anime_ids)
+        metadata = AnimeMetadata.build(parts["anime_df"], bundle.anime_ids)
+    else:
+        parts = dict(model_version=legacy_model_version(), source=PROCESSED_DIR)
+        decoded = loaded["anime2anime_decoded"]
+        anime_ids = [decoded[i] for i in range(len(decoded))]
+        anime_index = AnimeIndex.build(loaded["anime_df"], anime_ids)
+        metadata = AnimeMetadata.build(loaded["anime_df"], anime_ids)
+        if COMPACT:
+            # Array-backed encoders instead of dicts of Python ints, as in bundles
+            user_ids = _decoded_slice(loaded["user2user_decoded"], 0, len(loaded["user2user_decoded"]))
+            anime_ids = np.asarray(anime_ids, dtype=np.int64)
+            loaded.update(user2user_encoded=IdEncoder(user_ids), user2user_decoded=user_ids,
+                          anime2anime_encoded=IdEncoder(anime_ids), anime2anime_decoded=anime_ids)
+
+    title_index = TitleIndex.build(parts.get("anime_df", loaded.get("anime_df")), loaded.pop("names", None))
+
+    if COMPACT:
+        # Every view the API needs is built from it; keep the frame in its compact form
+        frames = parts if "anime_df" in parts else loaded
+        frames["anime_df"] = compact_frame(frames["anime_df"])
+        if "popularity" in loaded:
+            loaded["popularity"] = compact_frame(loaded["popularity"])
+
+    if "popularity" in loaded:
+        popularity = LazyArtifact(None, value=loaded.pop("popularity"), loaded=True)
+    else:
+        popularity = LazyArtifact(_popularity_from_ratings)
+
+    if "ratings" in loaded:
+        ratings = LazyArtifact(None, value=loaded.pop("ratings"), loaded=True)
+    else:
+        ratings = LazyArtifact(_read_ratings) if os.path.exists(RATING_DF) else None
+
+    return ModelState(
+        generation=generation,
+        popularity=popularity,
+        ratings=ratings,
+        anime_index=anime_index,
+        title_index=title_index,
+        metadata=metadata,
+        load_seconds=time.perf_counter() - start,
+        **parts,
+        **loaded,
+    )
+
+
+def validate_model_state(state):
+    """Raise ValueError if the artifacts of a generation are inconsistent."""
+    if state.user_weights.ndim != 2 or state.anime_weights.ndim != 2:
+        raise ValueError("Embedding matrices must be 2-D")
+    if state.user_weights.shape[1] != state.anime_weights.shape[1]:
+        raise ValueError("User and anime embeddings have different sizes")
+    if state.user_weights.shape[0] != state.num_users:
+        raise ValueError(f"{state.user_weights.shape[0]} user embeddings for {state.num_users} encoded users")
+    if state.anime_weights.shape[0] != state.num_anime:
+        raise ValueError(f"{state.anime_weights.shape[0]} anime embeddings for {state.num_anime} encoded anime")
+    if not (np.isfinite(state.user_weights).all() and np.isfinite(state.anime_weights).all()):
+        raise ValueError("Embeddings contain NaN or infinite values")
+    if "anime_id" not in state.anime_df.columns:
+        raise ValueError("Anime metadata has no anime_id column")
+
+
+def warmup_model_state(state, n_queries=8, k=10):
+    """
+    Run a few real queries so pages of memory-mapped arrays are faulted in
+    and code paths are exercised before the generation takes traffic.
+    """
+    rng = np.random.default_rng(0)
+    users = rng.integers(0, state.num_users, size=min(n_queries, state.num_users))
+    anime = rng.integers(0, state.num_anime, size=min(n_queries, state.num_anime))
+    for user in users:
+        top_k(score_users(state.user_weights, state.anime_weights, int(user)), k)
+    for item in anime:
+        top_k(score_items(state.anime_weights, int(item)), k, exclude=[int(item)])
+
+
+def artifact_fingerprint():
+    """Modification times and sizes of the artifacts a reload would read."""
+    paths = [os.path.join(BUNDLE_DIR, LATEST_FILE), USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH,
+             USER2USER_ENCODED, ANIME2ANIME_ENCODED, DF, POPULARITY_DF, RATING_DF, CONTENT_NEIGHBOURS,
+             COOCCURRENCE_NEIGHBOURS]
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+
+def artifact_memory(state):
+    """Bytes held by each artifact of a generation (memory-mapped arrays count their mapped size)."""
+    names = ["user2user_encoded", "user2user_decoded", "anime2anime_encoded", "anime2anime_decoded",
+             "user_weights", "anime_weights", "anime_df", "popularity", "anime_index", "title_index", "metadata", "content_neighbours",
+             "cooccurrence_neighbours", "ratings"]
+    return {name: object_bytes(getattr(state, name)) for name in names if getattr(state, name) is not None}
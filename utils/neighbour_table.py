@@ -0,0 +1,112 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.scoring import top_k
+
+############# NEIGHBOUR TABLE
+# Precomputed top-K neighbours of every anime, stored as a fixed-width
+# table so a lookup is one dict access plus a row slice. Used for the
+# synopsis neighbours (ContentSimilarity) and the rating co-occurrence
+# neighbours (ItemCooccurrence):
+#
+#   anime_ids   (n,)    int64    anime ID of each row
+#   neighbours  (n, K)  int32    row index of each neighbour, best first
+#   scores      (n, K)  float16  cosine similarity, 0 for padding
+
+class NeighbourTable:
+    def __init__(self, anime_ids, neighbours, scores):
+        self.anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        self.neighbours = np.asarray(neighbours, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float16)
+        self.rows = {int(anime_id): row for row, anime_id in enumerate(self.anime_ids)}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["anime_ids"], data["neighbours"], data["scores"])
+
+    def save(self, path):
+        """Write atomically so a serving process never reads a partial table."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, anime_ids=self.anime_ids, neighbours=self.neighbours, scores=self.scores)
+        os.replace(tmp_path, path)
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def __len__(self):
+        return len(self.anime_ids)
+
+    def __contains__(self, anime_id):
+        return anime_id in self.rows
+
+    def memory_bytes(self):
+        return self.anime_ids.nbytes + self.neighbours.nbytes + self.scores.nbytes
+
+    def lookup(self, anime_id, n=None):
+        """Anime IDs and similarities of the neighbours of ``anime_id``, best first."""
+        row = self.rows.get(anime_id)
+        if row is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.scores[row, :n].astype(np.float32)
+        keep = scores > 0
+        return self.anime_ids[self.neighbours[row, :n][keep]], scores[keep]
+
+
+############# BUILDING
+# The full n x n similarity matrix is never materialized: row blocks of the
+# sparse product are computed, reduced to their top-K and discarded, in
+# parallel across a process pool.
+
+# Sparse matrix, row norms and shrinkage held by each worker, set once by _init_worker
+_MATRIX = None
+_NORMS = None
+_SHRINKAGE = 0.0
+
+
+def _init_worker(matrix, norms, shrinkage):
+    global _MATRIX, _NORMS, _SHRINKAGE
+    _MATRIX, _NORMS, _SHRINKAGE = matrix, norms, shrinkage
+
+
+def _neighbours_block(task):
+    """Top-k of a block of rows against every row, itself excluded."""
+    start, end, k = task
+    block = (_MATRIX[start:end] @ _MATRIX.T).toarray()
+    if _NORMS is not None:
+        block /= np.outer(_NORMS[start:end], _NORMS) + _SHRINKAGE
+    block[np.arange(end - start), np.arange(start, end)] = -np.inf
+    top = top_k(block, k)
+    scores = np.take_along_axis(block, top, axis=1)
+    return start, top.astype(np.int32), np.maximum(scores, 0).astype(np.float16)
+
+
+def sparse_top_k(matrix, k, block_size, n_workers=1, norms=None, shrinkage=0.0):
+    """
+    Neighbour rows and scores of the ``k`` most similar rows of every row
+    of the sparse ``matrix``.
+
+    The score is the dot product of two rows, divided by
+    ``norms[a] * norms[b] + shrinkage`` when ``norms`` is given (a shrunk
+    cosine); without ``norms`` the rows must already be L2-normalized.
+    """
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    tasks = [(start, min(start + block_size, n), k) for start in range(0, n, block_size)]
+    neighbours = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float16)
+
+    if n_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(matrix, norms, shrinkage)) as executor:
+            results = list(executor.map(_neighbours_block, tasks))
+    else:
+        _init_worker(matrix, norms, shrinkage)
+        results = [_neighbours_block(task) for task in tasks]
+        _init_worker(None, None, 0.0)
+
+    for start, top, top_scores in results:
+        neighbours[start:start + len(top)] = top
+        scores[start:start + len(top)] = top_scores
+    return neighbours, scores
@@ -0,0 +1,225 @@
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from config.paths_config import PROFILE_DIR
+
+############# PROFILING
+# On-demand profiling for the API, the web app and pipeline stages.
+#
+#   sampling  a background thread snapshots every thread's Python stack
+#             every few milliseconds; low overhead, sees all threads.
+#             Writes folded stacks ("a;b;c 42" per line) for flamegraph.pl,
+#             speedscope or inferno, plus a top-functions summary.
+#   cprofile  deterministic cProfile of the thread that starts it; exact
+#             call counts, higher overhead. Writes a .prof file (snakeviz,
+#             flameprof, pstats) plus a summary.
+#
+# Nothing is hooked in while no profiler runs: callers only check whether
+# a session is active.
+
+MODES = ("sampling", "cprofile")
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+# Leaf frames of threads that are blocked waiting, left out unless asked for
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("selectors.py", "select"),
+    ("queue.py", "get"), ("connection.py", "_recv"), ("connection.py", "poll"), ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever"), ("base_events.py", "_run_once"), ("thread.py", "_worker"),
+}
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical profiler over every thread of the process, stdlib only."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, n=20):
+        """Functions with the most samples: on top of the stack (self) and anywhere in it (total)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = max(sum(self.stacks.values()), 1)
+        return [{"function": name, "self_pct": round(100.0 * count / samples, 2),
+                 "total_pct": round(100.0 * total[name] / samples, 2), "samples": count}
+                for name, count in own.most_common(n)]
+
+
+class DeterministicProfiler:
+    """cProfile of the calling thread."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+    def top(self, n=20):
+        stats = pstats.Stats(self.profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:n]
+        return [{"function": f"{func} ({os.path.basename(filename)}:{line})", "calls": calls,
+                 "self_s": round(tottime, 6), "total_s": round(cumtime, 6)}
+                for (filename, line, func), (_, calls, tottime, cumtime, _) in rows]
+
+    def summary(self, n=40):
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(n)
+        return out.getvalue()
+
+
+def _write_report(profiler, mode, label, output_dir, started, requests=None):
+    """Write the profile and its summary; returns a JSON-friendly report."""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + f"{started % 1:.3f}"[1:]
+    stem = os.path.join(output_dir, f"{stamp}-{label}-{mode}")
+    profile_path = stem + (".folded" if mode == "sampling" else ".prof")
+    summary_path = stem + ".txt"
+    profiler.write(profile_path)
+
+    top = profiler.top()
+    with open(summary_path, "w") as f:
+        f.write(f"{label} ({mode}), {time.time() - started:.2f}s")
+        f.write(f", {requests} requests\n" if requests is not None else "\n")
+        for row in top:
+            f.write("  ".join(f"{k}={v}" for k, v in row.items()) + "\n")
+        if mode == "cprofile":
+            f.write("\n" + profiler.summary())
+
+    report = {"mode": mode, "label": label, "seconds": round(time.time() - started, 3),
+              "profile": profile_path, "summary": summary_path, "top": top}
+    if requests is not None:
+        report["requests"] = requests
+    if mode == "sampling":
+        report["samples"] = profiler.samples
+    return report
+
+
+def _make_profiler(mode):
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiler mode '{mode}', expected one of {', '.join(MODES)}")
+    return SamplingProfiler() if mode == "sampling" else DeterministicProfiler()
+
+
+class ProfileSession:
+    """
+    A profiler that runs until ``max_requests`` requests were counted with
+    ``count_request`` or until ``stop`` is called. The owner stops it after
+    ``seconds``; a cprofile session must be stopped on the thread that
+    started it.
+    """
+
+    def __init__(self, mode="sampling", seconds=None, max_requests=None, label="session", output_dir=PROFILE_DIR):
+        self.mode = mode
+        self.label = label
+        self.output_dir = output_dir
+        self.seconds = seconds
+        self.max_requests = max_requests
+        self.requests = 0
+        self.report = None
+        self.started = time.time()
+        self._profiler = _make_profiler(mode)
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.report is None
+
+    def start(self):
+        self.started = time.time()
+        self._profiler.start()
+        return self
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+            done = self.max_requests is not None and self.requests >= self.max_requests
+        if done:
+            self.stop()
+
+    def stop(self):
+        with self._lock:
+            if self.report is not None:
+                return self.report
+            self._profiler.stop()
+            self.report = _write_report(self._profiler, self.mode, self.label, self.output_dir, self.started, self.requests)
+            return self.report
+
+    def status(self):
+        if self.report is not None:
+            return {"active": False, **self.report}
+        return {"active": True, "mode": self.mode, "label": self.label, "seconds": round(time.time() - self.started, 3),
+                "limit_seconds": self.seconds, "requests": self.requests, "limit_requests": self.max_requests}
+
+
+@contextmanager
+def profiled(mode="sampling", label="call", output_dir=PROFILE_DIR):
+    """
+    Profile the enclosed block. Yields a dict that is filled with the
+    report (file paths and top functions) when the block exits.
+    """
+    profiler = _make_profiler(mode)
+    report = {}
+    started = time.time()
+    profiler.start()
+    try:
+        yield report
+    finally:
+        profiler.stop()
+        report.update(_write_report(profiler, mode, label, output_dir, started))
@@ -0,0 +1,80 @@
+import os
+import json
+import sqlite3
+import threading
+
+############# RECOMMENDATION STORE
+# Precomputed recommendations in an embedded SQLite file:
+#
+#   meta             key -> value (model_version, created_at, num_users, ...)
+#   recommendations  user_id (primary key) -> JSON list of anime names
+#
+# A lookup is one primary-key read. The store is written to a temporary
+# file and moved into place, and readers open it read-only, so a batch run
+# never exposes a half-written store to the serving process.
+
+
+class RecommendationStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.meta = dict(self._connection().execute("SELECT key, value FROM meta").fetchall())
+
+    @property
+    def model_version(self):
+        return self.meta.get("model_version")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared across threads, so each reader gets its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def get(self, user_id):
+        """Stored recommendations for ``user_id``, None when the store doesn't cover the user."""
+        row = self._connection().execute(
+            "SELECT items FROM recommendations WHERE user_id = ?", (int(user_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def __len__(self):
+        return int(self.meta.get("num_users", 0))
+
+
+class RecommendationStoreWriter:
+    """Write a new store next to ``path``; ``close()`` commits it and swaps it into place."""
+
+    def __init__(self, path, model_version):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self.connection = sqlite3.connect(self.tmp_path)
+        self.connection.executescript(
+            "PRAGMA journal_mode = OFF;"
+            "PRAGMA synchronous = OFF;"
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE recommendations (user_id INTEGER PRIMARY KEY, items TEXT NOT NULL);"
+        )
+        self.meta = {"model_version": model_version}
+        self.count = 0
+
+    def put_many(self, rows):
+        """Add ``(user_id, recommendations)`` pairs."""
+        rows = [(int(user_id), json.dumps(items)) for user_id, items in rows]
+        self.connection.executemany("INSERT OR REPLACE INTO recommendations VALUES (?, ?)", rows)
+        self.count += len(rows)
+
+    def close(self, **meta):
+        self.meta.update(meta, num_users=self.count)
+        self.connection.executemany("INSERT INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in self.meta.items()])
+        self.connection.commit()
+        self.connection.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.connection.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
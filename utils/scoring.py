@@ -0,0 +1,73 @@
+import numpy as np
+
+############# SCORING
+# Shared by the API (app.py) and offline evaluation so both rank with the
+# exact same arithmetic.
+
+def score_users(user_weights, anime_weights, user_indices):
+    """
+    Score users against every anime with one matrix product.
+
+    A scalar index returns a 1-D array of shape (n_anime,), an array of
+    indices returns a block of shape (len(user_indices), n_anime).
+    """
+    return np.dot(user_weights[user_indices], anime_weights.T)
+
+
+def score_items(anime_weights, anime_indices):
+    """Item-item similarity of one anime (1-D) or a block of anime (2-D) against every anime."""
+    return np.dot(anime_weights[anime_indices], anime_weights.T)
+
+
+def top_k(scores, k, exclude=None):
+    """
+    Indices of the ``k`` highest scores along the last axis, best first.
+
+    Uses ``argpartition`` so only the selected candidates are sorted, which
+    matters for batched scoring where a full ``argsort`` per row dominates.
+
+    - **exclude**: boolean mask broadcastable to ``scores`` or, for 1-D
+      scores, an array of indices that must never be returned.
+
+    For 1-D scores, entries that are not finite (excluded, or -inf for
+    "no score") are never returned, so fewer than ``k`` may come back.
+    2-D results keep their width; callers drop non-finite entries per row.
+    """
+    scores = np.asarray(scores)
+    if exclude is not None:
+        exclude = np.asarray(exclude)
+        if exclude.dtype == bool:
+            scores = np.where(exclude, -np.inf, scores)
+        else:
+            scores = scores.copy()
+            scores[exclude] = -np.inf
+
+    n = scores.shape[-1]
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    top = np.take_along_axis(candidates, order, axis=-1)
+
+    if top.ndim == 1:
+        # Drop entries without a score that only surfaced because fewer than k remained
+        top = top[np.isfinite(scores[top])]
+    return top
+
+
+def popularity_table(rating_df):
+    """Average rating and number of ratings per anime, best rated first."""
+    return (
+        rating_df.groupby("anime_id")
+        .agg(avg_rating=("rating", "mean"), num_ratings=("rating", "count"))
+        .reset_index()
+        .sort_values(by="avg_rating", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
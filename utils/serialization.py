@@ -0,0 +1,120 @@
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional wire format, pip install .[msgpack]
+    msgpack = None
+
+############# RESPONSE SERIALIZATION
+# Recommendation responses are assembled column-wise: the display metadata
+# of every encoded anime is converted once, at load, into plain columns, so
+# a response is a few fancy-indexing ops plus one ``tolist()`` per column
+# instead of a frame scan and per-field conversions per item. Payloads are
+# encoded directly (orjson when installed, MessagePack on request) and
+# skip response-model validation; the JSON is byte-compatible with the
+# default encoder's output.
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+NDJSON_TYPE = "application/x-ndjson"
+
+METADATA_FIELDS = ("anime_id", "name", "score", "genres", "episodes", "type")
+
+
+class AnimeMetadata:
+    def __init__(self, anime_ids, names, scores, genres, episodes, types, known):
+        self.anime_ids = anime_ids      # raw anime ID per encoded anime
+        self.names = names              # object arrays of display strings
+        self.scores = scores            # float64, 0 when unknown
+        self.genres = genres
+        self.episodes = episodes        # int64, 0 when unknown
+        self.types = types
+        self.known = known              # False for anime without a metadata row
+
+    @classmethod
+    def build(cls, metadata, anime_ids):
+        """Columns for the anime of ``anime_ids`` in encoded order, from the first metadata row of each."""
+        anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        meta = metadata.drop_duplicates("anime_id").set_index("anime_id").reindex(anime_ids)
+        known = meta.index.isin(metadata["anime_id"])
+
+        def text(column):
+            if column not in meta:
+                return np.full(len(meta), "Unknown", dtype=object)
+            # Interned, so the many repeats of a genre list or type share one object
+            values = meta[column].astype(object).where(meta[column].notna(), "Unknown").to_numpy()
+            return np.array([sys.intern(v) if isinstance(v, str) else v for v in values], dtype=object)
+
+        def number(column, dtype):
+            if column not in meta:
+                return np.zeros(len(meta), dtype=dtype)
+            return pd.to_numeric(meta[column], errors="coerce").fillna(0).to_numpy().astype(dtype)
+
+        return cls(anime_ids, text("eng_version"), number("Score", np.float64), text("Genres"),
+                   number("Episodes", np.int64), text("Type"), np.asarray(known, dtype=bool))
+
+    def __len__(self):
+        return len(self.anime_ids)
+
+    def memory_bytes(self):
+        columns = (self.names, self.genres, self.types)
+        strings = {id(v): v for column in columns for v in column}
+        references = sum(column.nbytes for column in columns)
+        return sum(map(sys.getsizeof, strings.values())) + references + self.anime_ids.nbytes + self.scores.nbytes + self.episodes.nbytes + self.known.nbytes
+
+    def records(self, indices, skip_unknown=False, **extra):
+        """
+        Response items for the encoded anime ``indices``: the metadata fields
+        followed by the ``extra`` columns (arrays aligned with ``indices``).
+        Anime without metadata get only anime_id, name "Unknown" and the
+        extras, or are left out with ``skip_unknown``.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        keys = METADATA_FIELDS + tuple(extra)
+        columns = [self.anime_ids[indices].tolist(), self.names[indices].tolist(), self.scores[indices].tolist(),
+                   self.genres[indices].tolist(), self.episodes[indices].tolist(), self.types[indices].tolist()]
+        columns += [np.asarray(values).tolist() for values in extra.values()]
+
+        known = self.known[indices]
+        if known.all():
+            return [dict(zip(keys, row)) for row in zip(*columns)]
+
+        records = []
+        for is_known, row in zip(known.tolist(), zip(*columns)):
+            if is_known:
+                records.append(dict(zip(keys, row)))
+            elif not skip_unknown:
+                item = {"anime_id": row[0], "name": "Unknown"}
+                item.update(zip(keys[len(METADATA_FIELDS):], row[len(METADATA_FIELDS):]))
+                records.append(item)
+        return records
+
+
+def wants_msgpack(accept):
+    return msgpack is not None and accept is not None and MSGPACK_TYPE in accept
+
+
+def encode(payload, accept=None):
+    """Serialize ``payload`` for a client's Accept header; returns (body bytes, media type)."""
+    if wants_msgpack(accept):
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_TYPE
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), JSON_TYPE
+    # Same settings as the framework's default JSON response
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8"), JSON_TYPE
+
+
+def encode_lines(records):
+    """NDJSON: one JSON document per record, newline-terminated."""
+    if orjson is not None:
+        return b"".join(orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE) for record in records)
+    return "".join(json.dumps(record, ensure_ascii=False, allow_nan=False, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
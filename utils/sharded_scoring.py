@@ -0,0 +1,249 @@
+import queue
+import weakref
+import multiprocessing as mp
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Any, Optional
+
+import numpy as np
+
+from utils.scoring import top_k
+
+############# SHARDED SCORING
+# Scatter-gather top-k over embedding matrices split into row shards.
+#
+#   TopKQuery   -> every shard: local scores + local top-k (search_shard)
+#   TopKResult  <- merged into the global top-k (merge_results)
+#
+# Queries and results are plain arrays, and search_shard / merge_results
+# don't care how a shard is reached. A shard is anything with
+# ``send(query)`` and ``receive() -> TopKResult``. LocalShard is a worker
+# process that reads its rows straight out of shared memory; a shard on
+# another node would implement the same two methods over the network.
+#
+# Each LocalShard is reached over a small pool of pipes, one per query in
+# flight, so concurrent searches queue at every shard independently instead
+# of taking turns for the whole scatter-gather.
+
+
+@dataclass(frozen=True)
+class TopKQuery:
+    matrix: str                         # which matrix to search ("user", "anime", ...)
+    vectors: np.ndarray                 # one query (d,) or a block of queries (b, d)
+    k: int
+    exclude: Optional[Any] = None       # global row indices, or a bool mask over all rows
+
+
+@dataclass(frozen=True)
+class TopKResult:
+    indices: np.ndarray                 # global row indices, best first: (k,) or (b, k)
+    scores: np.ndarray
+
+
+def search_shard(block, offset, query):
+    """Top-k of ``query`` against one shard: ``block`` holds global rows [offset, offset + len(block))."""
+    scores = np.dot(query.vectors, block.T)
+    exclude = query.exclude
+    if exclude is not None:
+        exclude = np.asarray(exclude)
+        if exclude.dtype == bool:
+            exclude = exclude[..., offset:offset + len(block)]
+        else:
+            exclude = exclude[(exclude >= offset) & (exclude < offset + len(block))] - offset
+    local = top_k(scores, query.k, exclude=exclude)
+    return TopKResult(local + offset, np.take_along_axis(scores, local, axis=-1))
+
+
+def merge_results(results, k):
+    """Global top-k from the per-shard top-k lists."""
+    indices = np.concatenate([r.indices for r in results], axis=-1)
+    scores = np.concatenate([r.scores for r in results], axis=-1)
+    best = top_k(scores, k)
+    return TopKResult(np.take_along_axis(indices, best, axis=-1), np.take_along_axis(scores, best, axis=-1))
+
+
+def shard_bounds(n_rows, n_shards):
+    """Contiguous, nearly equal row ranges [start, stop) for each shard."""
+    edges = np.linspace(0, n_rows, n_shards + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _shard_worker(conns, layout):
+    """
+    Serve queries for one shard, in arrival order over any of ``conns``,
+    until every pipe is closed; ``layout`` maps matrix -> (shm name, shape, dtype, start, stop).
+    """
+    handles, blocks = [], {}
+    for name, (shm_name, shape, dtype, start, stop) in layout.items():
+        handle = shared_memory.SharedMemory(name=shm_name)
+        handles.append(handle)
+        blocks[name] = (np.ndarray(shape, dtype=dtype, buffer=handle.buf)[start:stop], start)
+    try:
+        open_conns = list(conns)
+        while open_conns:
+            for conn in wait(open_conns):
+                try:
+                    query = conn.recv()
+                except EOFError:
+                    query = None
+                if query is None:
+                    open_conns.remove(conn)
+                    continue
+                try:
+                    block, offset = blocks[query.matrix]
+                    conn.send(search_shard(block, offset, query))
+                except Exception as e:
+                    conn.send(e)
+    finally:
+        # Views into the buffers must be gone before the segments are closed
+        blocks.clear()
+        for handle in handles:
+            handle.close()
+
+
+class LocalShard:
+    """
+    A shard served by a local worker process over a pool of ``n_pipes``
+    pipes. ``connect()`` checks one out for a single query; the returned
+    channel has ``send`` / ``receive`` and goes back to the pool on ``release()``.
+    """
+
+    def __init__(self, context, layout, n_pipes=4):
+        pairs = [context.Pipe() for _ in range(n_pipes)]
+        self.conns = [parent for parent, _ in pairs]
+        self.process = context.Process(target=_shard_worker, args=([child for _, child in pairs], layout), daemon=True)
+        self.process.start()
+        for _, child in pairs:
+            child.close()
+        self.free = queue.Queue()
+        for conn in self.conns:
+            self.free.put(conn)
+
+    def connect(self):
+        return _ShardChannel(self, self.free.get())
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except (OSError, EOFError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        for conn in self.conns:
+            conn.close()
+
+
+class _ShardChannel:
+    """One checked-out pipe of a LocalShard."""
+
+    def __init__(self, shard, conn):
+        self.shard, self.conn = shard, conn
+
+    def send(self, query):
+        self.conn.send(query)
+
+    def receive(self):
+        result = self.conn.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def release(self):
+        self.shard.free.put(self.conn)
+
+
+class ShardedScorer:
+    """
+    Row-sharded top-k search over named embedding matrices.
+
+    Each matrix is copied once into a shared-memory segment. ``n_shards``
+    worker processes each search their own row range, so a query's scan is
+    split across cores and no worker holds a private copy. The coordinator
+    keeps read-only views to look up query vectors; the matrices passed in
+    are not referenced afterwards, so callers can drop them. Up to
+    ``pipes_per_shard`` searches are in flight at once.
+
+    The views in ``matrices`` may be handed out and outlive the scorer:
+    ``close`` removes the segments' names, and each segment is unmapped
+    once the last array viewing it is garbage collected.
+    """
+
+    def __init__(self, matrices, n_shards, start_method=None, pipes_per_shard=4):
+        context = mp.get_context(start_method)
+        self.n_shards = n_shards
+        self.segments, self.matrices, self.shards, layouts = [], {}, [], [dict() for _ in range(n_shards)]
+        try:
+            for name, matrix in matrices.items():
+                matrix = np.ascontiguousarray(matrix)
+                segment = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+                self.segments.append(segment)
+                view = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=segment.buf)
+                view[:] = matrix
+                view.setflags(write=False)
+                # The view's base is the mapping itself, so unmapping it earlier would crash readers
+                weakref.finalize(view, segment.close)
+                self.matrices[name] = view
+                for layout, (start, stop) in zip(layouts, shard_bounds(len(matrix), n_shards)):
+                    layout[name] = (segment.name, matrix.shape, matrix.dtype.str, start, stop)
+            for layout in layouts:
+                self.shards.append(LocalShard(context, layout, pipes_per_shard))
+        except Exception:
+            # Stops the shards already started too
+            self.close()
+            raise
+
+    def search(self, query):
+        """Scatter ``query`` to every shard, gather the local top-k lists and merge them."""
+        # Pipes are always checked out in shard order, so concurrent searches can't deadlock
+        channels, pending, results, error = [], [], [], None
+        try:
+            for shard in self.shards:
+                channel = shard.connect()
+                channels.append(channel)
+                channel.send(query)
+                pending.append(channel)
+        except Exception as e:
+            error = e
+        # Drain every channel that got the query even if one fails, so no reply is left in a pipe
+        for channel in pending:
+            try:
+                results.append(channel.receive())
+            except Exception as e:
+                error = error or e
+        for channel in channels:
+            channel.release()
+        if error is not None:
+            raise error
+        merged = merge_results(results, query.k)
+        if merged.scores.ndim == 1:
+            # Excluded rows only surface when fewer than k rows remain
+            keep = np.isfinite(merged.scores)
+            merged = TopKResult(merged.indices[keep], merged.scores[keep])
+        return merged
+
+    def nearest(self, matrix, row, k, exclude_self=True):
+        """The ``k`` rows of ``matrix`` with the highest dot product with row ``row``, best first."""
+        exclude = [row] if exclude_self else None
+        return self.search(TopKQuery(matrix, self.matrices[matrix][row], k, exclude))
+
+    def memory_bytes(self):
+        return sum(segment.size for segment in self.segments)
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+        # Unmapped by their finalizers once no caller holds a view any more
+        self.matrices.clear()
+        for segment in self.segments:
+            segment.unlink()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
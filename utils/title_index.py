@@ -0,0 +1,165 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+############# TITLE INDEX
+# Title lookup over English and original names without scanning frames:
+#
+#   exact   normalized title -> anime IDs
+#   prefix  sorted word-suffixes of every title, searched with bisect, so
+#           "titan" and "attack on t" both find "Attack on Titan"; scored
+#           by the share of the title the query covers
+#   fuzzy   trigram postings, candidates ranked by Dice similarity, for
+#           typos and titles that don't match exactly
+#
+# Equal scores are ordered by popularity, then anime ID, so results and
+# resolved titles are deterministic.
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(title):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", str(title))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, titles, anime_ids, popularity):
+        self.titles = titles                    # display title per entry
+        self.anime_ids = anime_ids              # anime ID per entry
+        self.popularity = popularity            # ranking weight per entry (members)
+        self.normalized = [normalize_title(t) for t in titles]
+
+        self.exact = {}
+        for entry, key in enumerate(self.normalized):
+            self.exact.setdefault(key, []).append(entry)
+
+        suffixes = []
+        for entry, key in enumerate(self.normalized):
+            starts = [0] + [m.end() for m in re.finditer(" ", key)]
+            suffixes.extend((key[start:], entry) for start in starts)
+        suffixes.sort()
+        self.suffix_keys = [s for s, _ in suffixes]
+        self.suffix_entries = np.array([e for _, e in suffixes], dtype=np.int32)
+
+        postings = {}
+        self.trigram_counts = np.zeros(len(titles), dtype=np.int32)
+        for entry, key in enumerate(self.normalized):
+            grams = trigrams(key)
+            self.trigram_counts[entry] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(entry)
+        self.postings = {gram: np.array(entries, dtype=np.int32) for gram, entries in postings.items()}
+
+    @classmethod
+    def build(cls, metadata, names=None):
+        """
+        Index the English titles of ``metadata`` (anime_id, eng_version,
+        Members) plus, when given, original names (``names``: MAL_ID, Name).
+        """
+        frames = [metadata[["anime_id", "eng_version"]].rename(columns={"eng_version": "title"})]
+        if names is not None:
+            frames.append(names[["MAL_ID", "Name"]].rename(columns={"MAL_ID": "anime_id", "Name": "title"}))
+        entries = pd.concat(frames).dropna().drop_duplicates()
+        entries = entries[entries["title"].astype(str).str.strip() != ""]
+
+        members = metadata.drop_duplicates("anime_id").set_index("anime_id")["Members"] if "Members" in metadata else None
+        popularity = (
+            pd.to_numeric(members.reindex(entries["anime_id"]), errors="coerce").fillna(0).to_numpy()
+            if members is not None else np.zeros(len(entries))
+        )
+        return cls(entries["title"].astype(str).tolist(), entries["anime_id"].astype(np.int64).to_numpy(), popularity)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def memory_bytes(self):
+        strings = sum(len(t) + len(n) for t, n in zip(self.titles, self.normalized)) + sum(map(len, self.suffix_keys))
+        arrays = self.anime_ids.nbytes + self.popularity.nbytes + self.suffix_entries.nbytes + self.trigram_counts.nbytes
+        return strings + arrays + sum(p.nbytes for p in self.postings.values())
+
+    def _ranked(self, entries, scores=None):
+        """``entries`` best first: by score, then popularity, then anime ID."""
+        entries = np.asarray(entries, dtype=np.int64)
+        keys = [self.anime_ids[entries], -self.popularity[entries]]
+        if scores is not None:
+            keys.append(-np.asarray(scores))
+        order = np.lexsort(keys)
+        return entries[order], (None if scores is None else np.asarray(scores)[order])
+
+    def _prefix_entries(self, key):
+        start = bisect_left(self.suffix_keys, key)
+        end = bisect_left(self.suffix_keys, key + "\uffff", start)
+        return self.suffix_entries[start:end]
+
+    def _fuzzy_entries(self, key, limit):
+        grams = [self.postings[g] for g in trigrams(key) if g in self.postings]
+        if not grams:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        shared = np.bincount(np.concatenate(grams), minlength=len(self.titles))
+        candidates = np.flatnonzero(shared)
+        dice = 2.0 * shared[candidates] / (self.trigram_counts[candidates] + len(trigrams(key)))
+        entries, dice = self._ranked(candidates, dice)
+        return entries[:limit], dice[:limit]
+
+    def search(self, query, limit=10, fuzzy=True, min_similarity=0.3):
+        """
+        Best matching titles for ``query``: exact matches, then title and
+        word prefixes (most popular first), then fuzzy matches with a Dice
+        similarity of at least ``min_similarity``. Prefix matches are kept
+        whatever their score, so short queries still autocomplete.
+        """
+        key = normalize_title(query)
+        if not key or limit <= 0:
+            return []
+
+        results, seen = [], set()
+
+        def add(entries, match, scores=None):
+            for i, entry in enumerate(entries):
+                anime_id = int(self.anime_ids[entry])
+                if anime_id in seen:
+                    continue
+                seen.add(anime_id)
+                score = 1.0 if scores is None else float(scores[i])
+                results.append({"anime_id": anime_id, "title": self.titles[entry], "match": match, "score": round(score, 4)})
+                if len(results) >= limit:
+                    return True
+            return False
+
+        exact, _ = self._ranked(self.exact.get(key, []))
+        if add(exact, "exact"):
+            return results
+        # Short prefixes match much of the index: only the most popular few are returned
+        prefix, _ = self._ranked(np.unique(self._prefix_entries(key)))
+        prefix = prefix[:4 * limit]
+        coverage = [len(key) / max(len(self.normalized[entry]), 1) for entry in prefix]
+        if add(prefix, "prefix", coverage):
+            return results
+        if fuzzy:
+            entries, dice = self._fuzzy_entries(key, limit * 2)
+            keep = dice >= min_similarity
+            add(entries[keep], "fuzzy", dice[keep])
+        return results
+
+    def resolve(self, title, min_similarity=0.5, accept=None, candidates=20):
+        """
+        Anime ID of the best match for a title with a score of at least
+        ``min_similarity``, exact matches first; None if nothing is close.
+        ``accept`` (anime ID -> bool) restricts the anime that may be returned.
+        """
+        matches = [m for m in self.search(title, limit=candidates, min_similarity=min_similarity)
+                   if m["score"] >= min_similarity and (accept is None or accept(m["anime_id"]))]
+        # Stable: equal scores keep the popularity / anime ID order of search
+        matches.sort(key=lambda m: -m["score"])
+        return matches[0]["anime_id"] if matches else None